@@ -4,14 +4,44 @@ Parses faculty data from markdown and stores in PostgreSQL
 
 Database: nirf
 Table: faculty_details
+
+Rows are streamed through COPY FROM STDIN into a staging table, then either
+swapped in atomically (--mode swap, default) or merged with an upsert keyed on
+(srno, name) (--mode upsert). Readers never see the table missing. In both
+modes a repeated (srno, name) in the source keeps its first row and the rest
+are skipped and reported.
+
+The same transaction also reloads the typed NIRF tables (nirf_tables.py) and
+rebuilds the faculty summary materialized views (summaries.py).
+
+Finally it (re)grants SELECT on the queryable tables to the read-only role the
+agent's SQL route connects as (NIRF_READER_ROLE, created if missing, with the
+password from the required NIRF_READER_PASSWORD); the swap and the view
+rebuild drop earlier grants.
+
+Usage:
+    NIRF_READER_PASSWORD=... python extraction.py [--mode swap|upsert] [--file PATH]
+    NIRF_DATABASE_URL=postgresql://... python extraction.py   # other database
 """
 
-import re
-import uuid
+import argparse
+import csv
+import io
+import os
+import sys
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 import psycopg2
-from psycopg2.extras import execute_values
+from psycopg2 import sql
+
+# Shared streaming markdown parser and table list live with the semantic agent's preprocessing
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sementic-agent"))
+from preprocessing.markdown_sections import iter_section_rows
+from preprocessing.nirf_schema import QUERYABLE_TABLES
+
+from nirf_tables import NirfTableRows, load_nirf_tables
+from summaries import build_summaries, drop_summaries
 
 
 # PostgreSQL Configuration
@@ -23,17 +53,25 @@ DB_CONFIG = {
     "password": "mypassword"   # Change this
 }
 
+# Optional DSN overriding DB_CONFIG (e.g. a throwaway local Postgres)
+DATABASE_URL = os.getenv("NIRF_DATABASE_URL")
+
+# Read-only login used by the agent's SQL route (sql_executor.NIRF_READER_DATABASE_URL).
+# The password has no default so a forgotten variable never ships a guessable login.
+READER_ROLE = os.getenv("NIRF_READER_ROLE", "campusgpt_reader")
+READER_PASSWORD = os.getenv("NIRF_READER_PASSWORD")
+
 # Path to markdown file
 MARKDOWN_FILE_PATH = "../data/parsed_data/pondiuni_clean_final.md"
 
 
 # SQL Statements
-CREATE_TABLE_SQL = """
-DROP TABLE IF EXISTS faculty_details CASCADE;
+COLUMNS = [
+    "srno", "name", "age", "designation", "gender", "qualification",
+    "experience_years", "currently_working", "joining_date", "leaving_date", "association_type",
+]
 
-CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
-
-CREATE TABLE faculty_details (
+TABLE_COLUMNS_SQL = """
     id                  UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     srno                INTEGER NOT NULL,
     name                VARCHAR(255) NOT NULL,
@@ -47,19 +85,46 @@ CREATE TABLE faculty_details (
     leaving_date        DATE,
     association_type    VARCHAR(50),
     created_at          TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+"""
 
-CREATE INDEX idx_faculty_designation ON faculty_details(designation);
-CREATE INDEX idx_faculty_gender ON faculty_details(gender);
-CREATE INDEX idx_faculty_association_type ON faculty_details(association_type);
-CREATE INDEX idx_faculty_currently_working ON faculty_details(currently_working);
+CREATE_TABLE_SQL = f"""
+CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+
+CREATE TABLE IF NOT EXISTS faculty_details ({TABLE_COLUMNS_SQL});
+"""
+
+# (name, columns, unique)
+INDEXES = [
+    ("idx_faculty_designation", "designation", False),
+    ("idx_faculty_gender", "gender", False),
+    ("idx_faculty_association_type", "association_type", False),
+    ("idx_faculty_currently_working", "currently_working", False),
+    ("uq_faculty_srno_name", "srno, name", True),
+]
+
+COPY_SQL = f"COPY {{table}} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+# Staging holds one row per (srno, name) (see UniqueRows)
+UPSERT_SQL = f"""
+INSERT INTO faculty_details ({', '.join(COLUMNS)})
+SELECT {', '.join(COLUMNS)}
+FROM faculty_details_staging
+ON CONFLICT (srno, name) DO UPDATE SET
+    {', '.join(f"{c} = EXCLUDED.{c}" for c in COLUMNS if c not in ("srno", "name"))}
+"""
+
+# Keeps the first row of each (srno, name) in a table loaded before the key was unique
+DEDUPE_SQL = """
+DELETE FROM faculty_details a
+USING faculty_details b
+WHERE a.srno = b.srno AND a.name = b.name AND a.ctid > b.ctid
 """
 
-INSERT_SQL = """
-INSERT INTO faculty_details (
-    id, srno, name, age, designation, gender, qualification,
-    experience_years, currently_working, joining_date, leaving_date, association_type
-) VALUES %s
+DELETE_MISSING_SQL = """
+DELETE FROM faculty_details f
+WHERE NOT EXISTS (
+    SELECT 1 FROM faculty_details_staging s WHERE s.srno = f.srno AND s.name = f.name
+)
 """
 
 
@@ -108,45 +173,25 @@ def parse_integer(value: str) -> Optional[int]:
         return None
 
 
-def extract_faculty_from_markdown(file_path: str) -> list[dict]:
+def iter_faculty_from_markdown(file_path: str, other_sections=None) -> Iterator[dict]:
     """
     Extract faculty details from markdown table.
-    Returns list of faculty dictionaries.
+    Yields faculty dictionaries as the file is read; every other section is
+    passed to `other_sections` (e.g. NirfTableRows.add) during the same pass.
     """
-    faculty_list = []
-    
-    with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read()
-    
-    # Find the Faculty Details section
-    faculty_section_match = re.search(
-        r"## Faculty Details\n\|.*?\n\|[-:\s|]+\n((?:\|.*?\n)+)",
-        content,
-        re.DOTALL
-    )
-    
-    if not faculty_section_match:
-        print("Error: Could not find Faculty Details section in markdown")
-        return faculty_list
-    
-    table_rows = faculty_section_match.group(1).strip().split("\n")
-    
-    for row in table_rows:
-        if not row.strip() or not row.startswith("|"):
-            continue
-        
-        # Split by | and clean up
-        columns = [col.strip() for col in row.split("|")]
-        # Remove empty first and last elements from split
-        columns = [c for c in columns if c != ""]
-        
+    found = False
+
+    # Rows are streamed from a single pass over the file
+    for _, header, columns in iter_section_rows(file_path, lambda name: name == "Faculty Details",
+                                                other_sections=other_sections):
+        found = True
         if len(columns) < 11:
-            print(f"Warning: Skipping row with insufficient columns: {row[:50]}...")
+            print(f"Warning: Skipping row with insufficient columns: {' | '.join(columns)[:50]}...")
             continue
         
+        row = " | ".join(columns)
         try:
             faculty = {
-                "id": str(uuid.uuid4()),
                 "srno": parse_integer(columns[0]),
                 "name": columns[1].strip(),
                 "age": parse_integer(columns[2]),
@@ -159,79 +204,244 @@ def extract_faculty_from_markdown(file_path: str) -> list[dict]:
                 "leaving_date": parse_date(columns[9]),
                 "association_type": columns[10].strip() if len(columns) > 10 else None
             }
-            faculty_list.append(faculty)
         except Exception as e:
             print(f"Error parsing row: {row[:50]}... - {e}")
             continue
+        yield faculty
     
-    return faculty_list
+    if not found:
+        print("Error: Could not find Faculty Details section in markdown")
+
+
+def extract_faculty_from_markdown(file_path: str) -> list[dict]:
+    """Extract faculty details from markdown table as a list."""
+    return list(iter_faculty_from_markdown(file_path))
+
+
+class UniqueRows:
+    """
+    Faculty rows with the first occurrence of each (srno, name) kept and later
+    duplicates skipped and counted. Both load modes stream through it, so
+    duplicate source rows are handled the same way in swap and upsert.
+    """
+
+    def __init__(self, rows: Iterable[dict]):
+        self._rows = rows
+        self.skipped = 0
+
+    def __iter__(self) -> Iterator[dict]:
+        seen = set()
+        for row in self._rows:
+            key = (row["srno"], row["name"])
+            if key in seen:
+                self.skipped += 1
+                continue
+            seen.add(key)
+            yield row
+
+
+class CopyStream(io.TextIOBase):
+    """
+    File-like CSV view over an iterator of faculty dicts, consumed by COPY.
+    Rows are encoded lazily as Postgres reads, so nothing is buffered up front.
+    """
+
+    def __init__(self, rows: Iterable[dict]):
+        self._rows = iter(rows)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._pending = ""
+        self.count = 0
+
+    def readable(self):
+        return True
+
+    def _fill(self, size: int):
+        while size < 0 or len(self._pending) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            # None -> unquoted empty field -> NULL in COPY csv format
+            self._writer.writerow([row[c] for c in COLUMNS])
+            self.count += 1
+            self._pending += self._buffer.getvalue()
+            self._buffer.seek(0)
+            self._buffer.truncate()
+
+    def read(self, size: int = -1) -> str:
+        self._fill(size)
+        if size < 0:
+            chunk, self._pending = self._pending, ""
+        else:
+            chunk, self._pending = self._pending[:size], self._pending[size:]
+        return chunk
 
 
 def create_table(cursor):
-    """Create the faculty_details table (drops existing)."""
-    print("Creating table faculty_details...")
+    """Create faculty_details and its indexes if it does not exist (never drops or alters it)."""
+    print("Ensuring table faculty_details exists...")
+    cursor.execute(
+        "SELECT 1 FROM pg_tables WHERE schemaname = current_schema() AND tablename = 'faculty_details'"
+    )
+    existing = cursor.fetchone() is not None
     cursor.execute(CREATE_TABLE_SQL)
-    print("Table created successfully!")
+    if not existing:
+        create_indexes(cursor, "faculty_details")
 
 
-def insert_faculty_data(cursor, faculty_list: list[dict]):
-    """Insert faculty data into the table."""
-    print(f"Inserting {len(faculty_list)} faculty records...")
-    
-    # Prepare data as tuples
-    values = [
-        (
-            f["id"],
-            f["srno"],
-            f["name"],
-            f["age"],
-            f["designation"],
-            f["gender"],
-            f["qualification"],
-            f["experience_years"],
-            f["currently_working"],
-            f["joining_date"],
-            f["leaving_date"],
-            f["association_type"]
+def ensure_unique_key(cursor):
+    """
+    Make sure faculty_details has the (srno, name) unique index the upsert merges on.
+
+    A table loaded before the key existed may hold duplicates, which would abort
+    the index build, so they are removed first (the first row of each key is kept).
+    """
+    cursor.execute(
+        "SELECT 1 FROM pg_indexes WHERE schemaname = current_schema() "
+        "AND tablename = 'faculty_details' AND indexname = 'uq_faculty_srno_name'"
+    )
+    if cursor.fetchone() is not None:
+        return
+    cursor.execute(DEDUPE_SQL)
+    if cursor.rowcount:
+        print(f"Warning: Removed {cursor.rowcount} duplicate (srno, name) rows from faculty_details")
+    create_indexes(cursor, "faculty_details")
+
+
+def create_indexes(cursor, table: str, suffix: str = ""):
+    for name, columns, unique in INDEXES:
+        cursor.execute(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name}{suffix} ON {table} ({columns})"
         )
-        for f in faculty_list
-    ]
-    
-    execute_values(cursor, INSERT_SQL, values)
-    print(f"Successfully inserted {len(values)} records!")
+
+
+def copy_into_staging(cursor, rows: Iterable[dict], temporary: bool) -> int:
+    """Stream rows into faculty_details_staging with COPY. Returns the row count."""
+    cursor.execute("DROP TABLE IF EXISTS faculty_details_staging")
+    if temporary:
+        cursor.execute(
+            "CREATE TEMP TABLE faculty_details_staging "
+            "(LIKE faculty_details INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+    else:
+        cursor.execute(f"CREATE TABLE faculty_details_staging ({TABLE_COLUMNS_SQL})")
+
+    stream = CopyStream(rows)
+    cursor.copy_expert(COPY_SQL.format(table="faculty_details_staging"), stream)
+    return stream.count
+
+
+def swap_in_staging(cursor):
+    """Index the staging table and swap it in place of faculty_details in one transaction."""
+    create_indexes(cursor, "faculty_details_staging", suffix="_new")
+    cursor.execute("ANALYZE faculty_details_staging")
+    # The summary views reference the old table; they are rebuilt after the load
+    drop_summaries(cursor)
+    cursor.execute("ALTER TABLE faculty_details RENAME TO faculty_details_old")
+    cursor.execute("ALTER TABLE faculty_details_staging RENAME TO faculty_details")
+    cursor.execute("DROP TABLE faculty_details_old")
+    for name, _, _ in INDEXES:
+        cursor.execute(f"ALTER INDEX {name}_new RENAME TO {name}")
+    cursor.execute(
+        "SELECT conname FROM pg_constraint WHERE conrelid = 'faculty_details'::regclass AND contype = 'p'"
+    )
+    (pkey,) = cursor.fetchone()
+    if pkey != "faculty_details_pkey":
+        cursor.execute(f"ALTER TABLE faculty_details RENAME CONSTRAINT {pkey} TO faculty_details_pkey")
+
+
+def merge_staging(cursor) -> tuple[int, int]:
+    """Upsert staging rows into faculty_details and delete rows missing from the source."""
+    cursor.execute(UPSERT_SQL)
+    upserted = cursor.rowcount
+    cursor.execute(DELETE_MISSING_SQL)
+    return upserted, cursor.rowcount
+
+
+def grant_reader_role(cursor, password: str):
+    """Create the read-only role if needed and allow it SELECT on the queryable tables only."""
+    role = sql.Identifier(READER_ROLE)
+    cursor.execute("SELECT 1 FROM pg_roles WHERE rolname = %s", (READER_ROLE,))
+    if cursor.fetchone() is None:
+        cursor.execute(sql.SQL("CREATE ROLE {}").format(role))
+    # Re-applied on every run so the login always matches NIRF_READER_PASSWORD
+    cursor.execute(sql.SQL("ALTER ROLE {} LOGIN PASSWORD %s NOSUPERUSER NOCREATEDB NOCREATEROLE").format(role),
+                   (password,))
+    cursor.execute(sql.SQL("ALTER ROLE {} SET default_transaction_read_only = on").format(role))
+    cursor.execute(sql.SQL("GRANT CONNECT ON DATABASE {} TO {}").format(
+        sql.Identifier(cursor.connection.get_dsn_parameters()["dbname"]), role))
+    cursor.execute(sql.SQL("GRANT USAGE ON SCHEMA public TO {}").format(role))
+    for table in QUERYABLE_TABLES:
+        cursor.execute(sql.SQL("GRANT SELECT ON {} TO {}").format(sql.Identifier(table), role))
+    print(f"Granted SELECT on {len(QUERYABLE_TABLES)} tables to {READER_ROLE}")
+
+
+def load_faculty_data(cursor, rows: Iterable[dict], mode: str) -> int:
+    """Bulk load faculty rows with COPY + swap/upsert. Returns rows loaded."""
+    create_table(cursor)
+    if mode == "upsert":
+        ensure_unique_key(cursor)
+
+    start = time.perf_counter()
+    rows = UniqueRows(rows)
+    count = copy_into_staging(cursor, rows, temporary=(mode == "upsert"))
+    copy_seconds = time.perf_counter() - start
+    print(f"COPY: {count} rows in {copy_seconds:.2f}s ({count / max(copy_seconds, 1e-9):,.0f} rows/sec)")
+    if rows.skipped:
+        print(f"Warning: Skipped {rows.skipped} duplicate (srno, name) rows; the first of each was kept")
+
+    if count == 0:
+        raise ValueError("No faculty rows parsed; refusing to replace faculty_details with an empty table")
+
+    if mode == "swap":
+        swap_in_staging(cursor)
+        print("Swapped staging table into faculty_details")
+    else:
+        upserted, deleted = merge_staging(cursor)
+        print(f"Upserted {upserted} rows, deleted {deleted} rows no longer in the source")
+
+    total_seconds = time.perf_counter() - start
+    print(f"Load: {count} rows in {total_seconds:.2f}s ({count / max(total_seconds, 1e-9):,.0f} rows/sec)")
+    return count
 
 
 def main():
     """Main execution function."""
+    parser = argparse.ArgumentParser(description="Load faculty details from markdown into PostgreSQL")
+    parser.add_argument("--mode", choices=["swap", "upsert"], default="swap",
+                        help="swap: replace the table atomically; upsert: merge on (srno, name)")
+    parser.add_argument("--file", default=MARKDOWN_FILE_PATH)
+    args = parser.parse_args()
+    if not READER_PASSWORD:
+        parser.error("NIRF_READER_PASSWORD must be set (password of the agent's read-only role)")
+
     print("=" * 60)
     print("Faculty Details Extraction Script")
     print("=" * 60)
     
-    # Step 1: Parse markdown
-    print(f"\n[1/3] Parsing markdown file: {MARKDOWN_FILE_PATH}")
-    faculty_list = extract_faculty_from_markdown(MARKDOWN_FILE_PATH)
-    print(f"Extracted {len(faculty_list)} faculty records")
-    
-    if not faculty_list:
-        print("No faculty data found. Exiting.")
-        return
-    
-    # Step 2: Connect to PostgreSQL
-    print(f"\n[2/3] Connecting to PostgreSQL...")
+    # Step 1: Connect to PostgreSQL
+    print(f"\n[1/3] Connecting to PostgreSQL...")
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = psycopg2.connect(DATABASE_URL) if DATABASE_URL else psycopg2.connect(**DB_CONFIG)
         conn.autocommit = False
         cursor = conn.cursor()
-        print(f"Connected to database: {DB_CONFIG['database']}")
+        print(f"Connected to database: {conn.get_dsn_parameters().get('dbname')}")
     except Exception as e:
         print(f"Error connecting to database: {e}")
         return
     
     try:
-        # Step 3: Create table and insert data
-        print(f"\n[3/3] Creating table and inserting data...")
-        create_table(cursor)
-        insert_faculty_data(cursor, faculty_list)
+        # Step 2: Parse markdown and stream rows into the table
+        print(f"\n[2/3] Streaming {args.file} into faculty_details (mode={args.mode})...")
+        # The same read collects the NIRF table sections; COPY consumes the whole stream
+        nirf_rows = NirfTableRows()
+        load_faculty_data(cursor, iter_faculty_from_markdown(args.file, other_sections=nirf_rows.add), args.mode)
+
+        # Step 3: Precomputed statistics, committed together with the load
+        print(f"\n[3/3] Loading NIRF tables and rebuilding summary views...")
+        load_nirf_tables(cursor, nirf_rows)
+        build_summaries(cursor)
+        grant_reader_role(cursor, READER_PASSWORD)
         
         # Commit transaction
         conn.commit()
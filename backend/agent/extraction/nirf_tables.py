@@ -0,0 +1,187 @@
+"""
+Typed tables for the statistics-heavy NIRF sections.
+
+    nirf_intake       sanctioned intake per program and academic year
+    nirf_placements   per program and intake batch: intake, admitted, graduated,
+                      placed, median salary, higher studies
+    nirf_expenditure  capital / operational expenditure per item and year
+
+Amounts such as "250000(Two lakh Fifty Thousand only)" are stored as the
+leading integer; "-" and empty cells become NULL. The tables are small, so
+each load replaces their contents inside the caller's transaction.
+
+Each table has a per-section parser; `NirfTableRows.add` routes a Section to
+the matching one, so all three tables come out of a single pass over the file
+(in extraction.py, the same pass that streams the faculty rows).
+"""
+
+import re
+from typing import Dict, Iterator, List, Optional
+
+from psycopg2.extras import execute_values
+
+from preprocessing.markdown_sections import Section, iter_sections
+
+
+CREATE_NIRF_TABLES_SQL = """
+CREATE TABLE IF NOT EXISTS nirf_intake (
+    program             VARCHAR(50) NOT NULL,
+    academic_year       VARCHAR(7) NOT NULL,
+    intake              INTEGER,
+    PRIMARY KEY (program, academic_year)
+);
+
+CREATE TABLE IF NOT EXISTS nirf_placements (
+    program                 VARCHAR(50) NOT NULL,
+    intake_year             VARCHAR(7) NOT NULL,
+    first_year_intake       INTEGER,
+    first_year_admitted     INTEGER,
+    lateral_entry_admitted  INTEGER,
+    graduation_year         VARCHAR(7),
+    graduated               INTEGER,
+    placed                  INTEGER,
+    median_salary           BIGINT,
+    higher_studies          INTEGER,
+    PRIMARY KEY (program, intake_year)
+);
+
+CREATE TABLE IF NOT EXISTS nirf_expenditure (
+    category            VARCHAR(20) NOT NULL,
+    item                TEXT NOT NULL,
+    academic_year       VARCHAR(7) NOT NULL,
+    amount              BIGINT,
+    PRIMARY KEY (category, item, academic_year)
+);
+"""
+
+INTAKE_COLUMNS = ["program", "academic_year", "intake"]
+PLACEMENT_COLUMNS = [
+    "program", "intake_year", "first_year_intake", "first_year_admitted", "lateral_entry_admitted",
+    "graduation_year", "graduated", "placed", "median_salary", "higher_studies",
+]
+EXPENDITURE_COLUMNS = ["category", "item", "academic_year", "amount"]
+
+YEAR_HEADERS = {"intake year", "academic year", "graduation year"}
+
+# Placement header (lowercased substring) -> column; checked in order
+PLACEMENT_HEADERS = [
+    ("lateral entry", "lateral_entry_admitted"),
+    ("intake in the year", "first_year_intake"),
+    ("admitted in the year", "first_year_admitted"),
+    ("graduating", "graduated"),
+    ("median salary", "median_salary"),
+    ("placed", "placed"),
+    ("higher studies", "higher_studies"),
+]
+
+
+def parse_amount(value: str) -> Optional[int]:
+    """Leading integer of a cell like '250000(Two lakh...)'; None for '-' or empty."""
+    match = re.match(r"\s*(\d+)", value or "")
+    return int(match.group(1)) if match else None
+
+
+def program_code(label: str) -> str:
+    """'UG [3 Years Program(s)]' / 'UG Placement Statistics ...' -> 'UG'."""
+    return label.split()[0]
+
+
+def intake_rows(section: Section) -> Iterator[tuple]:
+    years = section.header[1:]
+    for row in section.rows:
+        for year, value in zip(years, row[1:]):
+            yield program_code(row[0]), year, parse_amount(value)
+
+
+def placement_rows(section: Section) -> Iterator[tuple]:
+    headers = [h.lower() for h in section.header]
+    year_columns = [i for i, h in enumerate(headers) if h in YEAR_HEADERS]
+    columns = {}
+    for i, header in enumerate(headers):
+        # Year columns are handled above; "Lateral Entry Year" is a year too
+        if header in YEAR_HEADERS or header == "lateral entry year":
+            continue
+        for needle, column in PLACEMENT_HEADERS:
+            if needle in header:
+                columns.setdefault(column, i)
+                break
+
+    for row in section.rows:
+        values = {column: parse_amount(row[i]) for column, i in columns.items() if i < len(row)}
+        yield (
+            program_code(section.heading),
+            row[year_columns[0]],
+            values.get("first_year_intake"),
+            values.get("first_year_admitted"),
+            values.get("lateral_entry_admitted"),
+            row[year_columns[-1]] if len(year_columns) > 1 else None,
+            values.get("graduated"),
+            values.get("placed"),
+            values.get("median_salary"),
+            values.get("higher_studies"),
+        )
+
+
+def expenditure_rows(section: Section) -> Iterator[tuple]:
+    category = "capital" if section.heading.startswith("Annual Capital Expenditure") else "operational"
+    years = section.header[1:]
+    for row in section.rows:
+        for year, value in zip(years, row[1:]):
+            amount = parse_amount(value)
+            # Sub-heading rows have no amounts
+            if amount is not None:
+                yield category, row[0], year, amount
+
+
+# table -> (columns, does the section feed it, section -> rows)
+NIRF_TABLES = {
+    "nirf_intake": (
+        INTAKE_COLUMNS,
+        lambda s: s.heading.startswith("Sanctioned Student Intake") and s.is_table,
+        intake_rows,
+    ),
+    "nirf_placements": (
+        PLACEMENT_COLUMNS,
+        lambda s: "Placement Statistics" in s.heading and s.is_table,
+        placement_rows,
+    ),
+    "nirf_expenditure": (
+        EXPENDITURE_COLUMNS,
+        lambda s: s.heading.startswith(("Annual Capital Expenditure", "Annual Operational Expenditure")),
+        expenditure_rows,
+    ),
+}
+
+
+class NirfTableRows:
+    """Rows of every typed table, fed one Section at a time from a single pass over the file."""
+
+    def __init__(self):
+        self.tables: Dict[str, List[tuple]] = {table: [] for table in NIRF_TABLES}
+
+    def add(self, section: Section):
+        for table, (_, matches, parse) in NIRF_TABLES.items():
+            if matches(section):
+                self.tables[table].extend(parse(section))
+                break
+
+
+def parse_nirf_tables(path: str) -> NirfTableRows:
+    """One iter_sections pass over the file (extraction.py piggybacks on its faculty pass instead)."""
+    rows = NirfTableRows()
+    for section in iter_sections(path):
+        rows.add(section)
+    return rows
+
+
+def load_nirf_tables(cursor, rows: NirfTableRows) -> dict:
+    """Replace the typed NIRF tables with the parsed rows."""
+    cursor.execute(CREATE_NIRF_TABLES_SQL)
+    counts = {}
+    for table, (columns, _, _) in NIRF_TABLES.items():
+        cursor.execute(f"DELETE FROM {table}")
+        if rows.tables[table]:
+            execute_values(cursor, f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s", rows.tables[table])
+        counts[table] = len(rows.tables[table])
+    print("Loaded NIRF tables: " + ", ".join(f"{t}={n}" for t, n in counts.items()))
+    return counts
@@ -0,0 +1,97 @@
+"""
+Precomputed faculty statistics.
+
+Materialized views over faculty_details for the aggregates people ask for
+most (see sample_queries.py). They are rebuilt by extraction.py in the same
+transaction as the load, so readers switch from the old numbers to the new
+ones at commit. `aggregates.py` in the semantic agent serves them from memory.
+"""
+
+# name -> (SELECT, unique key columns)
+SUMMARY_VIEWS = {
+    "faculty_overview": ("""
+        SELECT COUNT(*) AS total,
+               COUNT(*) FILTER (WHERE currently_working) AS currently_working,
+               COUNT(*) FILTER (WHERE gender = 'Male') AS male,
+               COUNT(*) FILTER (WHERE gender = 'Female') AS female,
+               ROUND(AVG(experience_years)::numeric, 1) AS avg_experience,
+               ROUND(AVG(age)::numeric, 1) AS avg_age,
+               now() AS refreshed_at
+        FROM faculty_details
+    """, "refreshed_at"),
+    "faculty_by_designation": ("""
+        SELECT designation,
+               COUNT(*) AS total,
+               COUNT(*) FILTER (WHERE currently_working) AS currently_working,
+               COUNT(*) FILTER (WHERE gender = 'Male') AS male,
+               COUNT(*) FILTER (WHERE gender = 'Female') AS female,
+               ROUND(AVG(experience_years)::numeric, 1) AS avg_experience,
+               MIN(experience_years) AS min_experience,
+               MAX(experience_years) AS max_experience,
+               ROUND(AVG(age)::numeric, 1) AS avg_age,
+               MIN(age) AS youngest,
+               MAX(age) AS oldest
+        FROM faculty_details
+        GROUP BY designation
+    """, "designation"),
+    "faculty_by_gender": ("""
+        SELECT gender,
+               COUNT(*) AS total,
+               ROUND(COUNT(*) * 100.0 / SUM(COUNT(*)) OVER (), 2) AS percentage
+        FROM faculty_details
+        GROUP BY gender
+    """, "gender"),
+    "faculty_by_association": ("""
+        SELECT association_type, COUNT(*) AS total
+        FROM faculty_details
+        GROUP BY association_type
+    """, "association_type"),
+    "faculty_by_qualification": ("""
+        SELECT qualification, COUNT(*) AS total
+        FROM faculty_details
+        GROUP BY qualification
+    """, "qualification"),
+    "faculty_experience_buckets": ("""
+        SELECT bucket, bucket_order, COUNT(*) AS total,
+               COUNT(*) FILTER (WHERE currently_working) AS currently_working
+        FROM (
+            SELECT currently_working,
+                   CASE WHEN experience_years IS NULL THEN 'Unknown'
+                        WHEN experience_years < 5 THEN '0-5'
+                        WHEN experience_years < 10 THEN '5-10'
+                        WHEN experience_years < 20 THEN '10-20'
+                        WHEN experience_years < 30 THEN '20-30'
+                        ELSE '30+' END AS bucket,
+                   CASE WHEN experience_years IS NULL THEN 5
+                        WHEN experience_years < 5 THEN 0
+                        WHEN experience_years < 10 THEN 1
+                        WHEN experience_years < 20 THEN 2
+                        WHEN experience_years < 30 THEN 3
+                        ELSE 4 END AS bucket_order
+            FROM faculty_details
+        ) f
+        GROUP BY bucket, bucket_order
+    """, "bucket"),
+    "faculty_joinings_by_year": ("""
+        SELECT EXTRACT(YEAR FROM joining_date)::INTEGER AS year, COUNT(*) AS joinings
+        FROM faculty_details
+        WHERE joining_date IS NOT NULL
+        GROUP BY 1
+    """, "year"),
+}
+
+
+def drop_summaries(cursor):
+    """Drop the views (they depend on faculty_details, which a swap replaces)."""
+    for name in SUMMARY_VIEWS:
+        cursor.execute(f"DROP MATERIALIZED VIEW IF EXISTS {name}")
+
+
+def build_summaries(cursor):
+    """(Re)create every summary view from the current faculty_details."""
+    drop_summaries(cursor)
+    for name, (query, key) in SUMMARY_VIEWS.items():
+        cursor.execute(f"CREATE MATERIALIZED VIEW {name} AS {query}")
+        # Unique key allows REFRESH MATERIALIZED VIEW CONCURRENTLY
+        cursor.execute(f"CREATE UNIQUE INDEX {name}_key ON {name} ({key})")
+    print(f"Built {len(SUMMARY_VIEWS)} summary views")
@@ -3,36 +3,87 @@ import os
 
 load_dotenv()
 
-from langchain_qdrant import QdrantVectorStore
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_core.prompts import PromptTemplate
-from langchain_groq import ChatGroq
 from langchain_core.output_parsers import StrOutputParser, JsonOutputParser
-from langchain_tavily import TavilySearch
 from typing_extensions import TypedDict, NotRequired
 from typing import List
 from langchain_core.documents import Document
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import END, StateGraph
-from langgraph.checkpoint.memory import MemorySaver
 import pprint
+import time
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from components import components, lazy, lazy_chat
+from embedding_cache import CachedEmbeddings
+from semantic_cache import build_semantic_cache
+from checkpointing import build_checkpoint_store, build_checkpointer
+from hybrid_retrieval import build_retriever
+from retrieval_cache import build_retrieval_cache
+from collection_router import MULTI_COLLECTION_RETRIEVAL, SINGLE_COLLECTION, build_multi_collection_retriever
+from websearch import WEB_SEARCH_MAX_RESULTS, CachedWebSearch, has_web_results, merge_web_results, searched_in_request
+from sql_executor import SqlExecutor, UnsafeQueryError, schema_description
+from preprocessing.nirf_schema import source_section
+from context import build_context, document_label
+from routing import FastRouter, examples_from_prompt
+from telemetry import REGISTRY, RequestTrace, configure_logging, graph_edge_names, logger
 
 # LLM Models
 base_llm = "llama-3.3-70b-versatile"
 heavier_llm = "openai/gpt-oss-120b"
 
-# Embeddings and Vector Store
-embeddings = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001")
+# Clients are built on first use (or by components.warm_up()), see components.py
 
-vectorstore = QdrantVectorStore.from_existing_collection(
-    url="http://localhost:6333",
-    collection_name="PONDICHERRY_UNIVERSITY_INFO",
-    embedding=embeddings
-)
-retriever = vectorstore.as_retriever()
+# Embeddings and Vector Store
+def build_embeddings():
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    # Cached on disk so repeated questions skip the embedding API
+    return CachedEmbeddings(GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001"))
+
+qdrant_url = "http://localhost:6333"
+collection_name = SINGLE_COLLECTION
+
+def build_vectorstore(collection=collection_name):
+    from langchain_qdrant import QdrantVectorStore
+
+    return QdrantVectorStore.from_existing_collection(
+        url=qdrant_url,
+        collection_name=collection,
+        embedding=components.get("embeddings")
+    )
+
+def build_async_qdrant():
+    from qdrant_client import AsyncQdrantClient
+
+    # The langchain Qdrant store is sync only; async retrieval queries through this client
+    return AsyncQdrantClient(url=qdrant_url)
+
+def build_collection_retriever():
+    if MULTI_COLLECTION_RETRIEVAL:
+        # PU_* collections picked per query and searched concurrently (collection_router.py)
+        return build_multi_collection_retriever(
+            build_vectorstore, async_client=components.get("async_qdrant"), cache=components.get("retrieval_cache"))
+    # Dense + BM25 fused with RRF when the collection's BM25 index has been built
+    return build_retriever(components.get("vectorstore"), collection_name,
+                           async_client=components.get("async_qdrant"), cache=components.get("retrieval_cache"))
+
+components.register("embeddings", build_embeddings)
+if not MULTI_COLLECTION_RETRIEVAL:
+    components.register("vectorstore", build_vectorstore)
+components.register("async_qdrant", build_async_qdrant)
+# Results of repeated questions, until the indexing pipeline bumps the collection version
+components.register("retrieval_cache", build_retrieval_cache)
+components.register("retriever", build_collection_retriever)
+# Answer cache in front of the graph (Valkey, or in-process fallback; None when disabled)
+components.register("semantic_cache", lambda: build_semantic_cache(components.get("embeddings")))
+
+retriever = lazy("retriever")
 
 # Relevance grader
-grader_model = ChatGroq(model=base_llm, temperature=1)
-grader_llm = grader_model.with_structured_output(method="json_mode")
+grader_llm = lazy_chat(base_llm, temperature=1, json_mode=True)
 
 grader_prompt = PromptTemplate(
     template="""You are a grader assessing relevance 
@@ -55,6 +106,22 @@ grader_prompt = PromptTemplate(
 
 retrieval_grader = grader_prompt | grader_llm
 
+# Max in-flight grader calls per question; 1 grades documents sequentially
+GRADER_MAX_CONCURRENCY = int(os.getenv("GRADER_MAX_CONCURRENCY", "4"))
+
+def _grade_document(inputs):
+    """Grade a single document and measure how long the grader call took."""
+    start = time.perf_counter()
+    score = retrieval_grader.invoke(inputs)
+    return {"score": score, "latency": time.perf_counter() - start}
+
+async def _agrade_document(inputs):
+    start = time.perf_counter()
+    score = await retrieval_grader.ainvoke(inputs)
+    return {"score": score, "latency": time.perf_counter() - start}
+
+document_grader = RunnableLambda(_grade_document, afunc=_agrade_document)
+
 # Generate
 rag_prompt = PromptTemplate(
     template="""You are an assistant for question-answering tasks. 
@@ -67,10 +134,10 @@ rag_prompt = PromptTemplate(
     input_variables=["question", "document"],
 )
 
-rag_llm = ChatGroq(model=base_llm, temperature=0)
+rag_llm = lazy_chat(base_llm, temperature=0)
 
-# Chain
-rag_chain = rag_prompt | rag_llm | StrOutputParser()
+# Chain (tagged so its tokens are streamed to the client, see chat/service.py)
+rag_chain = (rag_prompt | rag_llm | StrOutputParser()).with_config(tags=["answer"])
 
 # Basic Response
 basic_prompt = PromptTemplate(
@@ -82,11 +149,11 @@ basic_prompt = PromptTemplate(
     input_variables=["question"],
 )
 
-basic_llm = ChatGroq(model=heavier_llm, temperature=0)
-basic_rag_chain = basic_prompt | basic_llm | StrOutputParser()
+basic_llm = lazy_chat(heavier_llm, temperature=0)
+basic_rag_chain = (basic_prompt | basic_llm | StrOutputParser()).with_config(tags=["answer"])
 
 # Hallucination Grader
-hallucination_llm = ChatGroq(model=heavier_llm, temperature=0)
+hallucination_llm = lazy_chat(heavier_llm, temperature=0)
 
 hallucination_prompt = PromptTemplate(
     template="""You are a grader assessing whether 
@@ -106,7 +173,7 @@ hallucination_prompt = PromptTemplate(
 hallucination_grader = hallucination_prompt | hallucination_llm | JsonOutputParser()
 
 # Answer Grader
-answer_llm = ChatGroq(model=heavier_llm, temperature=0)
+answer_llm = lazy_chat(heavier_llm, temperature=0)
 
 answer_prompt = PromptTemplate(
     template="""You are a grader assessing whether an 
@@ -123,8 +190,122 @@ answer_prompt = PromptTemplate(
 
 answer_grader = answer_prompt | answer_llm | JsonOutputParser()
 
+# "sequential": answer grader only runs once the generation is grounded.
+# "speculative": both graders start together (extra tokens, ~half the latency).
+GRADER_MODE = os.getenv("GRADER_MODE", "sequential")
+# In speculative mode, stop waiting on the answer grader once grounding fails
+CANCEL_ANSWER_GRADER_ON_UNGROUNDED = os.getenv("CANCEL_ANSWER_GRADER_ON_UNGROUNDED", "true").lower() == "true"
+grader_pool = ThreadPoolExecutor(max_workers=int(os.getenv("GRADER_POOL_SIZE", "8")), thread_name_prefix="grader")
+
+def run_generation_graders(question, context, generation):
+    """
+    Run the hallucination and answer graders according to GRADER_MODE.
+
+    Args:
+        context (str): the (compressed) documents the generation was based on
+
+    Returns:
+        tuple: (hallucination grade, answer grade or None if it was not needed)
+    """
+    hallucination_inputs = {"documents": context, "generation": generation}
+    answer_inputs = {"question": question, "generation": generation}
+
+    if GRADER_MODE != "speculative":
+        grade = hallucination_grader.invoke(hallucination_inputs)['score']
+        if grade != "yes":
+            return grade, None
+        return grade, answer_grader.invoke(answer_inputs)['score']
+
+    # Copy the context so callbacks/tracing follow the call into the pool thread
+    answer_future = grader_pool.submit(contextvars.copy_context().run, answer_grader.invoke, answer_inputs)
+    try:
+        grade = hallucination_grader.invoke(hallucination_inputs)['score']
+        if grade != "yes" and CANCEL_ANSWER_GRADER_ON_UNGROUNDED:
+            return grade, None
+        answer_grade = answer_future.result()['score']
+        return grade, answer_grade if grade == "yes" else None
+    finally:
+        # Also reached when the hallucination grader raises. Not started yet -> never
+        # runs; already in flight -> its result is discarded
+        answer_future.cancel()
+
+async def arun_generation_graders(question, context, generation):
+    """`run_generation_graders` on the event loop; speculative mode uses a task instead of the pool."""
+    hallucination_inputs = {"documents": context, "generation": generation}
+    answer_inputs = {"question": question, "generation": generation}
+
+    if GRADER_MODE != "speculative":
+        grade = (await hallucination_grader.ainvoke(hallucination_inputs))['score']
+        if grade != "yes":
+            return grade, None
+        return grade, (await answer_grader.ainvoke(answer_inputs))['score']
+
+    answer_task = asyncio.create_task(answer_grader.ainvoke(answer_inputs))
+    try:
+        grade = (await hallucination_grader.ainvoke(hallucination_inputs))['score']
+        if grade != "yes" and CANCEL_ANSWER_GRADER_ON_UNGROUNDED:
+            return grade, None
+        answer_grade = (await answer_task)['score']
+        return grade, answer_grade if grade == "yes" else None
+    finally:
+        # Also reached when the hallucination grader raises: never leave the speculative call running
+        if not answer_task.done():
+            answer_task.cancel()
+            await asyncio.gather(answer_task, return_exceptions=True)
+
+# Structured queries over the faculty tables (exact counts/aggregates)
+sql_query_llm = lazy_chat(base_llm, temperature=0, json_mode=True)
+
+sql_query_prompt = PromptTemplate(
+    template="""You write a single PostgreSQL SELECT query that answers a question about Pondicherry University faculty
+    or its NIRF intake, placement and expenditure figures.
+
+    Tables:
+    {schema}
+
+    Column values: designation is e.g. 'Professor', 'Associate Professor', 'Assistant Professor';
+    gender is 'Male' or 'Female'; currently_working is a boolean; experience_years is in years.
+
+    Rules:
+    - Exactly one SELECT statement, no semicolon, no comments.
+    - Never modify data. Read only the tables above (no system catalogs) and use only standard aggregate,
+      window, text, number and date functions.
+    - Put every literal value taken from the question in params and reference it as %(name)s in the query
+      (LIKE patterns too, e.g. "name ILIKE %(name)s" with params {{"name": "%Kumar%"}}).
+    - Prefer the precomputed faculty_* summary views when one answers the question; otherwise select only the
+      columns needed and aggregate in SQL (COUNT, AVG, GROUP BY) instead of returning raw rows.
+    - Return at most {max_rows} rows.
+
+    Return JSON with two keys: 'query' (the SQL string) and 'params' (an object, empty if unused).
+
+    Question: {question}
+    """,
+    input_variables=["question", "schema", "max_rows"],
+)
+
+sql_query_chain = sql_query_prompt | sql_query_llm
+
+sql_answer_prompt = PromptTemplate(
+    template="""You are an assistant answering questions about Pondicherry University from an exact database result.
+    Answer the question using only the result below. Quote the numbers exactly; use a markdown table when there are several rows.
+    If the result is empty, say that no matching records were found.
+
+    Question: {question}
+
+    SQL: {query}
+
+    Result:
+    {result}
+    """,
+    input_variables=["question", "query", "result"],
+)
+
+sql_answer_chain = (sql_answer_prompt | lazy_chat(base_llm, temperature=0) | StrOutputParser()).with_config(tags=["answer"])
+
+sql_executor = SqlExecutor()
+
 # Router
-router_llm = ChatGroq(model=heavier_llm)
+router_llm = lazy_chat(heavier_llm)
 
 router_prompt = PromptTemplate(
     template="""You are an expert routing model designed for GPT-OSS-120B.
@@ -135,6 +316,7 @@ router_prompt = PromptTemplate(
             - "basic"        → For greetings or simple conversational messages that do NOT require any information retrieval or web search
             - "vectorstore"  → For questions that can be answered using internal or curated knowledge
             - "web_search"   → For questions that require real-time, current, or latest information
+            - "sql"          → For counts, totals, averages, rankings or breakdowns over faculty records
 
             Routing Rules:
             - If the user greets (e.g., "hi", "hello", "hey", "good morning") or writes a simple message that does not require retrieving information, choose "basic".
@@ -145,6 +327,8 @@ router_prompt = PromptTemplate(
             - Use "web_search" for questions that require:
             - Real-time or time-sensitive information
             - Latest updates, announcements, weather, or current events
+            - Use "sql" for aggregate questions about faculty (how many, average, oldest/youngest, by designation,
+            gender, experience or joining year); single-faculty lookups stay "vectorstore".
             - Semantic similarity is sufficient; exact keyword matching is NOT required.
 
             Examples:
@@ -164,6 +348,12 @@ router_prompt = PromptTemplate(
             Question: What is the latest circular?
             Answer: {{"datasource": "web_search"}}
 
+            Question: How many assistant professors are there?
+            Answer: {{"datasource": "sql"}}
+
+            Question: What is the average experience of female professors?
+            Answer: {{"datasource": "sql"}}
+
             Question to route:
             {question}
             """,
@@ -172,8 +362,24 @@ router_prompt = PromptTemplate(
 
 question_router = router_prompt | router_llm | JsonOutputParser()
 
-# Search
-web_search_tool = TavilySearch(k=3)
+# Local routing tier (rules + example centroids), LLM router only on low confidence
+components.register("fast_router", lambda: FastRouter(examples_from_prompt(router_prompt.template), components.get("embeddings")))
+
+def llm_route(question):
+    return question_router.invoke({"question": question})["datasource"]
+
+async def allm_route(question):
+    return (await question_router.ainvoke({"question": question}))["datasource"]
+
+# Search (over the shared Tavily connection pool), cached per query, one Document per result
+def build_web_search():
+    from langchain_tavily import TavilySearch
+
+    from http_clients import PooledTavilySearchAPIWrapper
+
+    return CachedWebSearch(TavilySearch(max_results=WEB_SEARCH_MAX_RESULTS, api_wrapper=PooledTavilySearchAPIWrapper()))
+
+components.register("web_search", build_web_search)
 
 # State
 class GraphState(TypedDict):
@@ -188,6 +394,9 @@ class GraphState(TypedDict):
         retry_count: hallucination retry attempts
         limit_exhausted: whether retry cap was hit
         decision: scratch key for routing decisions
+        sources: source labels for the final generation
+        cache_hit: whether the answer came from the semantic cache
+        context: compressed documents the generation (and its grading) used
     """
     question : str
     generation : str
@@ -196,8 +405,171 @@ class GraphState(TypedDict):
     retry_count: NotRequired[int]
     limit_exhausted: NotRequired[bool]
     decision: NotRequired[str]
+    sources: NotRequired[List[str]]
+    cache_hit: NotRequired[bool]
+    context: NotRequired[str]
+
+def document_sources(documents):
+    """Derive de-duplicated source labels from document metadata."""
+    sources = []
+    for d in documents or []:
+        label = document_label(d)
+        if label not in sources:
+            sources.append(label)
+    return sources
 
 # Nodes
+def check_cache(state):
+    """
+    Look the question up in the semantic answer cache
+
+    Args:
+        state (dict): The current graph state
+
+    Returns:
+        state (dict): cache_hit flag, plus the cached generation and sources on a hit
+    """
+    logger.info("---CHECK ANSWER CACHE---")
+    question = state["question"]
+
+    semantic_cache = components.get("semantic_cache")
+    cached = semantic_cache.lookup(question) if semantic_cache is not None else None
+    return _cache_result(question, cached)
+
+async def acheck_cache(state):
+    logger.info("---CHECK ANSWER CACHE---")
+    question = state["question"]
+    semantic_cache = components.get("semantic_cache")
+    cached = await semantic_cache.alookup(question) if semantic_cache is not None else None
+    return _cache_result(question, cached)
+
+def _cache_result(question, cached):
+    if cached is None:
+        logger.info("---CACHE MISS---")
+        return {"question": question, "cache_hit": False}
+
+    logger.info(f"---CACHE HIT (similarity {cached['similarity']:.3f})---")
+    return {
+        "question": question,
+        "generation": cached["generation"],
+        "sources": cached["sources"],
+        "documents": [],
+        "cache_hit": True,
+    }
+
+def cache_answer(state):
+    """
+    Store a verified generation in the semantic answer cache (unless it used web results)
+
+    Args:
+        state (dict): The current graph state
+
+    Returns:
+        state (dict): New key added to state, sources, derived from the documents
+    """
+    logger.info("---CACHE ANSWER---")
+    sources = document_sources(state.get("documents"))
+    semantic_cache = _answer_cache(state)
+    if semantic_cache is not None:
+        semantic_cache.store(state["question"], state["generation"], sources)
+    return {"sources": sources}
+
+async def acache_answer(state):
+    logger.info("---CACHE ANSWER---")
+    sources = document_sources(state.get("documents"))
+    semantic_cache = _answer_cache(state)
+    if semantic_cache is not None:
+        await semantic_cache.astore(state["question"], state["generation"], sources)
+    return {"sources": sources}
+
+def _answer_cache(state):
+    # Web results are time-sensitive: replaying them for SEMANTIC_CACHE_TTL would serve stale answers
+    if has_web_results(state.get("documents")):
+        logger.info("---SKIP CACHE (WEB RESULTS)---")
+        return None
+    return components.get("semantic_cache")
+
+def finalize(state):
+    """
+    Compact the thread state before it is checkpointed at the end of a turn
+
+    Args:
+        state (dict): The current graph state
+
+    Returns:
+        state (dict): sources for the answer; documents and per-turn retry
+        counters cleared so they are neither persisted nor carried into the next turn
+    """
+    logger.info("---FINALIZE---")
+    return {
+        "sources": state.get("sources") or document_sources(state.get("documents")),
+        "documents": [],
+        "context": "",
+        "retry_count": 0,
+        "limit_exhausted": False,
+    }
+
+def sql_query(state):
+    """
+    Answer an aggregate question with one read-only query on the faculty tables
+
+    Args:
+        state (dict): The current graph state
+
+    Returns:
+        state (dict): generation and a documents entry holding the query result;
+        decision "answered", or "fallback" to continue with retrieval
+    """
+    logger.info("---SQL QUERY---")
+    question = state["question"]
+
+    try:
+        plan = sql_query_chain.invoke(_sql_plan_inputs(question))
+        result = sql_executor.run(plan["query"], plan.get("params") or {})
+    except UnsafeQueryError as e:
+        logger.info(f"---SQL QUERY REJECTED: {e}---")
+        return {"decision": "fallback"}
+    except Exception as e:
+        logger.info(f"---SQL QUERY FAILED: {e}---")
+        return {"decision": "fallback"}
+
+    table = _log_sql_result(result)
+    generation = sql_answer_chain.invoke({"question": question, "query": result.query, "result": table})
+    return _sql_answer(question, result, table, generation)
+
+async def asql_query(state):
+    logger.info("---SQL QUERY---")
+    question = state["question"]
+
+    try:
+        plan = await sql_query_chain.ainvoke(_sql_plan_inputs(question))
+        # psycopg2 is blocking; keep it off the event loop
+        result = await asyncio.to_thread(sql_executor.run, plan["query"], plan.get("params") or {})
+    except UnsafeQueryError as e:
+        logger.info(f"---SQL QUERY REJECTED: {e}---")
+        return {"decision": "fallback"}
+    except Exception as e:
+        logger.info(f"---SQL QUERY FAILED: {e}---")
+        return {"decision": "fallback"}
+
+    table = _log_sql_result(result)
+    generation = await sql_answer_chain.ainvoke({"question": question, "query": result.query, "result": table})
+    return _sql_answer(question, result, table, generation)
+
+def _sql_plan_inputs(question):
+    return {"question": question, "schema": schema_description(), "max_rows": sql_executor.max_rows}
+
+def _log_sql_result(result):
+    logger.info(f"---SQL: {result.query} {result.params} -> {len(result.rows)} rows in {result.elapsed_ms:.1f}ms---")
+    return result.to_markdown()
+
+def _sql_answer(question, result, table, generation):
+    # Label the source by the report sections behind the tables the query actually read
+    sections = ", ".join(dict.fromkeys(source_section(name) for name in result.tables))
+    label = f"{sections} (database)" if sections else "database"
+    document = Document(page_content=table, metadata={"section": label, "sql": result.query})
+    return {"question": question, "generation": generation, "documents": [document], "decision": "answered"}
+
 def retrieve(state):
     """
     Retrieve documents from vectorstore
@@ -208,13 +580,19 @@ def retrieve(state):
     Returns:
         state (dict): New key added to state, documents, that contains retrieved documents
     """
-    print("---RETRIEVE---")
+    logger.info("---RETRIEVE---")
     question = state["question"]
 
     # Retrieval
     documents = retriever.invoke(question)
     return {"documents": documents, "question": question}
 
+async def aretrieve(state):
+    logger.info("---RETRIEVE---")
+    question = state["question"]
+    documents = await retriever.ainvoke(question)
+    return {"documents": documents, "question": question}
+
 def generate(state):
     """
     Generate answer using RAG on retrieved documents
@@ -223,15 +601,27 @@ def generate(state):
         state (dict): The current graph state
 
     Returns:
-        state (dict): New key added to state, generation, that contains LLM generation
+        state (dict): New keys added to state, generation, that contains LLM generation,
+        and context, the compressed documents it was generated from
     """
-    print("---GENERATE---")
+    logger.info("---GENERATE---")
     question = state["question"]
     documents = state["documents"]
     
+    # Deduplicated, query-relevant parts of the documents within CONTEXT_TOKEN_BUDGET
+    context = build_context(question, documents)
+
     # RAG generation
-    generation = rag_chain.invoke({"context": documents, "question": question})
-    return {"documents": documents, "question": question, "generation": generation}
+    generation = rag_chain.invoke({"context": context, "question": question})
+    return {"documents": documents, "question": question, "generation": generation, "context": context}
+
+async def agenerate(state):
+    logger.info("---GENERATE---")
+    question = state["question"]
+    documents = state["documents"]
+    context = build_context(question, documents)
+    generation = await rag_chain.ainvoke({"context": context, "question": question})
+    return {"documents": documents, "question": question, "generation": generation, "context": context}
 
 def grade_documents(state):
     """
@@ -245,23 +635,40 @@ def grade_documents(state):
         state (dict): Filtered out irrelevant documents and updated web_search state
     """
 
-    print("---CHECK DOCUMENT RELEVANCE TO QUESTION---")
+    logger.info("---CHECK DOCUMENT RELEVANCE TO QUESTION---")
     question = state["question"]
     documents = state["documents"]
     
-    # Score each doc
+    # Score all docs in one concurrent pass (results keep document order)
+    results = document_grader.batch(
+        [{"question": question, "document": d.page_content} for d in documents],
+        config={"max_concurrency": GRADER_MAX_CONCURRENCY},
+    )
+    return _filter_graded(question, documents, results)
+
+async def agrade_documents(state):
+    logger.info("---CHECK DOCUMENT RELEVANCE TO QUESTION---")
+    question = state["question"]
+    documents = state["documents"]
+    results = await document_grader.abatch(
+        [{"question": question, "document": d.page_content} for d in documents],
+        config={"max_concurrency": GRADER_MAX_CONCURRENCY},
+    )
+    return _filter_graded(question, documents, results)
+
+def _filter_graded(question, documents, results):
     filtered_docs = []
     web_search = "No"
-    for d in documents:
-        score = retrieval_grader.invoke({"question": question, "document": d.page_content})
-        grade = score['score']
+    for i, (d, result) in enumerate(zip(documents, results)):
+        grade = result["score"]['score']
+        logger.info(f"---GRADE: DOCUMENT {i} GRADED IN {result['latency'] * 1000:.0f}ms---")
         # Document relevant
         if grade.lower() == "yes":
-            print("---GRADE: DOCUMENT RELEVANT---")
+            logger.info("---GRADE: DOCUMENT RELEVANT---")
             filtered_docs.append(d)
         # Document not relevant
         else:
-            print("---GRADE: DOCUMENT NOT RELEVANT---")
+            logger.info("---GRADE: DOCUMENT NOT RELEVANT---")
             # We do not include the document in filtered_docs
             # We set a flag to indicate that we want to run web search
             web_search = "Yes"
@@ -276,27 +683,37 @@ def web_search(state):
         state (dict): The current graph state
 
     Returns:
-        state (dict): Appended web results to documents
+        state (dict): Appended web results (new URLs only) to documents
     """
 
-    print("---WEB SEARCH---")
+    logger.info("---WEB SEARCH---")
     question = state["question"]
     documents = state.get("documents", [])
 
+    # Retry loops come back here with the same question; its results are already in documents
+    if searched_in_request(documents, question):
+        logger.info("---WEB SEARCH: ALREADY SEARCHED IN THIS REQUEST---")
+        return {"documents": documents, "question": question}
+
     # Web search
-    docs = web_search_tool.invoke({"query": question})
-    web_results = "\n".join([d["content"] for d in docs["results"]])
-    web_results = Document(page_content=web_results)
-    if documents is not None:
-        documents.append(web_results)
-    else:
-        documents = [web_results]
-    return {"documents": documents, "question": question }
+    results = components.get("web_search").search(question)
+    return {"documents": merge_web_results(documents, results), "question": question}
+
+async def aweb_search(state):
+    logger.info("---WEB SEARCH---")
+    question = state["question"]
+    documents = state.get("documents", [])
+    if searched_in_request(documents, question):
+        logger.info("---WEB SEARCH: ALREADY SEARCHED IN THIS REQUEST---")
+        return {"documents": documents, "question": question}
+    results = await components.get("web_search").asearch(question)
+    return {"documents": merge_web_results(documents, results), "question": question}
 
 # Conditional edge
 def route_question(state):
     """
     Route question to web search or RAG.
+    Local rules/centroid routing first, the LLM router only when not confident.
 
     Args:
         state (dict): The current graph state
@@ -305,30 +722,72 @@ def route_question(state):
         str: Next node to call
     """
 
-    print("---ROUTE QUESTION---")
+    logger.info("---ROUTE QUESTION---")
     question = state["question"]
-    print(question)
-    source = question_router.invoke({"question": question})  
-    print(source)
-    print(source['datasource'])
+    logger.debug(question)
+    decision = components.get("fast_router").route(question, llm_route)
+    return _route_target(decision)
+
+async def aroute_question(state):
+    logger.info("---ROUTE QUESTION---")
+    question = state["question"]
+    logger.debug(question)
+    decision = await components.get("fast_router").aroute(question, allm_route)
+    return _route_target(decision)
+
+def _route_target(decision):
+    logger.info(f"---ROUTING DECISION: {decision.datasource} via {decision.tier} "
+          f"(confidence {decision.confidence:.2f}, {decision.latency_ms:.2f}ms)---")
+    source = {"datasource": decision.datasource}
     if source['datasource'] == 'web_search':
-        print("---ROUTE QUESTION TO WEB SEARCH---")
+        logger.info("---ROUTE QUESTION TO WEB SEARCH---")
         return "websearch"
     elif source['datasource'] == 'vectorstore':
-        print("---ROUTE QUESTION TO RAG---")
+        logger.info("---ROUTE QUESTION TO RAG---")
         return "vectorstore"
     elif source['datasource'] == 'basic':
-        print("---ROUTE QUESTION TO BASIC REPLY---")
+        logger.info("---ROUTE QUESTION TO BASIC REPLY---")
         return "basic"
+    elif source['datasource'] == 'sql':
+        logger.info("---ROUTE QUESTION TO SQL---")
+        return "sql"
+
+def route_cached_question(state):
+    """
+    Finish on a cache hit, otherwise route the question as usual.
+
+    Args:
+        state (dict): The current graph state
+
+    Returns:
+        str: Next node to call
+    """
+    if state.get("cache_hit"):
+        logger.info("---ROUTE QUESTION TO CACHED ANSWER---")
+        return "cached"
+    return route_question(state)
+
+async def aroute_cached_question(state):
+    if state.get("cache_hit"):
+        logger.info("---ROUTE QUESTION TO CACHED ANSWER---")
+        return "cached"
+    return await aroute_question(state)
 
 def basic_response(state):
-    print("---BASIC RESPONSE---")
+    logger.info("---BASIC RESPONSE---")
     question = state["question"]
 
-    print(question)
+    logger.debug(question)
     generate = basic_rag_chain.invoke({"question": question})
-    print(generate)
+    logger.debug(generate)
+
+    return { "question": question, "generation": generate }
 
+async def abasic_response(state):
+    logger.info("---BASIC RESPONSE---")
+    question = state["question"]
+    generate = await basic_rag_chain.ainvoke({"question": question})
+    logger.debug(generate)
     return { "question": question, "generation": generate }
 
 def decide_to_generate(state):
@@ -342,7 +801,7 @@ def decide_to_generate(state):
         str: Binary decision for next node to call
     """
 
-    print("---ASSESS GRADED DOCUMENTS---")
+    logger.info("---ASSESS GRADED DOCUMENTS---")
     question = state["question"]
     web_search = state["web_search"]
     filtered_documents = state["documents"]
@@ -350,11 +809,11 @@ def decide_to_generate(state):
     if web_search == "Yes":
         # All documents have been filtered check_relevance
         # We will re-generate a new query
-        print("---DECISION: ALL DOCUMENTS ARE NOT RELEVANT TO QUESTION, INCLUDE WEB SEARCH---")
+        logger.info("---DECISION: ALL DOCUMENTS ARE NOT RELEVANT TO QUESTION, INCLUDE WEB SEARCH---")
         return "websearch"
     else:
         # We have relevant documents, so generate answer
-        print("---DECISION: GENERATE---")
+        logger.info("---DECISION: GENERATE---")
         return "generate"
 
 # Conditional edge
@@ -369,30 +828,45 @@ def grade_generation_v_documents_and_question(state):
         str: Decision for next node to call
     """
 
-    print("---CHECK HALLUCINATIONS---")
+    logger.info("---CHECK HALLUCINATIONS---")
     question = state["question"]
     documents = state["documents"]
     generation = state["generation"]
 
-    score = hallucination_grader.invoke({"documents": documents, "generation": generation})
-    grade = score['score']
+    # Grade against the same compressed context the generation saw
+    context = state.get("context") or build_context(question, documents)
+    grade, answer_grade = run_generation_graders(question, context, generation)
+    return _generation_verdict(question, documents, context, generation, grade, answer_grade)
 
+async def agrade_generation_v_documents_and_question(state):
+    logger.info("---CHECK HALLUCINATIONS---")
+    question = state["question"]
+    documents = state["documents"]
+    generation = state["generation"]
+    context = state.get("context") or build_context(question, documents)
+    grade, answer_grade = await arun_generation_graders(question, context, generation)
+    return _generation_verdict(question, documents, context, generation, grade, answer_grade)
+
+def _generation_verdict(question, documents, context, generation, grade, answer_grade):
     # Check hallucination
     if grade == "yes":
-        print("---DECISION: GENERATION IS GROUNDED IN DOCUMENTS---")
+        logger.info("---DECISION: GENERATION IS GROUNDED IN DOCUMENTS---")
         # Check question-answering
-        print("---GRADE GENERATION vs QUESTION---")
-        score = answer_grader.invoke({"question": question,"generation": generation})
-        grade = score['score']
+        logger.info("---GRADE GENERATION vs QUESTION---")
+        grade = answer_grade
         if grade == "yes":
-            print("---DECISION: GENERATION ADDRESSES QUESTION---")
+            logger.info("---DECISION: GENERATION ADDRESSES QUESTION---")
             return "useful"
         else:
-            print("---DECISION: GENERATION DOES NOT ADDRESS QUESTION---")
+            logger.info("---DECISION: GENERATION DOES NOT ADDRESS QUESTION---")
+            if searched_in_request(documents, question):
+                # Searching again would add nothing; spend the retry budget instead of looping
+                logger.info("---DECISION: WEB ALREADY SEARCHED, RE-TRY---")
+                return "not supported"
             return "not useful"
     else:
-        print("---DECISION: GENERATION IS NOT GROUNDED IN DOCUMENTS, RE-TRY---")
-        print(f'question: {question}, documents: {documents}, generation: {generation}, grade: {grade}')
+        logger.info("---DECISION: GENERATION IS NOT GROUNDED IN DOCUMENTS, RE-TRY---")
+        logger.debug(f'question: {question}, context: {context}, generation: {generation}, grade: {grade}')
         return "not supported"
 
 
@@ -430,20 +904,38 @@ def handle_hallucination(state):
 # Build workflow
 workflow = StateGraph(GraphState)
 
-# Define the nodes
-workflow.add_node("websearch", web_search) # web search
-workflow.add_node("retrieve", retrieve) # retrieve
-workflow.add_node("grade_documents", grade_documents) # grade documents
-workflow.add_node("generate", generate) # generate
-workflow.add_node("basic_response", basic_response)
+# Define the nodes. Nodes doing I/O get an async variant, used by ainvoke/astream
+# (the API) so requests share the event loop instead of a thread each; pure
+# nodes stay sync and are run inline.
+workflow.add_node("websearch", RunnableLambda(web_search, afunc=aweb_search)) # web search
+workflow.add_node("retrieve", RunnableLambda(retrieve, afunc=aretrieve)) # retrieve
+workflow.add_node("grade_documents", RunnableLambda(grade_documents, afunc=agrade_documents)) # grade documents
+workflow.add_node("generate", RunnableLambda(generate, afunc=agenerate)) # generate
+workflow.add_node("basic_response", RunnableLambda(basic_response, afunc=abasic_response))
+workflow.add_node("check_cache", RunnableLambda(check_cache, afunc=acheck_cache))
+workflow.add_node("cache_answer", RunnableLambda(cache_answer, afunc=acache_answer))
+workflow.add_node("finalize", finalize)
+workflow.add_node("sql_query", RunnableLambda(sql_query, afunc=asql_query))
 
 # Build graph
-workflow.set_conditional_entry_point(
-    route_question,
+workflow.set_entry_point("check_cache")
+workflow.add_conditional_edges(
+    "check_cache",
+    RunnableLambda(route_cached_question, afunc=aroute_cached_question),
     {
+        "cached": "finalize",
         "websearch": "websearch",
         "vectorstore": "retrieve",
-        "basic": "basic_response"
+        "basic": "basic_response",
+        "sql": "sql_query",
+    },
+)
+workflow.add_conditional_edges(
+    "sql_query",
+    lambda state: state.get("decision", "fallback"),
+    {
+        "answered": "cache_answer",
+        "fallback": "retrieve",
     },
 )
 
@@ -461,10 +953,10 @@ workflow.add_node("handle_hallucination", handle_hallucination)
 
 workflow.add_conditional_edges(
     "generate",
-    grade_generation_v_documents_and_question,
+    RunnableLambda(grade_generation_v_documents_and_question, afunc=agrade_generation_v_documents_and_question),
     {
         "not supported": "handle_hallucination",
-        "useful": END,
+        "useful": "cache_answer",
         "not useful": "websearch",
     },
 )
@@ -475,19 +967,56 @@ workflow.add_conditional_edges(
     {
         "retry": "generate",
         "fallback_websearch": "websearch",
-        "force_return": END,
+        "force_return": "finalize",
     },
 )
-workflow.set_finish_point("basic_response")
+workflow.add_edge("cache_answer", "finalize")
+workflow.add_edge("basic_response", "finalize")
+workflow.set_finish_point("finalize")
+
+# Compile (CHECKPOINTER_BACKEND selects memory, postgres or valkey; see checkpointing.py)
+# Connected on first use; a durable backend that is down raises instead of falling back to memory
+components.register("checkpoint_store", build_checkpoint_store)
+checkpointer = build_checkpointer(store_factory=lambda: components.get("checkpoint_store"))
+agent = workflow.compile(checkpointer=checkpointer)
+
+# Tracing: conditional edges (the router runs in route_cached_question) are timed like nodes
+traced_edges = graph_edge_names(workflow)
+
+def new_trace(thread_id=None):
+    """Per-request tracer to pass in the run config's callbacks (see telemetry.py)."""
+    return RequestTrace(thread_id=thread_id, edges=traced_edges)
+
+def embedding_cache_stats():
+    # Scraping /metrics must not build the embedder
+    embeddings = components.peek("embeddings")
+    return {(k,): embeddings.stats()[k] for k in ("hits", "misses")} if embeddings is not None else {}
+
+REGISTRY.gauge_callback(
+    "campusgpt_embedding_cache", "Embedding cache hits/misses since start", embedding_cache_stats, ["result"],
+)
 
-# Compile
-memory = MemorySaver()
-agent = workflow.compile(checkpointer=memory)
+def retrieval_cache_stats():
+    retrieval_cache = components.peek("retrieval_cache")
+    return {(k,): retrieval_cache.stats()[k] for k in ("hits", "misses")} if retrieval_cache is not None else {}
+
+REGISTRY.gauge_callback(
+    "campusgpt_retrieval_cache", "Retrieval cache hits/misses since start", retrieval_cache_stats, ["result"],
+)
+
+def web_search_cache_stats():
+    web_search = components.peek("web_search")
+    return {(k,): web_search.stats()[k] for k in ("hits", "misses")} if web_search is not None else {}
+
+REGISTRY.gauge_callback(
+    "campusgpt_web_search_cache", "Web search cache hits/misses since start", web_search_cache_stats, ["result"],
+)
 
 # Interactive loop
 if __name__ == "__main__":
-    config = {"configurable": {"thread_id": "1"}}
-    
+    # Show node progress on the console unless AGENT_LOG_LEVEL says otherwise
+    configure_logging(os.getenv("AGENT_LOG_LEVEL", "INFO").upper())
+
     print("RAG Chatbot initialized. Type 'x' to exit.")
     while True:
         user_input = input("\nYou: ")
@@ -495,9 +1024,18 @@ if __name__ == "__main__":
             break
         
         inputs = {"question": user_input}
+        trace = new_trace("1")
+        config = {"configurable": {"thread_id": "1"}, "callbacks": [trace]}
         for output in agent.stream(inputs, config=config):
             for key, value in output.items():
                 pprint.pprint(f"Finished running: {key}:")
         
         if "generation" in value:
-            pprint.pprint(value["generation"])
\ No newline at end of file
+            pprint.pprint(value["generation"])
+
+        summary = trace.finish(agent.get_state(config).values)
+        print(f"\n{summary['ms']:.0f}ms, {summary['llm_calls']} LLM calls, "
+              f"{summary['tokens_in']} tokens in / {summary['tokens_out']} out, {summary['retries']} retries")
+        for span in summary["spans"]:
+            print(f"  {span['node']:<45} {span['ms']:>8.1f}ms  llm={span['llm_calls']} "
+                  f"in={span['tokens_in']} out={span['tokens_out']}")
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""
+In-memory lookup API over the precomputed statistics.
+
+The summary materialized views and typed NIRF tables built by
+`agent/extraction/extraction.py` are small, so `AggregateStore` reads all of
+them in one connection and serves lookups from memory (dict reads, well under
+a millisecond). The snapshot is reloaded after `AGGREGATES_TTL` seconds, or
+on demand with `refresh()`.
+
+    store = AggregateStore()
+    store.get("faculty_by_designation")
+    store.lookup("faculty_by_designation", designation="professor")
+    store.lookup("nirf_placements", program="PG", graduation_year="2023-24")
+"""
+
+import os
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from sql_executor import NIRF_READER_DATABASE_URL, reader_dsn, require_reader_dsn
+
+
+AGGREGATES_TTL = int(os.getenv("AGGREGATES_TTL", "300"))
+
+# Views/tables served by the store, with their default ordering
+AGGREGATE_TABLES = {
+    "faculty_overview": "",
+    "faculty_by_designation": "total DESC",
+    "faculty_by_gender": "total DESC",
+    "faculty_by_association": "total DESC",
+    "faculty_by_qualification": "total DESC",
+    "faculty_experience_buckets": "bucket_order",
+    "faculty_joinings_by_year": "year",
+    "nirf_intake": "program, academic_year",
+    "nirf_placements": "program, intake_year",
+    "nirf_expenditure": "category, item, academic_year",
+}
+
+
+def _plain(value):
+    """Decimal -> float so rows are JSON friendly."""
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def _coerce(expected, value):
+    """Convert a string filter to the type of the stored value when possible."""
+    if not isinstance(expected, str) or value is None or isinstance(value, str):
+        return expected
+    if isinstance(value, bool):
+        return expected.lower() in ("true", "1", "yes")
+    try:
+        return type(value)(expected)
+    except (TypeError, ValueError):
+        return expected
+
+
+class AggregateStore:
+    """Snapshot of every aggregate table, refreshed on a TTL."""
+
+    def __init__(self, dsn: str = NIRF_READER_DATABASE_URL, ttl: int = AGGREGATES_TTL):
+        self.dsn = reader_dsn(dsn)
+        self.ttl = ttl
+        self._tables: Dict[str, List[dict]] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self) -> Dict[str, int]:
+        """Reload every table; missing ones (not built yet) are skipped. Returns row counts."""
+        import psycopg2
+
+        tables = {}
+        conn = psycopg2.connect(require_reader_dsn(self.dsn))
+        try:
+            conn.set_session(readonly=True)
+            with conn.cursor() as cur:
+                for name, order in AGGREGATE_TABLES.items():
+                    cur.execute("SAVEPOINT aggregate")
+                    try:
+                        cur.execute(f"SELECT * FROM {name}" + (f" ORDER BY {order}" if order else ""))
+                    except psycopg2.errors.UndefinedTable:
+                        cur.execute("ROLLBACK TO SAVEPOINT aggregate")
+                        continue
+                    columns = [d[0] for d in cur.description]
+                    tables[name] = [dict(zip(columns, map(_plain, row))) for row in cur.fetchall()]
+        finally:
+            conn.rollback()
+            conn.close()
+
+        with self._lock:
+            self._tables = tables
+            self._loaded_at = time.monotonic()
+        return {name: len(rows) for name, rows in tables.items()}
+
+    def _snapshot(self) -> Dict[str, List[dict]]:
+        if time.monotonic() - self._loaded_at > self.ttl:
+            # One reload at a time; the others reuse its result
+            with self._refresh_lock:
+                if time.monotonic() - self._loaded_at > self.ttl:
+                    self.refresh()
+        return self._tables
+
+    def names(self) -> List[str]:
+        return list(self._snapshot())
+
+    def get(self, name: str) -> List[dict]:
+        """All rows of an aggregate (shared; do not mutate)."""
+        tables = self._snapshot()
+        if name not in tables:
+            raise KeyError(f"Unknown aggregate: {name}")
+        return tables[name]
+
+    def lookup(self, name: str, **filters: Any) -> List[dict]:
+        """
+        Rows whose columns equal the filters. Strings compare case-insensitively;
+        string filters (e.g. from a query string) are coerced to the column's type.
+        """
+        def matches(row):
+            for column, expected in filters.items():
+                value = row.get(column)
+                expected = _coerce(expected, value)
+                if isinstance(value, str) and isinstance(expected, str):
+                    if value.lower() != expected.lower():
+                        return False
+                elif value != expected:
+                    return False
+            return True
+
+        return [row for row in self.get(name) if matches(row)]
@@ -0,0 +1,514 @@
+"""
+Offline benchmark for the agent graph.
+
+Builds `agent_graph` with every network dependency replaced by an in-process
+stand-in, then replays a question corpus at a given concurrency and reports
+latency percentiles, throughput and LLM calls per path:
+
+    ChatGroq                      -> FakeChatModel: answers each prompt kind (router,
+                                     graders, SQL writer, generation) deterministically
+                                     after an injected delay
+    GoogleGenerativeAIEmbeddings  -> DeterministicFakeEmbedding (+ delay)
+    Qdrant                        -> InMemoryVectorStore over the real markdown chunks (+ delay;
+                                     with --multi-collection, one store per PU_* collection)
+    TavilySearch                  -> canned results (+ delay)
+    SqlExecutor                   -> validates the query, returns a canned table (+ delay)
+
+The caches, checkpointer and BM25 index live in a temp dir, so a run touches
+nothing on disk. The corpus is the router prompt examples plus the
+`extraction/sample_queries.py` titles (plus `--questions FILE`, one per line);
+each question's route is known, and the fake router answers with it.
+
+Grader outcomes are a deterministic function of the prompt, so the same
+question takes the same path on every run; `--irrelevant-rate`,
+`--ungrounded-rate` and `--not-useful-rate` set how often they fail.
+
+Usage (from agent/sementic-agent):
+    python benchmark.py                                   # corpus x3, concurrency 4
+    python benchmark.py --concurrency 16 --repeat 10
+    python benchmark.py --generate-latency 0.8 --grader-latency 0.2 --mode async
+    python benchmark.py --ungrounded-rate 0.3 --output results.json
+    python benchmark.py --multi-collection --mode async
+"""
+
+import argparse
+import ast
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.vectorstores import InMemoryVectorStore
+
+
+AGENT_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_PATH = os.path.join(AGENT_DIR, "..", "data", "parsed_data", "pondiuni_clean_final.md")
+SAMPLE_QUERIES_PATH = os.path.join(AGENT_DIR, "..", "extraction", "sample_queries.py")
+
+
+@dataclass
+class BenchmarkConfig:
+    # Injected latencies, seconds
+    router_latency: float = 0.15
+    grader_latency: float = 0.1
+    generate_latency: float = 0.4
+    embed_latency: float = 0.005
+    retrieval_latency: float = 0.02
+    search_latency: float = 0.3
+    sql_latency: float = 0.01
+    jitter: float = 0.2
+    # Grader failure rates
+    irrelevant_rate: float = 0.15
+    ungrounded_rate: float = 0.1
+    not_useful_rate: float = 0.0
+    answer_words: int = 120
+    seed: int = 0
+    # question -> datasource, for the fake router
+    labels: Dict[str, str] = field(default_factory=dict)
+
+
+CONFIG = BenchmarkConfig()
+_random = random.Random(0)
+
+# Calls per prompt kind, across all requests
+llm_calls = Counter()
+_calls_lock = threading.Lock()
+
+# (kind, marker in the prompt); first match wins, anything else is a generation
+PROMPT_KINDS = [
+    ("route", "Question to route:"),
+    ("relevance", "assessing relevance"),
+    ("grounded", "grounded in / supported by"),
+    ("useful", "useful to resolve a question"),
+    ("sql", "PostgreSQL SELECT"),
+]
+KIND_LATENCY = {
+    "route": "router_latency", "sql": "router_latency",
+    "relevance": "grader_latency", "grounded": "grader_latency", "useful": "grader_latency",
+    "generate": "generate_latency",
+}
+FAKE_SQL = "SELECT designation, total FROM faculty_by_designation ORDER BY total DESC"
+
+
+def _delay(seconds: float) -> float:
+    if seconds <= 0:
+        return 0.0
+    return seconds * _random.uniform(1 - CONFIG.jitter, 1 + CONFIG.jitter)
+
+
+def _fails(prompt: str, rate: float) -> bool:
+    """Deterministic coin flip per (seed, prompt)."""
+    if rate <= 0:
+        return False
+    digest = hashlib.sha256(f"{CONFIG.seed}|{prompt}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64 < rate
+
+
+def route_label(question: str) -> str:
+    from routing import rule_decision
+
+    if question in CONFIG.labels:
+        return CONFIG.labels[question]
+    decision = rule_decision(question)
+    return decision.datasource if decision else "vectorstore"
+
+
+def fake_response(prompt: str):
+    """(kind, text) the stand-in LLM returns for a prompt."""
+    kind = next((k for k, marker in PROMPT_KINDS if marker in prompt), "generate")
+    if kind == "route":
+        question = prompt.rsplit("Question to route:", 1)[1].strip()
+        content = {"datasource": route_label(question)}
+    elif kind == "relevance":
+        relevant = not _fails(prompt, CONFIG.irrelevant_rate)
+        content = {"score": "yes" if relevant else "no", "explanation": "benchmark grade"}
+    elif kind == "grounded":
+        content = {"score": "no" if _fails(prompt, CONFIG.ungrounded_rate) else "yes"}
+    elif kind == "useful":
+        content = {"score": "no" if _fails(prompt, CONFIG.not_useful_rate) else "yes"}
+    elif kind == "sql":
+        content = {"query": FAKE_SQL, "params": {}}
+    else:
+        words = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return kind, " ".join(words[i % 60:i % 60 + 4] for i in range(CONFIG.answer_words))
+    return kind, json.dumps(content)
+
+
+class FakeChatModel(BaseChatModel):
+    """ChatGroq stand-in; `model`, `temperature` and the HTTP clients are accepted and ignored."""
+
+    model: str = "fake"
+    temperature: Optional[float] = None
+    http_client: Any = None
+    http_async_client: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "benchmark-fake"
+
+    def _result(self, messages):
+        prompt = "\n".join(str(m.content) for m in messages)
+        kind, text = fake_response(prompt)
+        with _calls_lock:
+            llm_calls[kind] += 1
+        usage = {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        message = AIMessage(content=text, usage_metadata=usage)
+        return kind, ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        kind, result = self._result(messages)
+        time.sleep(_delay(getattr(CONFIG, KIND_LATENCY[kind])))
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        kind, result = self._result(messages)
+        await asyncio.sleep(_delay(getattr(CONFIG, KIND_LATENCY[kind])))
+        return result
+
+    def with_structured_output(self, schema=None, *, method="json_mode", include_raw=False, **kwargs):
+        return self | JsonOutputParser()
+
+
+class FakeEmbeddings(DeterministicFakeEmbedding):
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(_delay(CONFIG.embed_latency))
+        return super().embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(_delay(CONFIG.embed_latency))
+        return super().embed_query(text)
+
+
+class FakeVectorStore(InMemoryVectorStore):
+    def similarity_search(self, query, k=4, **kwargs):
+        time.sleep(_delay(CONFIG.retrieval_latency))
+        return super().similarity_search(query, k=k, **kwargs)
+
+    async def asimilarity_search(self, query, k=4, **kwargs):
+        await asyncio.sleep(_delay(CONFIG.retrieval_latency))
+        return super().similarity_search(query, k=k, **kwargs)
+
+
+class FakeQdrant:
+    """`QdrantVectorStore.from_existing_collection` returning an in-memory store over the corpus."""
+
+    documents: List = []
+
+    @classmethod
+    def from_existing_collection(cls, url=None, collection_name=None, embedding=None, **kwargs):
+        from collection_router import collection_for_document
+
+        documents = cls.documents
+        if collection_name and collection_name.startswith("PU_"):
+            documents = [d for d in documents if collection_for_document(d) == collection_name]
+        store = FakeVectorStore(embedding)
+        store.add_documents(documents)
+        return store
+
+
+class FakeSearch:
+    """TavilySearch stand-in."""
+
+    def __init__(self, k: int = 3, max_results: Optional[int] = None, **kwargs):
+        self.k = max_results or k
+
+    def invoke(self, inputs, config=None, **kwargs):
+        time.sleep(_delay(CONFIG.search_latency))
+        return self._results(inputs)
+
+    async def ainvoke(self, inputs, config=None, **kwargs):
+        await asyncio.sleep(_delay(CONFIG.search_latency))
+        return self._results(inputs)
+
+    def _results(self, inputs):
+        query = inputs["query"] if isinstance(inputs, dict) else str(inputs)
+        return {"query": query, "results": [
+            {"url": f"https://example.org/result/{i}", "title": f"Result {i}",
+             "content": f"Web result {i} for: {query}"}
+            for i in range(self.k)
+        ]}
+
+
+class FakeSqlExecutor:
+    """SqlExecutor stand-in: real validation, canned rows."""
+
+    def __init__(self, max_rows: int = 50):
+        self.max_rows = max_rows
+
+    def run(self, query, params=None):
+        from sql_executor import QueryResult, validate_query_tables
+
+        start = time.perf_counter()
+        query, tables = validate_query_tables(query, params)
+        time.sleep(_delay(CONFIG.sql_latency))
+        rows = [("Assistant Professor", 301), ("Professor", 169), ("Associate Professor", 73)]
+        return QueryResult(query=query, params=params or {}, columns=["designation", "total"], rows=rows,
+                           elapsed_ms=(time.perf_counter() - start) * 1000, tables=tables)
+
+
+def sample_query_questions(path: str = SAMPLE_QUERIES_PATH) -> List[str]:
+    """Turn the run_query titles of sample_queries.py into questions."""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    questions = []
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and getattr(node.func, "id", None) == "run_query"
+                and len(node.args) > 1 and isinstance(node.args[1], ast.Constant)):
+            title = node.args[1].value.split("(")[0].strip()
+            questions.append(f"What is the {title.lower()}?")
+    return questions
+
+
+def build_agent(args):
+    """Point the agent's storage at a temp dir, install the fakes and import agent_graph."""
+    workdir = tempfile.mkdtemp(prefix="campusgpt-bench-")
+    os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(workdir, "embedding_cache.sqlite3")
+    os.environ["BM25_INDEX_DIR"] = os.path.join(workdir, "bm25")
+    os.environ["COLLECTION_VERSION_DIR"] = os.path.join(workdir, "collection_versions")
+    os.environ["RETRIEVAL_CACHE_ENABLED"] = "false" if args.no_retrieval_cache else "true"
+    os.environ["MULTI_COLLECTION_RETRIEVAL"] = "true" if args.multi_collection else "false"
+    os.environ["CHECKPOINTER_BACKEND"] = "memory"
+    os.environ["SEMANTIC_CACHE_ENABLED"] = "true" if args.cache else "false"
+    # Nothing listens on port 1: the semantic cache falls back to memory immediately
+    os.environ["VALKEY_URL"] = "redis://127.0.0.1:1/0"
+    # The pooled Tavily wrapper is built (never called) at import and wants a key
+    os.environ.setdefault("TAVILY_API_KEY", "offline")
+    sys.path.insert(0, AGENT_DIR)
+
+    import langchain_google_genai
+    import langchain_groq
+    import langchain_qdrant
+    import langchain_tavily
+    import qdrant_client
+
+    from preprocessing.indexing import load_documents
+
+    normal, faculty = load_documents(args.source)
+    FakeQdrant.documents = normal + faculty
+    if not args.no_bm25:
+        from collection_router import split_by_collection
+        from hybrid_retrieval import BM25Index, bm25_index_path
+
+        BM25Index.build(FakeQdrant.documents).save(bm25_index_path("PONDICHERRY_UNIVERSITY_INFO"))
+        for collection, documents in split_by_collection(FakeQdrant.documents).items():
+            BM25Index.build(documents).save(bm25_index_path(collection))
+
+    langchain_groq.ChatGroq = FakeChatModel
+    langchain_google_genai.GoogleGenerativeAIEmbeddings = lambda **kwargs: FakeEmbeddings(size=args.embedding_size)
+    langchain_qdrant.QdrantVectorStore = FakeQdrant
+    langchain_tavily.TavilySearch = FakeSearch
+    # No async client: HybridRetriever falls back to the fake store's asimilarity_search
+    qdrant_client.AsyncQdrantClient = lambda **kwargs: None
+
+    import agent_graph
+
+    agent_graph.sql_executor = FakeSqlExecutor()
+    return agent_graph
+
+
+def load_corpus(agent_graph, extra_path: Optional[str] = None) -> List[str]:
+    """Router examples + sample query titles (+ a file of questions); routes go to CONFIG.labels."""
+    from routing import examples_from_prompt
+
+    for question, datasource in examples_from_prompt(agent_graph.router_prompt.template):
+        CONFIG.labels[question] = datasource
+    for question in sample_query_questions():
+        CONFIG.labels[question] = "sql"
+    questions = list(CONFIG.labels)
+    if extra_path:
+        with open(extra_path, "r", encoding="utf-8") as f:
+            questions += [line.strip() for line in f if line.strip()]
+    return questions
+
+
+def request_path(summary: dict) -> str:
+    """Route taken plus fallbacks, e.g. 'retrieve+websearch+2 retries'."""
+    if summary.get("cache_hit"):
+        return "cached"
+    nodes = summary["nodes"]
+    route = next((n for n in nodes if n in ("sql_query", "basic_response", "websearch", "retrieve")), "none")
+    path = route
+    if route == "sql_query" and "retrieve" in nodes:
+        path += ">retrieve"
+    if route != "websearch" and "websearch" in nodes:
+        path += "+websearch"
+    if summary["retries"]:
+        path += f"+{summary['retries']} retries"
+    return path
+
+
+def run_one(agent_graph, question: str, thread_id: str) -> dict:
+    trace = agent_graph.new_trace(thread_id)
+    config = {"configurable": {"thread_id": thread_id}, "callbacks": [trace]}
+    try:
+        state = agent_graph.agent.invoke({"question": question}, config=config)
+        return trace.finish(state)
+    except Exception as e:
+        return trace.finish(error=e)
+
+
+async def arun_one(agent_graph, question: str, thread_id: str) -> dict:
+    trace = agent_graph.new_trace(thread_id)
+    config = {"configurable": {"thread_id": thread_id}, "callbacks": [trace]}
+    try:
+        state = await agent_graph.agent.ainvoke({"question": question}, config=config)
+        return trace.finish(state)
+    except Exception as e:
+        return trace.finish(error=e)
+
+
+def replay(agent_graph, questions: List[str], concurrency: int, mode: str) -> List[dict]:
+    """Run every question (own thread_id each) with at most `concurrency` in flight."""
+    jobs = [(q, f"bench-{i}") for i, q in enumerate(questions)]
+    if mode == "threads":
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(lambda job: run_one(agent_graph, *job), jobs))
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(job):
+            async with semaphore:
+                return await arun_one(agent_graph, *job)
+
+        return await asyncio.gather(*(bounded(job) for job in jobs))
+
+    return asyncio.run(main())
+
+
+def percentiles(values: List[float]) -> dict:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0, "max": 0.0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 1), "p95": round(float(p95), 1), "p99": round(float(p99), 1),
+            "mean": round(float(np.mean(values)), 1), "max": round(float(np.max(values)), 1)}
+
+
+def summarize(results: List[dict], wall_seconds: float) -> dict:
+    ok = [r for r in results if r["outcome"] == "ok"]
+    by_path = defaultdict(list)
+    for r in ok:
+        by_path[request_path(r)].append(r)
+    by_node = defaultdict(list)
+    for r in ok:
+        for span in r["spans"]:
+            by_node[span["node"]].append(span)
+
+    return {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "error_samples": [r["error"] for r in results if r["outcome"] != "ok"][:5],
+        "wall_seconds": round(wall_seconds, 2),
+        "throughput_rps": round(len(results) / wall_seconds, 2) if wall_seconds else 0.0,
+        "latency_ms": percentiles([r["ms"] for r in ok]),
+        "llm_calls_per_request": round(sum(r["llm_calls"] for r in ok) / len(ok), 2) if ok else 0.0,
+        "tokens_per_request": round(sum(r["tokens_in"] + r["tokens_out"] for r in ok) / len(ok)) if ok else 0,
+        "llm_calls_by_kind": dict(llm_calls),
+        "paths": {
+            path: {
+                "requests": len(rs),
+                "latency_ms": percentiles([r["ms"] for r in rs]),
+                "llm_calls": round(sum(r["llm_calls"] for r in rs) / len(rs), 2),
+            }
+            for path, rs in sorted(by_path.items(), key=lambda item: -len(item[1]))
+        },
+        "nodes": {
+            node: {
+                "runs": len(spans),
+                "mean_ms": round(sum(s["ms"] for s in spans) / len(spans), 1),
+                "llm_calls": sum(s["llm_calls"] for s in spans),
+            }
+            for node, spans in sorted(by_node.items(), key=lambda item: -sum(s["ms"] for s in item[1]))
+        },
+    }
+
+
+def print_report(report: dict):
+    latency = report["latency_ms"]
+    print(f"\n{report['requests']} requests ({report['errors']} errors) in {report['wall_seconds']}s "
+          f"-> {report['throughput_rps']} req/s")
+    print(f"latency ms  p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  "
+          f"mean {latency['mean']}  max {latency['max']}")
+    print(f"LLM calls/request {report['llm_calls_per_request']}  tokens/request {report['tokens_per_request']}  "
+          f"by kind {report['llm_calls_by_kind']}")
+    for sample in report["error_samples"]:
+        print(f"  error: {sample}")
+
+    print(f"\n{'path':<36} {'n':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'llm':>6}")
+    for path, stats in report["paths"].items():
+        lat = stats["latency_ms"]
+        print(f"{path:<36} {stats['requests']:>5} {lat['p50']:>8} {lat['p95']:>8} {lat['p99']:>8} "
+              f"{stats['llm_calls']:>6}")
+
+    print(f"\n{'node':<45} {'runs':>6} {'mean ms':>9} {'llm':>6}")
+    for node, stats in report["nodes"].items():
+        print(f"{node:<45} {stats['runs']:>6} {stats['mean_ms']:>9} {stats['llm_calls']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline agent graph benchmark with stubbed LLMs and services")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3, help="times the corpus is replayed")
+    parser.add_argument("--warmup", type=int, default=5, help="requests run (and discarded) first")
+    parser.add_argument("--mode", choices=["threads", "async"], default="threads",
+                        help="invoke from a thread pool, or ainvoke on one event loop")
+    parser.add_argument("--questions", help="extra questions, one per line")
+    parser.add_argument("--source", default=SOURCE_PATH, help="markdown corpus for the fake vector store")
+    parser.add_argument("--cache", action="store_true", help="enable the semantic answer cache")
+    parser.add_argument("--no-bm25", action="store_true", help="dense retrieval only")
+    parser.add_argument("--no-retrieval-cache", action="store_true", help="disable the retrieval result cache")
+    parser.add_argument("--multi-collection", action="store_true", help="route retrieval across the PU_* collections")
+    parser.add_argument("--embedding-size", type=int, default=256)
+    parser.add_argument("--output", help="write the report as JSON")
+    for name, value in asdict(BenchmarkConfig()).items():
+        if name not in ("labels", "seed"):
+            parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for name in asdict(CONFIG):
+        if name != "labels":
+            setattr(CONFIG, name, getattr(args, name))
+    _random.seed(args.seed)
+
+    agent_graph = build_agent(args)
+    questions = load_corpus(agent_graph, args.questions)
+    print(f"Corpus: {len(questions)} questions x {args.repeat}, concurrency {args.concurrency}, mode {args.mode}")
+
+    if args.warmup:
+        replay(agent_graph, questions[:args.warmup], min(args.concurrency, args.warmup), args.mode)
+        llm_calls.clear()
+
+    start = time.perf_counter()
+    results = replay(agent_graph, questions * args.repeat, args.concurrency, args.mode)
+    report = summarize(results, time.perf_counter() - start)
+    report["config"] = {**{k: v for k, v in asdict(CONFIG).items() if k != "labels"},
+                        "concurrency": args.concurrency, "repeat": args.repeat, "mode": args.mode,
+                        "cache": args.cache, "bm25": not args.no_bm25,
+                        "multi_collection": args.multi_collection}
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
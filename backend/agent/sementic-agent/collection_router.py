@@ -0,0 +1,238 @@
+"""
+Multi-collection retrieval over the PU_* Qdrant collections.
+
+The corpus is split by topic so a query only searches the collections that can
+answer it (scoped searches stay fast as the corpus grows, and the 465 faculty
+rows stay out of policy questions):
+
+    PU_NIRF      intake, demographics, placements, expenditure (default for sections)
+    PU_RESEARCH  doctoral programs, patents, sponsored / consultancy projects, EDPs
+    PU_POLICIES  accessibility, NAAC, institutional policies, sustainability
+    PU_FACULTY   one document per faculty row
+
+`collection_for_document` assigns documents at indexing time (section heading or
+faculty metadata). At query time `CollectionRouter` scores each collection by
+its keyword hints plus the section headings and faculty names/designations in
+its BM25 index (terms shared by several collections count less). It picks every
+collection scoring at least COLLECTION_ROUTE_MIN_SHARE of the best, or all of
+them when nothing matches. `MultiCollectionRetriever` searches the picked
+collections concurrently and merges them with reciprocal rank fusion.
+
+Enabled with MULTI_COLLECTION_RETRIEVAL=true; otherwise the agent reads the
+single SINGLE_COLLECTION. `serving_collections` is what both the agent and
+`preprocessing/indexing.py` go by, so the indexer writes (vectors, BM25 index,
+version marker) exactly the collections the agent reads.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from hybrid_retrieval import HYBRID_TOP_K, RRF_K, build_retriever, reciprocal_rank_fusion, tokenize
+
+
+logger = logging.getLogger("campusgpt.agent")
+
+# The whole corpus in one collection (the default layout)
+SINGLE_COLLECTION = "PONDICHERRY_UNIVERSITY_INFO"
+
+MULTI_COLLECTION_RETRIEVAL = os.getenv("MULTI_COLLECTION_RETRIEVAL", "false").lower() == "true"
+COLLECTION_ROUTE_MIN_SHARE = float(os.getenv("COLLECTION_ROUTE_MIN_SHARE", "0.5"))
+
+# A keyword hint counts as much as this many unique heading/metadata terms
+KEYWORD_WEIGHT = 2.0
+# Metadata fields whose values are routing hints (besides the section heading)
+HINT_FIELDS = ("Section", "section", "faculty_name", "designation")
+
+
+@dataclass(frozen=True)
+class CollectionSpec:
+    name: str
+    # Section headings indexed into this collection (None: not matched by heading)
+    sections: Optional[re.Pattern]
+    # Query keywords pointing at this collection
+    keywords: re.Pattern
+
+
+NIRF = CollectionSpec(
+    "PU_NIRF",
+    None,
+    re.compile(r"\b(nirf|rank(ing)?|intake|admissions?|seats?|students?|demographics?|financial aid|scholarships?|"
+               r"reimburse\w*|placements?|placed|salary|salaries|median|graduat\w*|higher studies|"
+               r"expenditure|capital|operational|budget|spent|spending)\b", re.IGNORECASE),
+)
+RESEARCH = CollectionSpec(
+    "PU_RESEARCH",
+    re.compile(r"doctoral|patent|sponsored|consultancy|executive development", re.IGNORECASE),
+    re.compile(r"\b(research|ph\.?\s?d|doctoral|doctorates?|theses|thesis|patents?|sponsored|fund(s|ing)?|"
+               r"grants?|consultancy|projects?|executive development|edps?|mdps?|management development)\b",
+               re.IGNORECASE),
+)
+POLICIES = CollectionSpec(
+    "PU_POLICIES",
+    re.compile(r"accessib|naac|polic|sustainab", re.IGNORECASE),
+    re.compile(r"\b(polic(y|ies)|rules?|regulations?|naac|accredit\w*|accessib\w*|disab\w*|handicap\w*|ramps?|"
+               r"lifts?|sustainab\w*|environment\w*|green|solar|waste|rain ?water|energy|grievance|"
+               r"anti-?ragging|code of conduct)\b", re.IGNORECASE),
+)
+FACULTY = CollectionSpec(
+    "PU_FACULTY",
+    None,
+    re.compile(r"\b(faculty|faculties|professors?|teachers?|teaching staff|lecturers?|staff members?|"
+               r"designations?|qualifications?|experience|joined|joining)\b", re.IGNORECASE),
+)
+
+COLLECTIONS = [NIRF, RESEARCH, POLICIES, FACULTY]
+
+
+def collection_for_document(doc: Document) -> str:
+    """The PU_* collection a chunk is indexed into."""
+    metadata = doc.metadata or {}
+    if metadata.get("faculty_name"):
+        return FACULTY.name
+    heading = metadata.get("Section") or metadata.get("section") or ""
+    for spec in COLLECTIONS:
+        if spec.sections is not None and spec.sections.search(heading):
+            return spec.name
+    return NIRF.name
+
+
+def split_by_collection(documents: List[Document]) -> Dict[str, List[Document]]:
+    """Documents grouped by collection (every PU_* collection present, possibly empty)."""
+    groups = {spec.name: [] for spec in COLLECTIONS}
+    for doc in documents:
+        groups[collection_for_document(doc)].append(doc)
+    return groups
+
+
+def serving_collections(documents: List[Document], multi: bool = MULTI_COLLECTION_RETRIEVAL
+                        ) -> Dict[str, List[Document]]:
+    """Documents per collection the agent reads: the PU_* split, or everything in SINGLE_COLLECTION."""
+    return split_by_collection(documents) if multi else {SINGLE_COLLECTION: list(documents)}
+
+
+class CollectionRouter:
+    """Picks the collections to search for a query."""
+
+    def __init__(self, specs: List[CollectionSpec], documents: Optional[Dict[str, List[Document]]] = None,
+                 min_share: float = COLLECTION_ROUTE_MIN_SHARE):
+        self.specs = specs
+        self.min_share = min_share
+        # term -> {collection: weight}; a term found in n collections weighs 1/n in each
+        terms = {spec.name: self._hint_terms((documents or {}).get(spec.name, [])) for spec in specs}
+        spread = Counter(t for names in terms.values() for t in names)
+        self.term_weights: Dict[str, Dict[str, float]] = {}
+        for name, names in terms.items():
+            for term in names:
+                self.term_weights.setdefault(term, {})[name] = 1.0 / spread[term]
+
+    @staticmethod
+    def _hint_terms(documents: List[Document]) -> set:
+        terms = set()
+        for doc in documents:
+            for field in HINT_FIELDS:
+                value = (doc.metadata or {}).get(field)
+                if isinstance(value, str):
+                    # Initials and short fragments of names are too ambiguous to route on
+                    terms.update(t for t in tokenize(value) if len(t) > 2 and not t.isdigit())
+        return terms
+
+    def scores(self, query: str) -> Dict[str, float]:
+        scores = {spec.name: KEYWORD_WEIGHT * bool(spec.keywords.search(query)) for spec in self.specs}
+        for term in set(tokenize(query)):
+            for name, weight in self.term_weights.get(term, {}).items():
+                scores[name] += weight
+        return scores
+
+    def route(self, query: str) -> List[str]:
+        """Collections to search, best first (all of them when no hint matches)."""
+        scores = self.scores(query)
+        best = max(scores.values(), default=0.0)
+        if best <= 0:
+            return [spec.name for spec in self.specs]
+        picked = [name for name, score in scores.items() if score >= best * self.min_share]
+        return sorted(picked, key=scores.get, reverse=True)
+
+
+# Sync retrieval fans out over this pool (the async path uses asyncio.gather)
+retrieval_pool = ThreadPoolExecutor(max_workers=int(os.getenv("RETRIEVAL_POOL_SIZE", "8")),
+                                    thread_name_prefix="retrieval")
+
+
+class MultiCollectionRetriever(BaseRetriever):
+    """Routes a query to some collections, searches them concurrently and fuses the rankings."""
+
+    retrievers: Dict[str, Any]
+    router: Any
+    top_k: int = HYBRID_TOP_K
+    rrf_k: int = RRF_K
+
+    def _targets(self, query: str) -> List[str]:
+        names = [name for name in self.router.route(query) if name in self.retrievers]
+        logger.info(f"---RETRIEVE FROM {', '.join(names)}---")
+        return names
+
+    def _merge(self, names: List[str], rankings: List[List[Document]]) -> List[Document]:
+        tagged = [
+            [Document(page_content=d.page_content, metadata={**d.metadata, "collection": name}) for d in ranking]
+            for name, ranking in zip(names, rankings)
+        ]
+        if len(tagged) == 1:
+            return tagged[0][:self.top_k]
+        return [doc for doc, _ in reciprocal_rank_fusion(tagged, k=self.rrf_k)[:self.top_k]]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        names = self._targets(query)
+        config = {"callbacks": run_manager.get_child()}
+        if len(names) == 1:
+            return self._merge(names, [self.retrievers[names[0]].invoke(query, config=config)])
+        # Copy the context so callbacks/tracing follow each search into the pool thread
+        futures = [
+            retrieval_pool.submit(contextvars.copy_context().run, self.retrievers[name].invoke, query, config)
+            for name in names
+        ]
+        return self._merge(names, [future.result() for future in futures])
+
+    async def _aget_relevant_documents(self, query: str, *,
+                                       run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        names = self._targets(query)
+        config = {"callbacks": run_manager.get_child()}
+        rankings = await asyncio.gather(*(self.retrievers[name].ainvoke(query, config=config) for name in names))
+        return self._merge(names, list(rankings))
+
+
+def build_multi_collection_retriever(vectorstore_for: Callable[[str], Any], async_client=None, cache=None,
+                                     specs: List[CollectionSpec] = COLLECTIONS) -> MultiCollectionRetriever:
+    """
+    Hybrid retriever per PU_* collection behind a CollectionRouter.
+
+    Args:
+        vectorstore_for (callable): collection name -> vector store
+        async_client: shared AsyncQdrantClient, cache: shared RetrievalCache (both optional)
+
+    Returns:
+        MultiCollectionRetriever over the collections that could be opened
+    """
+    retrievers = {}
+    for spec in specs:
+        try:
+            retrievers[spec.name] = build_retriever(vectorstore_for(spec.name), spec.name,
+                                                    async_client=async_client, cache=cache)
+        except Exception as e:
+            logger.warning(f"Collection {spec.name} unavailable, skipping: {e}")
+    if not retrievers:
+        raise RuntimeError("No PU_* collection could be opened; run preprocessing/indexing.py")
+    # Routing hints come from what each collection's BM25 index holds
+    documents = {name: r.index.documents if r.index is not None else [] for name, r in retrievers.items()}
+    router = CollectionRouter([spec for spec in specs if spec.name in retrievers], documents)
+    return MultiCollectionRetriever(retrievers=retrievers, router=router)
@@ -0,0 +1,181 @@
+"""
+Lazily built, shared clients for the agent graph.
+
+Importing `agent_graph` used to connect to Qdrant, build every ChatGroq, the
+Gemini embedder and the Tavily tool, so an unreachable Qdrant failed the
+import and every worker paid the setup on boot. Instead the graph registers a
+factory per component and builds it on first use:
+
+    components.register("retriever", lambda: build_retriever(components.get("vectorstore"), ...))
+    retriever = lazy("retriever")                          # Runnable, resolved on first call
+    grader_llm = lazy_chat(base_llm, temperature=1, json_mode=True)
+
+Chat models are keyed by (model, temperature), so graders on the same model
+share one client. Provider SDKs are imported inside the factories, which keeps
+them off the import path too. A factory that fails (Qdrant down) is retried
+on the next use.
+
+`warm_up()` builds everything up front, for the API's startup
+(AGENT_WARM_UP=true) instead of the first request.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from langchain_core.runnables import Runnable
+
+
+logger = logging.getLogger("campusgpt.agent")
+
+
+class Components:
+    """Named component factories and the instances built from them."""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        # One lock per component, so a slow Qdrant connect does not hold up the LLM clients
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.build_ms: Dict[str, float] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], replace: bool = True):
+        with self._lock:
+            if replace or name not in self._factories:
+                self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+
+    def set(self, name: str, instance: Any):
+        """Use an already built instance for `name` (e.g. a benchmark fake)."""
+        with self._lock:
+            self._instances[name] = instance
+            self._locks.setdefault(name, threading.Lock())
+
+    def peek(self, name: str) -> Optional[Any]:
+        """The instance if it has been built, without building it."""
+        return self._instances.get(name)
+
+    def get(self, name: str) -> Any:
+        """The shared instance for `name`, built on first use."""
+        if name in self._instances:
+            return self._instances[name]
+        with self._lock:
+            if name not in self._factories:
+                raise KeyError(f"Unknown component: {name}")
+            lock = self._locks[name]
+        with lock:
+            if name not in self._instances:
+                start = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                self.build_ms[name] = (time.perf_counter() - start) * 1000
+                logger.info(f"---BUILT {name} IN {self.build_ms[name]:.0f}ms---")
+        return self._instances[name]
+
+    def names(self) -> list:
+        with self._lock:
+            return list(self._factories)
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Build components ahead of the first request.
+
+        Args:
+            names (list): components to build (default: all registered)
+
+        Returns:
+            dict: build time in ms per component, or the error for ones that failed
+        """
+        report = {}
+        for name in names or self.names():
+            try:
+                self.get(name)
+                report[name] = round(self.build_ms.get(name, 0.0), 1)
+            except Exception as e:
+                logger.warning(f"Warm-up of {name} failed: {e}")
+                report[name] = f"{type(e).__name__}: {e}"
+        return report
+
+
+components = Components()
+
+
+def chat_groq(model: str, **kwargs):
+    """ChatGroq on the process-wide keep-alive connection pools (see http_clients.py)."""
+    from langchain_groq import ChatGroq
+
+    from http_clients import async_http_client, http_client
+
+    return ChatGroq(model=model, http_client=http_client("groq"), http_async_client=async_http_client("groq"), **kwargs)
+
+
+def chat_model_name(model: str, temperature: Optional[float] = None) -> str:
+    """Register (once) and name the shared chat model for (model, temperature)."""
+    name = f"chat:{model}:{temperature}"
+    kwargs = {} if temperature is None else {"temperature": temperature}
+    components.register(name, lambda: chat_groq(model, **kwargs), replace=False)
+    return name
+
+
+class LazyRunnable(Runnable):
+    """
+    Runnable that looks its component up on every call and delegates to it.
+
+    The lookup is `components.get`, which is memoised, so a later
+    `components.set(...)` takes effect for wrappers created before it. `wrap`
+    (e.g. structured output) is applied once per distinct component instance.
+    """
+
+    def __init__(self, name: str, wrap: Optional[Callable[[Any], Runnable]] = None):
+        self._wrap = wrap
+        # (component instance, runnable built from it)
+        self._resolved = (None, None)
+        self.name = name
+
+    def resolve(self) -> Runnable:
+        instance = components.get(self.name)
+        cached, target = self._resolved
+        if instance is not cached:
+            target = self._wrap(instance) if self._wrap else instance
+            self._resolved = (instance, target)
+        return target
+
+    def invoke(self, input, config=None, **kwargs):
+        return self.resolve().invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        return await self.resolve().ainvoke(input, config, **kwargs)
+
+    def batch(self, inputs, config=None, *, return_exceptions=False, **kwargs):
+        return self.resolve().batch(inputs, config, return_exceptions=return_exceptions, **kwargs)
+
+    async def abatch(self, inputs, config=None, *, return_exceptions=False, **kwargs):
+        return await self.resolve().abatch(inputs, config, return_exceptions=return_exceptions, **kwargs)
+
+    def stream(self, input, config=None, **kwargs):
+        yield from self.resolve().stream(input, config, **kwargs)
+
+    async def astream(self, input, config=None, **kwargs):
+        async for chunk in self.resolve().astream(input, config, **kwargs):
+            yield chunk
+
+    def transform(self, input, config=None, **kwargs):
+        yield from self.resolve().transform(input, config, **kwargs)
+
+    async def atransform(self, input, config=None, **kwargs):
+        async for chunk in self.resolve().atransform(input, config, **kwargs):
+            yield chunk
+
+
+def lazy(name: str) -> LazyRunnable:
+    """Runnable standing in for the registered component `name`."""
+    return LazyRunnable(name)
+
+
+def lazy_chat(model: str, temperature: Optional[float] = None, json_mode: bool = False) -> LazyRunnable:
+    """Runnable standing in for the shared chat model (JSON mode output parsed when json_mode)."""
+    name = chat_model_name(model, temperature)
+    if json_mode:
+        return LazyRunnable(name, wrap=lambda chat: chat.with_structured_output(method="json_mode"))
+    return LazyRunnable(name)
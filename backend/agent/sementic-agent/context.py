@@ -0,0 +1,208 @@
+"""
+Context assembly for generation and the hallucination grader.
+
+Retrieved chunks are mostly wide markdown tables padded with spaces, and a web
+search fallback adds one long concatenated Tavily document, so passing the raw
+`documents` list puts thousands of mostly irrelevant tokens in every
+generation and grading prompt. `compress_context` turns them into a smaller
+context:
+
+1. Normalize: collapse cell padding and `|:-----|` separator rows.
+2. Split each document into units: table rows (the header row is kept with
+   any row that survives), sentences of prose, or the whole document when it
+   is short (a faculty record).
+3. Drop units already seen in an earlier document (overlapping chunks,
+   repeated web snippets).
+4. Score units by the idf-weighted query terms they contain; a matching
+   section heading or table header lends every unit under it half its score,
+   so "median salary of PG graduates" keeps the rows of the matching table.
+5. Keep the best units until CONTEXT_TOKEN_BUDGET, then restore document
+   order. When nothing matches, documents are truncated in order instead.
+
+`format_context` renders the result as numbered `[source n]` blocks for the
+prompt.
+"""
+
+import math
+import os
+import re
+from collections import Counter
+from typing import List, Tuple
+
+from langchain_core.documents import Document
+
+from hybrid_retrieval import tokenize
+
+
+CONTEXT_COMPRESSION = os.getenv("CONTEXT_COMPRESSION", "true").lower() == "true"
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2500"))
+
+# Documents shorter than this (tokens) are scored and kept as a single unit
+MIN_SPLIT_TOKENS = 100
+# Share of a heading/header match credited to the units under it
+HEADING_WEIGHT = 0.5
+
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[])")
+SEPARATOR_RE = re.compile(r"^\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?$")
+SPACES_RE = re.compile(r"[ \t]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return math.ceil(len(text) / 4)
+
+
+def document_label(doc: Document) -> str:
+    """Human-readable source label from a document's metadata."""
+    metadata = doc.metadata or {}
+    if metadata.get("faculty_name"):
+        return f"Faculty Details: {metadata['faculty_name']}"
+    return metadata.get("url") or metadata.get("section") or metadata.get("Section") or "web search"
+
+
+def _normalize_line(line: str) -> str:
+    line = line.strip()
+    if line.startswith("|"):
+        return "| " + " | ".join(cell.strip() for cell in line.strip("|").split("|")) + " |"
+    return SPACES_RE.sub(" ", line)
+
+
+def _units(text: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    Split a document into (heading, [(unit, table header or "")]).
+    Table rows carry their header row; separator rows are dropped.
+    """
+    heading = ""
+    units = []
+    header = None
+    prose = []
+
+    def flush_prose():
+        if prose:
+            units.extend((s, "") for s in SENTENCE_RE.split(" ".join(prose)) if s.strip())
+            prose.clear()
+
+    for raw in text.splitlines():
+        line = _normalize_line(raw)
+        if not line:
+            flush_prose()
+            header = None
+            continue
+        if line.startswith("Section:") and not heading and not units:
+            heading = line
+            continue
+        if line.startswith("|"):
+            flush_prose()
+            if SEPARATOR_RE.match(raw.strip()):
+                continue
+            if header is None:
+                header = line
+            else:
+                units.append((line, header))
+            continue
+        header = None
+        prose.append(line)
+    flush_prose()
+    return heading, units
+
+
+def _overlap(terms, weights) -> float:
+    return sum(weights.get(t, 0.0) for t in set(terms))
+
+
+def compress_context(question: str, documents: List[Document], budget: int = CONTEXT_TOKEN_BUDGET) -> List[Document]:
+    """
+    Keep the query-relevant, non-duplicate parts of `documents` within `budget` tokens.
+
+    Args:
+        question (str): the user question
+        documents (list): retrieved / web documents, best first
+
+    Returns:
+        list: compressed documents (same metadata, shortened page_content), in the original order
+    """
+    if not documents:
+        return []
+
+    # (doc index, position in doc, unit text, table header)
+    candidates = []
+    seen = set()
+    headings = {}
+    for i, doc in enumerate(documents):
+        text = doc.page_content or ""
+        if estimate_tokens(text) < MIN_SPLIT_TOKENS:
+            heading, units = "", [(" ".join(_normalize_line(l) for l in text.splitlines() if l.strip()), "")]
+        else:
+            heading, units = _units(text)
+        headings[i] = heading
+        for position, (unit, header) in enumerate(units):
+            key = " ".join(unit.lower().split())
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            candidates.append((i, position, unit, header))
+
+    query_terms = set(tokenize(question))
+    # idf over the candidate units: terms present everywhere say little
+    df = Counter(t for _, _, unit, _ in candidates for t in set(tokenize(unit)) & query_terms)
+    weights = {t: math.log(1 + len(candidates) / df[t]) for t in query_terms if df[t]}
+    weights.update({t: math.log(1 + len(candidates)) for t in query_terms if not df[t]})
+
+    scored = []
+    for i, position, unit, header in candidates:
+        score = _overlap(tokenize(unit), weights)
+        context_terms = tokenize(headings[i]) + tokenize(header)
+        score += HEADING_WEIGHT * _overlap(context_terms, weights)
+        scored.append((score, i, position, unit, header))
+
+    if not any(score > 0 for score, *_ in scored):
+        # Nothing matches the question (e.g. "tell me about the university"): take documents in order
+        ranked = sorted(scored, key=lambda s: (s[1], s[2]))
+    else:
+        ranked = sorted((s for s in scored if s[0] > 0), key=lambda s: (-s[0], s[1], s[2]))
+
+    kept = {}
+    used = 0
+    headers_used = set()
+    for score, i, position, unit, header in ranked:
+        cost = estimate_tokens(unit)
+        if header and (i, header) not in headers_used:
+            cost += estimate_tokens(header)
+        if i not in kept and headings[i]:
+            cost += estimate_tokens(headings[i])
+        if used + cost > budget:
+            continue
+        used += cost
+        if header:
+            headers_used.add((i, header))
+        kept.setdefault(i, []).append((position, unit, header))
+
+    compressed = []
+    for i in sorted(kept):
+        lines = [headings[i]] if headings[i] else []
+        last_header = None
+        for position, unit, header in sorted(kept[i]):
+            if header and header != last_header:
+                lines.append(header)
+            last_header = header or None
+            lines.append(unit)
+        compressed.append(Document(page_content="\n".join(lines), metadata=documents[i].metadata))
+    return compressed
+
+
+def format_context(documents: List[Document]) -> str:
+    """Numbered source blocks for the generation and grading prompts."""
+    blocks = []
+    for n, doc in enumerate(documents, 1):
+        label = document_label(doc)
+        # The label already names the section
+        content = doc.page_content.removeprefix(f"Section: {label}\n")
+        blocks.append(f"[source {n}] {label}\n{content}")
+    return "\n\n".join(blocks)
+
+
+def build_context(question: str, documents: List[Document]) -> str:
+    """Prompt context for a question: compressed (unless CONTEXT_COMPRESSION=false) and formatted."""
+    if CONTEXT_COMPRESSION:
+        documents = compress_context(question, documents)
+    return format_context(documents)
@@ -0,0 +1,174 @@
+"""
+Persistent embedding cache.
+
+`CachedEmbeddings` wraps any LangChain `Embeddings` and stores vectors in a
+SQLite file keyed by model name + task type + text hash, so a text that was
+embedded before (a repeated question, an unchanged chunk during re-indexing)
+never goes over the network again. The cache is bounded to `max_entries`;
+the least recently used vectors are evicted first.
+
+Several worker processes may share the file, so the entry count kept in memory
+is only an estimate that decides when to look; eviction recounts the table in
+its own write transaction. The async methods run every SQLite call (reads also
+write `last_access`, and each commit syncs the WAL) in a worker thread.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "embedding_cache.sqlite3"),
+)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+# Fraction of max_entries kept after an eviction pass, so we don't evict on every insert
+EVICTION_LOW_WATERMARK = 0.9
+
+
+class CachedEmbeddings(Embeddings):
+    """SQLite-backed, size-bounded cache in front of an embeddings model."""
+
+    def __init__(self, embeddings: Embeddings, path: str = EMBEDDING_CACHE_PATH,
+                 max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self.namespace = "{}|{}".format(
+            getattr(embeddings, "model", type(embeddings).__name__),
+            getattr(embeddings, "task_type", None) or "default",
+        )
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # A cache: losing the last commits on power loss is fine, an fsync per commit is not
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        # Rows this process inserted since it last counted; other workers' inserts are not
+        # in self._count, so it recounts after a tenth of the capacity at the latest
+        self._uncounted = 0
+
+    def _key(self, kind: str, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.namespace}|{kind}|{digest}"
+
+    def _get_many(self, keys: List[str]) -> dict:
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update({key: np.frombuffer(blob, dtype=np.float32).tolist() for key, blob in rows})
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_access = ? WHERE key = ?",
+                                       [(now, key) for key in found])
+                self._conn.commit()
+        return found
+
+    def _put_many(self, items: List[tuple]):
+        now = time.time()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items],
+            )
+            inserted = self._conn.total_changes - before
+            self._count += inserted
+            self._uncounted += inserted
+            if self._count > self.max_entries or self._uncounted > self.max_entries * (1 - EVICTION_LOW_WATERMARK):
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """
+        Recount, then drop least recently used vectors down to the low watermark.
+
+        Runs in the insert's transaction, which holds SQLite's write lock, so the
+        count includes every worker's rows and no other writer can interleave.
+        """
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._uncounted = 0
+        if self._count <= self.max_entries:
+            return
+        excess = self._count - int(self.max_entries * EVICTION_LOW_WATERMARK)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+            (excess,),
+        )
+        self._count -= excess
+
+    def _lookup(self, kind: str, texts: List[str]) -> tuple:
+        """(keys, cached vectors by key, missing keys, text by key)"""
+        keys = [self._key(kind, text) for text in texts]
+        cached = self._get_many(list(set(keys)))
+
+        missing = list(dict.fromkeys(k for k in keys if k not in cached))
+        self.hits += len(texts) - sum(k not in cached for k in keys)
+        self.misses += sum(k not in cached for k in keys)
+        return keys, cached, missing, dict(zip(keys, texts))
+
+    def _fill(self, keys, cached, missing, vectors) -> List[List[float]]:
+        fresh = dict(zip(missing, vectors))
+        if fresh:
+            self._put_many(list(fresh.items()))
+            cached.update({k: list(v) for k, v in fresh.items()})
+        return [cached[k] for k in keys]
+
+    def _embed(self, kind: str, texts: List[str], embed_fn) -> List[List[float]]:
+        keys, cached, missing, texts_by_key = self._lookup(kind, texts)
+        vectors = embed_fn([texts_by_key[k] for k in missing]) if missing else []
+        return self._fill(keys, cached, missing, vectors)
+
+    async def _aembed(self, kind: str, texts: List[str], aembed_fn) -> List[List[float]]:
+        # Lookups and inserts commit; keep them (and their lock) off the event loop
+        keys, cached, missing, texts_by_key = await asyncio.to_thread(self._lookup, kind, texts)
+        vectors = await aembed_fn([texts_by_key[k] for k in missing]) if missing else []
+        return await asyncio.to_thread(self._fill, keys, cached, missing, vectors)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed("document", texts, self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed("query", [text], lambda texts: [self.embeddings.embed_query(texts[0])])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self._aembed("document", texts, self.embeddings.aembed_documents)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        async def embed(texts):
+            return [await self.embeddings.aembed_query(texts[0])]
+        return (await self._aembed("query", [text], embed))[0]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,108 @@
+"""
+Shared keep-alive HTTP connection pools for the providers the agent calls.
+
+Without these, every ChatGroq instance opens its own pool and the Tavily
+wrapper opens a fresh connection (sync) or aiohttp session (async) per
+search, so each request pays new TCP + TLS handshakes. Here each provider gets
+one `httpx.Client` and one `httpx.AsyncClient`, created on first use and
+shared by every caller:
+
+    ChatGroq(..., http_client=http_client("groq"), http_async_client=async_http_client("groq"))
+
+Gemini embeddings (google-genai) and Qdrant (`AsyncQdrantClient`) already keep
+one pooled client per instance, and the agent builds a single instance of
+each.
+
+The async clients belong to the event loop that first uses them (the API's),
+so scripts that call `asyncio.run` more than once should close them in
+between with `aclose_http_clients()`.
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict
+
+import httpx
+from langchain_tavily._utilities import TAVILY_API_URL, TavilySearchAPIWrapper
+
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "200"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "50"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "60"))
+
+_clients: Dict[str, httpx.Client] = {}
+_async_clients: Dict[str, httpx.AsyncClient] = {}
+_lock = threading.Lock()
+
+
+def _options() -> dict:
+    return {
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(HTTP_TIMEOUT, connect=10.0),
+    }
+
+
+def http_client(provider: str) -> httpx.Client:
+    """Shared sync client for a provider."""
+    with _lock:
+        if provider not in _clients:
+            _clients[provider] = httpx.Client(**_options())
+        return _clients[provider]
+
+
+def async_http_client(provider: str) -> httpx.AsyncClient:
+    """Shared async client for a provider."""
+    with _lock:
+        if provider not in _async_clients or _async_clients[provider].is_closed:
+            _async_clients[provider] = httpx.AsyncClient(**_options())
+        return _async_clients[provider]
+
+
+def close_http_clients():
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+async def aclose_http_clients():
+    """Close the async pools (FastAPI shutdown)."""
+    with _lock:
+        clients = list(_async_clients.values())
+        _async_clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+class PooledTavilySearchAPIWrapper(TavilySearchAPIWrapper):
+    """Tavily search over the shared `tavily` pools instead of a new connection per call."""
+
+    def _request(self, query: str, kwargs: Dict[str, Any]) -> tuple:
+        params = {"query": query, **{k: v for k, v in kwargs.items() if v is not None}}
+        headers = {
+            "Authorization": f"Bearer {self.tavily_api_key.get_secret_value()}",
+            "Content-Type": "application/json",
+            "X-Client-Source": "langchain-tavily",
+        }
+        return f"{self.api_base_url or TAVILY_API_URL}/search", params, headers
+
+    @staticmethod
+    def _parse(response: httpx.Response) -> Dict[str, Any]:
+        if response.status_code != 200:
+            raise ValueError(f"Error {response.status_code}: {response.text[:200]}")
+        return json.loads(response.text)
+
+    def raw_results(self, query: str, **kwargs: Any) -> Dict[str, Any]:
+        url, params, headers = self._request(query, kwargs)
+        return self._parse(http_client("tavily").post(url, json=params, headers=headers))
+
+    async def raw_results_async(self, query: str, **kwargs: Any) -> Dict[str, Any]:
+        url, params, headers = self._request(query, kwargs)
+        return self._parse(await async_http_client("tavily").post(url, json=params, headers=headers))
@@ -0,0 +1,246 @@
+"""
+Hybrid lexical + dense retrieval.
+
+`BM25Index` is a small Okapi BM25 index over the same chunks that are stored in
+Qdrant. It is built by `preprocessing/indexing.py` and saved as JSON next to the
+manifest (`data/bm25/<collection>.json`). `HybridRetriever` runs the dense
+retriever and the BM25 index for a question and fuses both rankings with
+reciprocal rank fusion, so exact lookups (faculty names, table headings such as
+"Consultancy Projects Revenue", academic years like "2021-22") reach the top
+even when their embeddings are not the closest.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+
+logger = logging.getLogger("campusgpt.agent")
+
+
+BM25_INDEX_DIR = os.getenv(
+    "BM25_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "bm25"),
+)
+HYBRID_DENSE_K = int(os.getenv("HYBRID_DENSE_K", "10"))
+HYBRID_LEXICAL_K = int(os.getenv("HYBRID_LEXICAL_K", "10"))
+HYBRID_TOP_K = int(os.getenv("HYBRID_TOP_K", "4"))
+HYBRID_DENSE_WEIGHT = float(os.getenv("HYBRID_DENSE_WEIGHT", "1.0"))
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Most chunks are table rows, so question words are rare in the corpus and
+# would otherwise get a high idf
+STOPWORDS = frozenset("""
+a about an and any are as at be by can did do does for from give has have how i in
+is it list me of on or show tell than that the their there these this to was what
+when where which who whom whose why will with
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric tokens without stopwords; '2021-22' becomes ['2021', '22']."""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def bm25_index_path(collection: str, directory: str = BM25_INDEX_DIR) -> str:
+    return os.path.join(directory, f"{collection}.json")
+
+
+def document_key(doc: Document) -> str:
+    """Identity used to match the same chunk across rankings (its content)."""
+    return hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of documents, with numpy posting lists."""
+
+    def __init__(self, documents: List[Document], postings: Dict[str, Tuple[Sequence[int], Sequence[int]]],
+                 lengths: Sequence[int], k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.lengths = np.asarray(lengths, dtype=np.float32)
+        self.avg_length = float(self.lengths.mean()) if len(self.lengths) else 0.0
+        self.postings = {
+            term: (np.asarray(ids, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+            for term, (ids, tfs) in postings.items()
+        }
+        # Length normalization per document, shared by every term
+        self._norm = k1 * (1 - b + b * self.lengths / (self.avg_length or 1.0))
+
+    @classmethod
+    def build(cls, documents: List[Document], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        lengths = []
+        for i, doc in enumerate(documents):
+            counts = Counter(tokenize(doc.page_content))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                ids, tfs = postings.setdefault(term, ([], []))
+                ids.append(i)
+                tfs.append(tf)
+        return cls(documents, postings, lengths, k1=k1, b=b)
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings[term][0])
+        n = len(self.documents)
+        return float(np.log(1 + (n - df + 0.5) / (df + 0.5)))
+
+    def search(self, query: str, k: int = HYBRID_LEXICAL_K) -> List[Tuple[Document, float]]:
+        """Top-k (document, score) pairs for the query, best first."""
+        terms = [t for t in set(tokenize(query)) if t in self.postings]
+        if not terms or not self.documents:
+            return []
+
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term in terms:
+            ids, tfs = self.postings[term]
+            scores[ids] += self.idf(term) * tfs * (self.k1 + 1) / (tfs + self._norm[ids])
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.documents[i], float(scores[i])) for i in top]
+
+    def save(self, path: str):
+        """Write the index as JSON (atomically)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        data = {
+            "k1": self.k1,
+            "b": self.b,
+            "documents": [{"page_content": d.page_content, "metadata": d.metadata} for d in self.documents],
+            "lengths": self.lengths.astype(int).tolist(),
+            "postings": {term: [ids.tolist(), tfs.astype(int).tolist()] for term, (ids, tfs) in self.postings.items()},
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, "r") as f:
+            data = json.load(f)
+        documents = [Document(page_content=d["page_content"], metadata=d["metadata"]) for d in data["documents"]]
+        postings = {term: (ids, tfs) for term, (ids, tfs) in data["postings"].items()}
+        return cls(documents, postings, data["lengths"], k1=data["k1"], b=data["b"])
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], weights: Optional[List[float]] = None,
+                           k: int = RRF_K) -> List[Tuple[Document, float]]:
+    """
+    Fuse ranked document lists: score(d) = sum_i weight_i / (k + rank_i(d)).
+
+    Documents are matched across lists by content; the first occurrence is kept.
+
+    Returns:
+        list: (document, fused score) pairs, best first
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc in enumerate(ranking, start=1):
+            key = document_key(doc)
+            documents.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + weight / (k + rank)
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [(documents[key], scores[key]) for key in ordered]
+
+
+class HybridRetriever(BaseRetriever):
+    """Dense retriever + BM25 index, fused with weighted reciprocal rank fusion."""
+
+    vectorstore: Any
+    index: Optional[Any] = None
+    dense_k: int = HYBRID_DENSE_K
+    lexical_k: int = HYBRID_LEXICAL_K
+    top_k: int = HYBRID_TOP_K
+    dense_weight: float = HYBRID_DENSE_WEIGHT
+    lexical_weight: float = HYBRID_LEXICAL_WEIGHT
+    rrf_k: int = RRF_K
+    # AsyncQdrantClient for a non-blocking dense search (the langchain Qdrant store is sync only)
+    async_client: Optional[Any] = None
+    # RetrievalCache (retrieval_cache.py) of results per collection version and question
+    cache: Optional[Any] = None
+    collection: str = ""
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        if self.cache is not None:
+            cached = self.cache.get(self.collection, query)
+            if cached is not None:
+                return cached
+        documents = self._fuse(query, self.vectorstore.similarity_search(query, k=self.dense_k))
+        if self.cache is not None:
+            self.cache.put(self.collection, query, documents)
+        return documents
+
+    async def _aget_relevant_documents(self, query: str, *,
+                                       run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        if self.cache is not None:
+            cached = self.cache.get(self.collection, query)
+            if cached is not None:
+                return cached
+        documents = self._fuse(query, await self._adense_search(query))
+        if self.cache is not None:
+            self.cache.put(self.collection, query, documents)
+        return documents
+
+    async def _adense_search(self, query: str) -> List[Document]:
+        store = self.vectorstore
+        if self.async_client is None:
+            return await store.asimilarity_search(query, k=self.dense_k)
+        vector = await store.embeddings.aembed_query(query)
+        response = await self.async_client.query_points(
+            collection_name=store.collection_name,
+            query=vector,
+            using=store.vector_name,
+            limit=self.dense_k,
+            with_payload=True,
+        )
+        return [
+            store._document_from_point(point, store.collection_name, store.content_payload_key, store.metadata_payload_key)
+            for point in response.points
+        ]
+
+    def _fuse(self, query: str, dense: List[Document]) -> List[Document]:
+        # BM25 is in-process (well under a millisecond), so the async path runs it inline too
+        if self.index is None:
+            return dense[:self.top_k]
+
+        lexical = [doc for doc, _ in self.index.search(query, k=self.lexical_k)]
+        fused = reciprocal_rank_fusion(
+            [dense, lexical], weights=[self.dense_weight, self.lexical_weight], k=self.rrf_k
+        )
+        return [doc for doc, _ in fused[:self.top_k]]
+
+
+def build_retriever(vectorstore, collection: str, async_client=None, cache=None):
+    """
+    Hybrid retriever for the collection when its BM25 index exists on disk,
+    otherwise dense retrieval only (top HYBRID_TOP_K).
+    """
+    path = bm25_index_path(collection)
+    index = None
+    if not os.path.exists(path):
+        logger.warning(f"BM25 index {path} not found, {collection} uses dense retrieval only; "
+                       f"run preprocessing/indexing.py to build it")
+    else:
+        index = BM25Index.load(path)
+        logger.info(f"Loaded BM25 index for {collection} ({len(index.documents)} chunks, {len(index.postings)} terms)")
+    return HybridRetriever(vectorstore=vectorstore, index=index, async_client=async_client,
+                           cache=cache, collection=collection)
@@ -0,0 +1,178 @@
+"""
+Embedding stage for the indexer.
+
+Texts are embedded in fixed-size batches, several batches in flight at once,
+throttled by a token bucket (texts per minute) and retried with exponential
+backoff. Every completed batch is appended to an on-disk checkpoint (JSON lines
+of id, content hash and vector), so a run that dies on a quota error resumes
+from where it stopped instead of re-embedding everything.
+
+Any LangChain `Embeddings` works, including `DeterministicFakeEmbedding` for
+offline runs.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1):
+        """Block until `tokens` (capped at capacity) are available, then take them."""
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class EmbeddingCheckpoint:
+    """Append-only JSON-lines store of completed vectors."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[str, Tuple[str, List[float]]]:
+        """
+        Return {id: (hash, vector)}; later lines win.
+
+        A torn last line (a run killed mid-write) is cut off, so the next append
+        starts on a fresh line instead of being glued to it.
+        """
+        done = {}
+        if not self.path or not os.path.exists(self.path):
+            return done
+        complete = 0
+        with open(self.path, "r") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                complete += len(line.encode())
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                done[record["id"]] = (record["hash"], record["vector"])
+        if complete != os.path.getsize(self.path):
+            with self._lock, open(self.path, "r+") as f:
+                f.truncate(complete)
+        return done
+
+    def append(self, records: List[dict]):
+        if not self.path:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class EmbeddingPipeline:
+    """Batched, rate-limited, concurrent and resumable `embed_documents`."""
+
+    def __init__(self, embeddings, batch_size: int = 32, rate_per_minute: float = 1500,
+                 max_in_flight: int = 4, max_retries: int = 6, base_delay: float = 1.0,
+                 max_delay: float = 60.0, checkpoint_path: Optional[str] = None):
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.bucket = TokenBucket(rate_per_minute, capacity=max(rate_per_minute, batch_size))
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.checkpoint = EmbeddingCheckpoint(checkpoint_path)
+
+    def _embed_with_retry(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            self.bucket.acquire(len(texts))
+            try:
+                return self.embeddings.embed_documents(texts)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+                delay *= random.uniform(0.5, 1.0)
+                print(f"Embedding batch failed ({e}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _run_batch(self, batch: List[Tuple[str, str, str]]) -> List[dict]:
+        vectors = self._embed_with_retry([text for _, _, text in batch])
+        records = [
+            {"id": item_id, "hash": digest, "vector": list(vector)}
+            for (item_id, digest, _), vector in zip(batch, vectors)
+        ]
+        self.checkpoint.append(records)
+        return records
+
+    def run(self, items: List[Tuple[str, str, str]]) -> Dict[str, List[float]]:
+        """
+        Embed (id, content hash, text) items.
+
+        Items already in the checkpoint with the same hash are not re-embedded.
+
+        Returns:
+            dict: id -> vector for every item
+        """
+        done = self.checkpoint.load()
+        vectors = {}
+        pending = []
+        for item_id, digest, text in items:
+            cached = done.get(item_id)
+            if cached is not None and cached[0] == digest:
+                vectors[item_id] = cached[1]
+            else:
+                pending.append((item_id, digest, text))
+
+        if vectors:
+            print(f"Resumed {len(vectors)} vectors from checkpoint")
+        if not pending:
+            return vectors
+
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        start = time.perf_counter()
+        completed = 0
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            futures = [pool.submit(self._run_batch, batch) for batch in batches]
+            try:
+                for future in as_completed(futures):
+                    for record in future.result():
+                        vectors[record["id"]] = record["vector"]
+                    completed += 1
+                    print(f"  embedded batch {completed}/{len(batches)}")
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        elapsed = time.perf_counter() - start
+        print(f"Embedded {len(pending)} texts in {elapsed:.1f}s ({len(pending) / max(elapsed, 1e-9):.1f} texts/s)")
+        return vectors
@@ -1,109 +1,271 @@
-from langchain_text_splitters import MarkdownHeaderTextSplitter
+"""
+Incremental indexer for the NIRF markdown corpus.
+
+Every section, and every Faculty Details row, becomes one chunk with a
+deterministic Qdrant point ID and a content hash. Chunks go to the collections
+the agent reads (`collection_router.serving_collections`): all of them to
+PONDICHERRY_UNIVERSITY_INFO, or with MULTI_COLLECTION_RETRIEVAL=true (or
+--multi-collection) each to one of PU_NIRF / PU_RESEARCH / PU_POLICIES /
+PU_FACULTY. A local manifest records what
+was last written to each collection, so a run only embeds and upserts chunks
+that are new or changed and deletes the ones that disappeared from the source.
+
+A BM25 index over the same chunks is written to `data/bm25/<collection>.json`
+for hybrid retrieval (see `hybrid_retrieval.py`). When a run changes a
+collection its version is bumped, which invalidates the agent's cached
+retrieval results (see `retrieval_cache.py`).
+
+Embedding goes through `EmbeddingPipeline` (batched, rate limited, retried and
+checkpointed), so a quota error part-way through resumes on the next run.
+
+Usage (from agent/sementic-agent):
+    python preprocessing/indexing.py                    # incremental sync
+    python preprocessing/indexing.py --dry-run          # show the plan only
+    python preprocessing/indexing.py --full             # re-embed everything
+    python preprocessing/indexing.py --fake-embeddings  # offline, deterministic vectors
+    python preprocessing/indexing.py --multi-collection # PU_* layout, whatever the env says
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_core.documents import Document 
-from langchain_qdrant import QdrantVectorStore
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointIdsList, PointStruct, VectorParams
 from dotenv import load_dotenv
-import pandas as pd
-import io
+import argparse
+import hashlib
+import json
+import uuid
+
+from embedding_cache import CachedEmbeddings
+from collection_router import MULTI_COLLECTION_RETRIEVAL, serving_collections
+from hybrid_retrieval import BM25Index, bm25_index_path
+from retrieval_cache import bump_collection_version
+from preprocessing.embedding_pipeline import EmbeddingPipeline
+from preprocessing.markdown_sections import iter_sections
+from preprocessing.tables import FACULTY_SPEC, section_to_documents
 
 load_dotenv()
 
-with open("./data/pondiuni_clean_final.md", "r") as f:
-    md_content = f.read()
-
-headers_to_split_on = [
-    ("##", "Section"),
-]
-
-markdown_splitter = MarkdownHeaderTextSplitter(headers_to_split_on=headers_to_split_on)
-md_docs = markdown_splitter.split_text(md_content)
-
-normal_document = []
-faculty_document = []
-
-embeddings = GoogleGenerativeAIEmbeddings(
-    model="models/gemini-embedding-001",
-    task_type="RETRIEVAL_DOCUMENT"
-)
-
-for doc in md_docs:
-    section_name = doc.metadata.get("Section", "")
-    
-    if "Faculty Details" in section_name:
-        try:
-            df = pd.read_csv(
-                io.StringIO(doc.page_content), 
-                sep="|", 
-                skipinitialspace=True, 
-                engine="python"
-            ).dropna(axis=1, how='all')
-            
-            df.columns = df.columns.str.strip()
-            
-            for index, row in df.iterrows():
-                if "-----" in str(row.iloc[0]): 
-                    continue 
-                
-                def safe_strip(value, default='Unknown'):
-                    return value.strip() if pd.notna(value) and value else default
-                
-                content_string = (
-                    f"Faculty Record for {safe_strip(row['Name'])}: "
-                    f"Designation: {safe_strip(row['Designation'])}, "
-                    f"Age: {row['Age'] if pd.notna(row['Age']) else 0}, "
-                    f"Gender: {safe_strip(row['Gender'])}, "
-                    f"Qualification: {safe_strip(row['Qualification'])}, "
-                    f"Experience: {row['Experience (Years)'] if pd.notna(row['Experience (Years)']) else 0} years, "
-                    f"Department Association: {safe_strip(row['Association Type'])}. "
-                    f"Joining Date: {safe_strip(row['Joining Date'])}. "
-                    f"Currently working with institution?: {safe_strip(row['Currently Working'])}. "
-                    f"Leaving Date: {safe_strip(row['Leaving Date'])}"
-                )
-                
-                new_doc = Document(
-                    page_content=content_string,
-                    metadata={
-                        "section": "Faculty Details",
-                        "faculty_name": safe_strip(row['Name']),
-                        "designation": safe_strip(row['Designation']),
-                        "association": safe_strip(row['Association Type']),
-                        "joining_date": safe_strip(row['Joining Date']),
-                        "currently_working": safe_strip(row['Currently Working']),
-                        "leaving_date": safe_strip(row['Leaving Date']),
-                        "gender": safe_strip(row['Gender']),
-                        "age": row['Age'] if pd.notna(row['Age']) else 0,
-                        "qualification": safe_strip(row['Qualification']),
-                        "experience": row['Experience (Years)'] if pd.notna(row['Experience (Years)']) else 0,
-                    }
-                )
-                faculty_document.append(new_doc)
-                
-        except Exception as e:
-            print(f"Error parsing faculty table: {e}")
+SOURCE_PATH = "./data/pondiuni_clean_final.md"
+MANIFEST_PATH = "./data/index_manifest.json"
+
+url = "http://localhost:6333"
+
+# Namespace for deterministic point IDs (uuid5 of "<collection>:<chunk key>")
+POINT_NAMESPACE = uuid.UUID("6f1d6a52-2d0e-4c55-9a43-4d3c7b1f0c11")
+
+UPSERT_BATCH_SIZE = 64
+CHECKPOINT_DIR = "./data/embedding_checkpoints"
+FAKE_EMBEDDING_SIZE = 3072  # gemini-embedding-001 output size
+
+
+def load_documents(path):
+    """
+    Read the markdown once: one document per section, and one per faculty row.
+    """
+    normal_document = []
+    faculty_document = []
+
+    for section in iter_sections(path):
+        if "Faculty Details" in section.heading:
+            try:
+                faculty_document.extend(section_to_documents(section, "Faculty Details", FACULTY_SPEC))
+            except Exception as e:
+                print(f"Error parsing faculty table: {e}")
+
+        else:
+            normal_document.append(Document(
+                page_content=f"Section: {section.heading}\n\n" + section.text,
+                metadata={"Section": section.heading} if section.heading else {},
+            ))
+
+    return normal_document, faculty_document
+
+
+def chunk_key(doc):
+    """Stable identity of a chunk within its collection."""
+    if doc.metadata.get("faculty_name"):
+        return f"faculty:{doc.metadata.get('srno', '')}:{doc.metadata['faculty_name']}"
+    return f"section:{doc.metadata.get('Section', '')}"
+
+
+def content_hash(doc):
+    """Hash of everything that ends up in the Qdrant point."""
+    payload = json.dumps({"page_content": doc.page_content, "metadata": doc.metadata}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def point_id(collection, key):
+    return str(uuid.uuid5(POINT_NAMESPACE, f"{collection}:{key}"))
+
+
+def keyed_chunks(documents):
+    """Pair each document with a unique key; repeated keys get a '#n' suffix."""
+    seen = {}
+    chunks = []
+    for doc in documents:
+        key = chunk_key(doc)
+        seen[key] = seen.get(key, 0) + 1
+        if seen[key] > 1:
+            key = f"{key}#{seen[key]}"
+        chunks.append((key, doc))
+    return chunks
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {"collections": {}}
+    with open(path, "r") as f:
+        return json.load(f)
 
+
+def save_manifest(path, manifest):
+    """Write the manifest atomically so an interrupted run never corrupts it."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def plan_sync(collection, documents, entries, full=False):
+    """
+    Diff the current documents against the manifest entries of a collection.
+
+    Returns:
+        (upserts, deletes, unchanged): upserts is a list of (key, id, hash, doc),
+        deletes a list of (key, id) for chunks no longer in the source.
+    """
+    upserts = []
+    unchanged = 0
+    current_keys = set()
+
+    for key, doc in keyed_chunks(documents):
+        current_keys.add(key)
+        digest = content_hash(doc)
+        entry = entries.get(key)
+        if not full and entry is not None and entry["hash"] == digest:
+            unchanged += 1
+            continue
+        upserts.append((key, point_id(collection, key), digest, doc))
+
+    deletes = [(key, entry["id"]) for key, entry in entries.items() if key not in current_keys]
+    return upserts, deletes, unchanged
+
+
+def point_payload(doc):
+    """Qdrant payload in the layout langchain_qdrant reads back (numpy scalars unwrapped)."""
+    metadata = json.loads(json.dumps(doc.metadata, default=lambda v: v.item() if hasattr(v, "item") else str(v)))
+    return {"page_content": doc.page_content, "metadata": metadata}
+
+
+def save_bm25_index(collection, documents):
+    """Build the lexical index over the collection's current chunks (read by hybrid_retrieval)."""
+    index = BM25Index.build([Document(page_content=doc.page_content, metadata=point_payload(doc)["metadata"])
+                             for doc in documents])
+    path = bm25_index_path(collection)
+    index.save(path)
+    print(f"{collection}: BM25 index with {len(documents)} chunks, {len(index.postings)} terms -> {path}")
+
+
+def ensure_collection(client, collection, size):
+    """Create the collection on first use."""
+    if client.collection_exists(collection):
+        return
+    client.create_collection(collection, vectors_config=VectorParams(size=size, distance=Distance.COSINE))
+    print(f"Created collection {collection} (dim={size})")
+
+
+def sync_collection(client, pipeline, collection, documents, manifest, manifest_path, full=False, dry_run=False):
+    """Bring one collection in line with the documents, updating the manifest as batches land."""
+    entries = manifest["collections"].setdefault(collection, {"chunks": {}})["chunks"]
+    upserts, deletes, unchanged = plan_sync(collection, documents, entries, full=full)
+    print(f"{collection}: {len(upserts)} to upsert, {len(deletes)} to delete, {unchanged} unchanged")
+
+    if dry_run:
+        return
+    # Always rebuilt: cheap, and keeps the index in step with the source
+    save_bm25_index(collection, documents)
+    if not (upserts or deletes):
+        return
+
+    if upserts:
+        pipeline.checkpoint.path = os.path.join(CHECKPOINT_DIR, f"{collection}.jsonl")
+        vectors = pipeline.run([(pid, digest, doc.page_content) for _, pid, digest, doc in upserts])
+        ensure_collection(client, collection, len(next(iter(vectors.values()))))
+
+        for start in range(0, len(upserts), UPSERT_BATCH_SIZE):
+            batch = upserts[start:start + UPSERT_BATCH_SIZE]
+            client.upsert(collection, points=[
+                PointStruct(id=pid, vector=vectors[pid], payload=point_payload(doc))
+                for _, pid, _, doc in batch
+            ])
+            for key, pid, digest, _ in batch:
+                entries[key] = {"id": pid, "hash": digest}
+            save_manifest(manifest_path, manifest)
+            print(f"  upserted {start + len(batch)}/{len(upserts)}")
+
+        # Everything embedded is now in Qdrant and the manifest
+        pipeline.checkpoint.clear()
+
+    if deletes:
+        client.delete(collection, points_selector=PointIdsList(points=[pid for _, pid in deletes]))
+        for key, _ in deletes:
+            entries.pop(key, None)
+        save_manifest(manifest_path, manifest)
+        print(f"  deleted {len(deletes)}")
+
+    print(f"{collection}: version {bump_collection_version(collection)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally index the NIRF markdown into Qdrant")
+    parser.add_argument("--source", default=SOURCE_PATH)
+    parser.add_argument("--manifest", default=MANIFEST_PATH)
+    parser.add_argument("--url", default=url)
+    parser.add_argument("--full", action="store_true", help="re-embed every chunk")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan without writing")
+    parser.add_argument("--fake-embeddings", action="store_true", help="deterministic offline embeddings")
+    parser.add_argument("--batch-size", type=int, default=32, help="texts per embedding request")
+    parser.add_argument("--rate", type=float, default=1500, help="max texts embedded per minute")
+    parser.add_argument("--concurrency", type=int, default=4, help="embedding batches in flight")
+    parser.add_argument("--max-retries", type=int, default=6)
+    parser.add_argument("--multi-collection", action=argparse.BooleanOptionalAction,
+                        default=MULTI_COLLECTION_RETRIEVAL, help="index the PU_* collections (default: as the agent)")
+    args = parser.parse_args()
+
+    normal_document, faculty_document = load_documents(args.source)
+    print(f"Loaded {len(normal_document)} section chunks and {len(faculty_document)} faculty chunks")
+
+    if args.fake_embeddings:
+        embeddings = DeterministicFakeEmbedding(size=FAKE_EMBEDDING_SIZE)
     else:
-        doc.page_content = f"Section: {section_name}\n\n" + doc.page_content
-        normal_document.append(doc)
+        # Unchanged texts (e.g. after --full or a lost manifest) come from the disk cache
+        embeddings = CachedEmbeddings(GoogleGenerativeAIEmbeddings(
+            model="models/gemini-embedding-001",
+            task_type="RETRIEVAL_DOCUMENT"
+        ))
+    pipeline = EmbeddingPipeline(
+        embeddings,
+        batch_size=args.batch_size,
+        rate_per_minute=args.rate,
+        max_in_flight=args.concurrency,
+        max_retries=args.max_retries,
+    )
+    client = QdrantClient(url=args.url)
+    manifest = load_manifest(args.manifest)
 
+    for collection, documents in serving_collections(normal_document + faculty_document,
+                                                     multi=args.multi_collection).items():
+        sync_collection(client, pipeline, collection, documents, manifest, args.manifest,
+                        full=args.full, dry_run=args.dry_run)
 
-url = "http://localhost:6333"
-collection_name_normal = "PONDICHERRY_UNIVERSITY_INFO_NORMAL"
-collection_name_faculty = "PONDICHERRY_UNIVERSITY_INFO_FACULTY"
-
-faculty_document = faculty_document[450:500]
-# print(faculty_document)
-
-
-
-# vector_store = QdrantVectorStore.from_documents(
-#     url=url,
-#     documents=normal_document,
-#     embedding=embeddings,
-#     collection_name=collection_name_normal,
-# )
-# vector_store = QdrantVectorStore.from_documents(
-#     url=url,
-#     documents=faculty_document,
-#     embedding=embeddings,
-#     collection_name=collection_name_normal,
-# )
\ No newline at end of file
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Single-pass streaming parser for the NIRF markdown reports.
+
+The file is read line by line exactly once. `iter_sections` yields one typed
+`Section` per heading (heading, table header, rows as tuples, prose), holding
+at most one section in memory; `iter_section_rows` streams the rows of the
+matching sections without materializing them at all, which keeps memory flat
+for very large tables such as faculty rosters.
+
+Consumers: the Qdrant indexer (`preprocessing/indexing.py`), `parse.py` and
+the Postgres extractor (`agent/extraction/extraction.py`).
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+SEPARATOR_RE = re.compile(r"^\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?$")
+
+Row = Tuple[str, ...]
+
+
+@dataclass
+class Section:
+    heading: str
+    level: int
+    header: Optional[Row] = None
+    rows: List[Row] = field(default_factory=list)
+    prose: List[str] = field(default_factory=list)
+    # Stripped body lines in file order (tables and prose), without the heading
+    lines: List[str] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        """Section body as text, same shape as MarkdownHeaderTextSplitter output."""
+        return "\n".join(self.lines).strip()
+
+    @property
+    def is_table(self) -> bool:
+        return self.header is not None
+
+
+def split_row(line: str) -> Row:
+    """Split a pipe-table line into stripped cells, keeping empty cells in place."""
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|"):
+        line = line[:-1]
+    return tuple(cell.strip() for cell in line.split("|"))
+
+
+def _heading_matcher(heading: Union[str, Callable[[str], bool]]) -> Callable[[str], bool]:
+    if callable(heading):
+        return heading
+    return lambda name: heading in name
+
+
+def _scan(path: str, level: int):
+    """
+    Yield line events in file order: ('heading', line, title), ('header', (cells, line),
+    separator), ('separator', line), ('row', (cells, line)) and ('prose', line).
+
+    A table line is held back by one line, until we know whether a separator
+    follows it (making it a header).
+    """
+    previous_row = None
+    with open(path, "r", encoding="utf-8") as f:
+        for raw in f:
+            line = raw.strip()
+            match = HEADING_RE.match(line)
+            if match and len(match.group(1)) == level:
+                if previous_row is not None:
+                    yield ("row", previous_row)
+                    previous_row = None
+                yield ("heading", line, match.group(2))
+                continue
+
+            if line.startswith("|"):
+                if SEPARATOR_RE.match(line):
+                    # The row right before a separator is a table header
+                    if previous_row is not None:
+                        yield ("header", previous_row, line)
+                        previous_row = None
+                    else:
+                        yield ("separator", line)
+                    continue
+                if previous_row is not None:
+                    yield ("row", previous_row)
+                previous_row = (split_row(line), line)
+                continue
+
+            if previous_row is not None:
+                yield ("row", previous_row)
+                previous_row = None
+            yield ("prose", line)
+
+    if previous_row is not None:
+        yield ("row", previous_row)
+
+
+def _add_event(section: Section, event: tuple):
+    """Append a non-heading line event to the section being built."""
+    kind = event[0]
+    if kind == "header":
+        (cells, line), separator = event[1], event[2]
+        if section.header is None:
+            section.header = cells
+        else:
+            section.rows.append(cells)
+        section.lines.extend([line, separator])
+    elif kind == "separator":
+        section.lines.append(event[1])
+    elif kind == "row":
+        cells, line = event[1]
+        section.rows.append(cells)
+        section.lines.append(line)
+    else:
+        if event[1]:
+            section.prose.append(event[1])
+        section.lines.append(event[1])
+
+
+def iter_sections(path: str, level: int = 2) -> Iterator[Section]:
+    """
+    Yield a Section per heading of the given level, in file order.
+
+    Text before the first heading is yielded as a Section with an empty heading
+    when it is not blank. Additional header rows of multi-table sections are
+    kept as rows.
+    """
+    section = Section(heading="", level=level)
+    for event in _scan(path, level):
+        if event[0] == "heading":
+            if section.heading or section.text:
+                yield section
+            section = Section(heading=event[2], level=level)
+        else:
+            _add_event(section, event)
+
+    if section.heading or section.text:
+        yield section
+
+
+def iter_section_rows(path: str, heading: Union[str, Callable[[str], bool]], level: int = 2,
+                      other_sections: Optional[Callable[[Section], None]] = None) -> Iterator[Tuple[str, Row, Row]]:
+    """
+    Stream (section heading, table header, row) for sections whose heading
+    matches (substring or predicate), without holding the rows in memory.
+
+    `other_sections`, if given, is called with every other (headed) section as
+    a full Section, so one pass can feed both a streaming and a section consumer.
+    The callbacks have all run once the iterator is exhausted.
+    """
+    matches = _heading_matcher(heading)
+    current = None
+    header = None
+    other = None
+    for event in _scan(path, level):
+        kind = event[0]
+        if kind == "heading":
+            if other is not None:
+                other_sections(other)
+                other = None
+            current = event[2] if matches(event[2]) else None
+            header = None
+            if current is None and other_sections is not None:
+                other = Section(heading=event[2], level=level)
+        elif current is None:
+            if other is not None:
+                _add_event(other, event)
+        elif kind == "header":
+            if header is None:
+                header = event[1][0]
+            else:
+                yield current, header, event[1][0]
+        elif kind == "row":
+            yield current, header, event[1][0]
+
+    if other is not None:
+        other_sections(other)
@@ -0,0 +1,45 @@
+"""
+Tables the agent may query, shared by the ETL and the agent's SQL route.
+
+`agent/extraction/extraction.py` grants the read-only role SELECT on exactly
+these tables, and `sql_executor.py` allowlists them (and lists their columns in
+the query-writing prompt). Kept free of imports so both sides can load it.
+"""
+
+# Queryable tables and their columns (mirrors extraction.py, summaries.py and nirf_tables.py)
+QUERYABLE_TABLES = {
+    "faculty_details": [
+        "srno", "name", "age", "designation", "gender", "qualification", "experience_years",
+        "currently_working", "joining_date", "leaving_date", "association_type",
+    ],
+    # Precomputed summaries, cheaper than aggregating faculty_details
+    "faculty_overview": ["total", "currently_working", "male", "female", "avg_experience", "avg_age", "refreshed_at"],
+    "faculty_by_designation": [
+        "designation", "total", "currently_working", "male", "female", "avg_experience",
+        "min_experience", "max_experience", "avg_age", "youngest", "oldest",
+    ],
+    "faculty_by_gender": ["gender", "total", "percentage"],
+    "faculty_by_association": ["association_type", "total"],
+    "faculty_by_qualification": ["qualification", "total"],
+    "faculty_experience_buckets": ["bucket", "bucket_order", "total", "currently_working"],
+    "faculty_joinings_by_year": ["year", "joinings"],
+    "nirf_intake": ["program", "academic_year", "intake"],
+    "nirf_placements": [
+        "program", "intake_year", "first_year_intake", "first_year_admitted", "lateral_entry_admitted",
+        "graduation_year", "graduated", "placed", "median_salary", "higher_studies",
+    ],
+    "nirf_expenditure": ["category", "item", "academic_year", "amount"],
+}
+
+# Report section each table is loaded from, shown as the source of SQL answers
+SOURCE_SECTIONS = {
+    "nirf_intake": "Sanctioned Student Intake",
+    "nirf_placements": "Placement Statistics",
+    "nirf_expenditure": "Annual Expenditure",
+}
+FACULTY_SECTION = "Faculty Details"
+
+
+def source_section(table: str) -> str:
+    """Section a queryable table comes from; the faculty_* views summarise Faculty Details."""
+    return SOURCE_SECTIONS.get(table, FACULTY_SECTION)
@@ -0,0 +1,140 @@
+"""
+Vectorized markdown-table → Document conversion.
+
+Tables arrive already split into cells by `markdown_sections` and are cleaned,
+defaulted and rendered a whole column at a time, so converting a roster of tens
+of thousands of rows costs a handful of column operations instead of a Python loop per row.
+
+`TableSpec` describes how a table becomes documents: a content template made
+of (literal, column) parts and a metadata column mapping. `FACULTY_SPEC` is the
+Faculty Details layout; any other table falls back to "column: value" rows.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from langchain_core.documents import Document
+
+
+logger = logging.getLogger("campusgpt.agent")
+
+DEFAULT_TEXT = "Unknown"
+
+
+@dataclass
+class TableSpec:
+    # (literal, column) pairs rendered in order; column may be None for a trailing literal
+    template: List[Tuple[str, Optional[str]]]
+    # metadata key -> column
+    metadata: Dict[str, str]
+    # numeric columns and the default used for missing values
+    numeric: Dict[str, float] = field(default_factory=dict)
+    text_default: str = DEFAULT_TEXT
+
+
+FACULTY_SPEC = TableSpec(
+    template=[
+        ("Faculty Record for ", "Name"),
+        (": Designation: ", "Designation"),
+        (", Age: ", "Age"),
+        (", Gender: ", "Gender"),
+        (", Qualification: ", "Qualification"),
+        (", Experience: ", "Experience (Years)"),
+        (" years, Department Association: ", "Association Type"),
+        (". Joining Date: ", "Joining Date"),
+        (". Currently working with institution?: ", "Currently Working"),
+        (". Leaving Date: ", "Leaving Date"),
+    ],
+    metadata={
+        "srno": "Srno",
+        "faculty_name": "Name",
+        "designation": "Designation",
+        "association": "Association Type",
+        "joining_date": "Joining Date",
+        "currently_working": "Currently Working",
+        "leaving_date": "Leaving Date",
+        "gender": "Gender",
+        "age": "Age",
+        "qualification": "Qualification",
+        "experience": "Experience (Years)",
+    },
+    numeric={"Age": 0, "Experience (Years)": 0},
+)
+
+
+def rows_to_frame(header, rows, name: str = "") -> pd.DataFrame:
+    """Build a string DataFrame from an already-split header and row tuples."""
+    if not header:
+        return pd.DataFrame()
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return pd.DataFrame(columns=list(header))
+    # Ragged rows: pad short ones, drop cells past the header
+    ragged = sum(len(row) != len(header) for row in rows)
+    if ragged:
+        logger.warning("Table %r: %d of %d rows do not have %d cells; padded or truncated",
+                       name, ragged, len(rows), len(header))
+    df = df.reindex(columns=range(len(header))).fillna("")
+    df.columns = list(header)
+    return df
+
+
+def clean_frame(df: pd.DataFrame, spec: TableSpec) -> pd.DataFrame:
+    """Default empty text cells and coerce numeric columns, column by column."""
+    df = df.replace("", spec.text_default)
+    for column, default in spec.numeric.items():
+        if column in df:
+            values = pd.to_numeric(df[column], errors="coerce").fillna(default)
+            # Keep integral columns (Age) as ints, like the source table
+            df[column] = values.astype(int) if (values % 1 == 0).all() else values
+    return df
+
+
+def render_template(df: pd.DataFrame, template: List[Tuple[str, Optional[str]]]) -> pd.Series:
+    """Assemble the content strings for all rows with whole-column concatenation."""
+    content = pd.Series("", index=df.index, dtype=object)
+    for literal, column in template:
+        content = content + literal
+        if column is not None:
+            content = content + df[column].astype(str)
+    return content
+
+
+def generic_template(columns: List[str]) -> List[Tuple[str, Optional[str]]]:
+    """'col1: v1, col2: v2, ...' for tables without a dedicated spec."""
+    return [(("" if i == 0 else ", ") + f"{column}: ", column) for i, column in enumerate(columns)]
+
+
+def table_to_records(df: pd.DataFrame, section: str, spec: Optional[TableSpec] = None) -> Tuple[List[str], List[dict]]:
+    """
+    Convert a parsed table to (contents, metadatas), one entry per row.
+
+    Without a spec every column is rendered as "column: value" and kept as metadata.
+    """
+    if df.empty:
+        return [], []
+
+    if spec is None:
+        spec = TableSpec(template=generic_template(list(df.columns)), metadata={c: c for c in df.columns})
+
+    df = clean_frame(df, spec)
+    contents = render_template(df, spec.template).tolist()
+    # tolist() unboxes whole columns to Python scalars; zipping them is much
+    # cheaper than DataFrame.to_dict(orient="records")
+    keys = list(spec.metadata.keys()) + ["section"]
+    columns = [df[column].tolist() for column in spec.metadata.values()] + [[section] * len(df)]
+    metadatas = [dict(zip(keys, values)) for values in zip(*columns)]
+    return contents, metadatas
+
+
+def records_to_documents(contents: List[str], metadatas: List[dict]) -> List[Document]:
+    return [Document(page_content=c, metadata=m) for c, m in zip(contents, metadatas)]
+
+
+def section_to_documents(section, name: Optional[str] = None, spec: Optional[TableSpec] = None) -> List[Document]:
+    """Build one Document per row of a parsed `markdown_sections.Section`."""
+    name = name or section.heading
+    df = rows_to_frame(section.header, section.rows, name)
+    return records_to_documents(*table_to_records(df, name, spec))
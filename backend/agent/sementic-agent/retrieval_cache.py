@@ -0,0 +1,141 @@
+"""
+Query-result cache for vector retrieval.
+
+`retrieve` embeds the question and searches Qdrant on every call, including
+repeats of the same question seconds apart and the re-retrievals of the
+hallucination / "not useful" loops. `RetrievalCache` keeps the documents
+returned for a normalized question (see `semantic_cache.normalize_question`)
+in a process-local LRU with a TTL, so hot questions touch neither the
+embedding API nor Qdrant.
+
+Entries are keyed by collection *version* as well as the question. The
+indexing pipeline calls `bump_collection_version()` after it writes or
+deletes points, which replaces a small marker file
+(`<COLLECTION_VERSION_DIR>/<collection>.version`). Every lookup reads that
+file, and a new version drops the collection's cached results, so a re-index
+is picked up by the next request without a restart. The indexer writes the
+same collections the agent reads (`collection_router.serving_collections`).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from semantic_cache import normalize_question
+
+
+RETRIEVAL_CACHE_ENABLED = os.getenv("RETRIEVAL_CACHE_ENABLED", "true").lower() == "true"
+RETRIEVAL_CACHE_TTL = int(os.getenv("RETRIEVAL_CACHE_TTL", str(60 * 60)))
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "2000"))
+COLLECTION_VERSION_DIR = os.getenv(
+    "COLLECTION_VERSION_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "collection_versions"),
+)
+
+# Version of a collection that has never been bumped
+INITIAL_VERSION = "0"
+
+
+def collection_version_path(collection: str, directory: str = COLLECTION_VERSION_DIR) -> str:
+    return os.path.join(directory, f"{collection}.version")
+
+
+def bump_collection_version(collection: str, directory: str = COLLECTION_VERSION_DIR) -> str:
+    """Mark the collection's contents as changed (called by the indexing pipeline)."""
+    version = str(time.time_ns())
+    path = collection_version_path(collection, directory)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, path)
+    return version
+
+
+class CollectionVersions:
+    """Current version per collection, read from its marker file."""
+
+    def __init__(self, directory: str = COLLECTION_VERSION_DIR):
+        self.directory = directory
+
+    def get(self, collection: str) -> str:
+        # Read on every lookup (one small file): the mtime is too coarse to tell two quick bumps apart
+        try:
+            with open(collection_version_path(collection, self.directory), "r") as f:
+                return f.read().strip() or INITIAL_VERSION
+        except FileNotFoundError:
+            return INITIAL_VERSION
+
+
+class RetrievalCache:
+    """LRU + TTL cache of retrieved documents per (collection, version, normalized question)."""
+
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_MAX_ENTRIES, ttl: int = RETRIEVAL_CACHE_TTL,
+                 versions: Optional[CollectionVersions] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.versions = versions or CollectionVersions()
+        self._entries = OrderedDict()
+        self._current: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _key(self, collection: str, query: str) -> tuple:
+        version = self.versions.get(collection)
+        with self._lock:
+            if self._current.get(collection, version) != version:
+                # Re-indexed: results of the old version can never be hit again
+                for key in [k for k in self._entries if k[0] == collection]:
+                    del self._entries[key]
+                self.invalidations += 1
+            self._current[collection] = version
+        return collection, version, normalize_question(query)
+
+    def get(self, collection: str, query: str) -> Optional[List[Document]]:
+        key = self._key(collection, query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Callers extend the list (web search results), so never hand out the cached one
+        return [doc.model_copy() for doc in entry[1]]
+
+    def put(self, collection: str, query: str, documents: List[Document]):
+        key = self._key(collection, query)
+        with self._lock:
+            self._entries[key] = (time.time(), [doc.model_copy() for doc in documents])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def build_retrieval_cache() -> Optional[RetrievalCache]:
+    """The retrieval cache, or None when RETRIEVAL_CACHE_ENABLED is false."""
+    return RetrievalCache() if RETRIEVAL_CACHE_ENABLED else None
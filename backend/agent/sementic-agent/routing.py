@@ -0,0 +1,220 @@
+"""
+Local routing tier that runs before the LLM question router.
+
+Questions are routed to "basic", "vectorstore", "web_search" or "sql" by:
+1. keyword/regex rules (microseconds, no network),
+2. a nearest-centroid classifier over embeddings of the router prompt examples,
+3. the LLM router, only when neither local tier is confident enough.
+
+Every decision is recorded in a bounded trace so the confidence threshold can
+be tuned against how much LLM traffic it cuts.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+logger = logging.getLogger("campusgpt.agent")
+
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.8"))
+FAST_ROUTER_ENABLED = os.getenv("FAST_ROUTER_ENABLED", "true").lower() == "true"
+
+# Softmax temperature used to turn centroid similarities into a confidence
+CENTROID_TEMPERATURE = 0.05
+# Below this cosine similarity to every centroid the question is out of distribution
+CENTROID_MIN_SIMILARITY = float(os.getenv("CENTROID_MIN_SIMILARITY", "0.75"))
+
+GREETING_RE = re.compile(
+    r"^\s*(hi+|hello+|hey+|hiya|yo|greetings|namaste|vanakkam|thanks|thank you|"
+    r"good (morning|afternoon|evening|night))\b[\s\w]{0,20}?[\s!.?,]*$",
+    re.IGNORECASE,
+)
+REALTIME_RE = re.compile(
+    r"\b(latest|today|tonight|tomorrow|yesterday|current|now|recent|recently|news|"
+    r"weather|announcements?|circulars?|upcoming|this (week|month|year)|live)\b",
+    re.IGNORECASE,
+)
+INTERNAL_RE = re.compile(
+    r"\b(nirf|naac|placements?|placed|salary|fundings?|funds?|sponsored|consultancy|"
+    r"intake|expenditure|patents?|faculty|faculties|professors?|doctoral|ph\.?d|"
+    r"demographics?|accreditation|policies|policy|sustainability|executive development|"
+    r"accessibility|reimbursement|students?)\b",
+    re.IGNORECASE,
+)
+
+# Aggregate questions about faculty records go to the SQL route
+AGGREGATE_RE = re.compile(
+    r"\b(how many|number of|count|total|average|avg|mean|median|percentage|proportion|ratio|"
+    r"distribution|breakdown|oldest|youngest|most experienced|least experienced|"
+    r"(?:max|min)imum|highest|lowest|by (?:designation|gender|year|qualification))\b",
+    re.IGNORECASE,
+)
+FACULTY_RE = re.compile(
+    r"\b(faculty|faculties|professors?|teachers?|teaching staff|lecturers?|staff members?|"
+    r"designations?|joined|joinings?)\b",
+    re.IGNORECASE,
+)
+
+EXAMPLE_RE = re.compile(r'Question:\s*(.+?)\s*\n\s*Answer:\s*\{\{?"datasource":\s*"(\w+)"\}\}?')
+
+
+@dataclass
+class RoutingDecision:
+    question: str
+    datasource: str
+    confidence: float
+    tier: str
+    latency_ms: float = 0.0
+    detail: Dict = field(default_factory=dict)
+
+
+def examples_from_prompt(template: str) -> List[tuple]:
+    """Extract (question, datasource) pairs from the router prompt examples."""
+    return [(q.strip(), d) for q, d in EXAMPLE_RE.findall(template)]
+
+
+def rule_decision(question: str) -> Optional[RoutingDecision]:
+    """Classify with keyword rules; None when no rule fires."""
+    realtime = REALTIME_RE.findall(question)
+    internal = INTERNAL_RE.findall(question)
+    if GREETING_RE.match(question) and not (realtime or internal):
+        return RoutingDecision(question, "basic", 0.99, "rules", detail={"rule": "greeting"})
+    if realtime and internal:
+        # Mixed signals ("current placement stats"): let a later tier decide
+        return RoutingDecision(question, "vectorstore", 0.5, "rules", detail={"rule": "mixed"})
+    if realtime:
+        return RoutingDecision(question, "web_search", 0.9, "rules", detail={"rule": "realtime"})
+    if AGGREGATE_RE.search(question) and FACULTY_RE.search(question):
+        return RoutingDecision(question, "sql", 0.9, "rules", detail={"rule": "faculty_aggregate"})
+    if internal:
+        return RoutingDecision(question, "vectorstore", 0.9, "rules", detail={"rule": "internal"})
+    return None
+
+
+class CentroidClassifier:
+    """Nearest-centroid classifier over normalized example embeddings."""
+
+    def __init__(self, embeddings, examples: List[tuple]):
+        self.embeddings = embeddings
+        self.examples = examples
+        self.labels = []
+        self.centroids = None
+        self._lock = threading.Lock()
+
+    def _fit(self):
+        vectors = np.asarray(self.embeddings.embed_documents([q for q, _ in self.examples]), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        labels = sorted({d for _, d in self.examples})
+        centroids = np.stack([
+            vectors[[i for i, (_, d) in enumerate(self.examples) if d == label]].mean(axis=0)
+            for label in labels
+        ])
+        self.centroids = centroids / np.linalg.norm(centroids, axis=1, keepdims=True)
+        self.labels = labels
+
+    def _ensure_fitted(self):
+        with self._lock:
+            if self.centroids is None:
+                self._fit()
+
+    def predict(self, question: str) -> tuple:
+        """Return (label, confidence, similarities)."""
+        self._ensure_fitted()
+        return self._classify(self.embeddings.embed_query(question))
+
+    async def apredict(self, question: str) -> tuple:
+        if self.centroids is None:
+            # One-off; the example embeddings come from the embedding cache
+            await asyncio.to_thread(self._ensure_fitted)
+        return self._classify(await self.embeddings.aembed_query(question))
+
+    def _classify(self, vector) -> tuple:
+        query = np.asarray(vector, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        similarities = self.centroids @ query
+
+        weights = np.exp((similarities - similarities.max()) / CENTROID_TEMPERATURE)
+        probabilities = weights / weights.sum()
+        best = int(np.argmax(probabilities))
+        confidence = float(probabilities[best]) if similarities[best] >= CENTROID_MIN_SIMILARITY else 0.0
+        return self.labels[best], confidence, dict(zip(self.labels, similarities.round(4).tolist()))
+
+
+class FastRouter:
+    """Rules → centroid → LLM routing with a decision trace."""
+
+    def __init__(self, examples: List[tuple], embeddings=None,
+                 confidence_threshold: float = ROUTER_CONFIDENCE_THRESHOLD, trace_size: int = 500):
+        self.confidence_threshold = confidence_threshold
+        self.classifier = CentroidClassifier(embeddings, examples) if embeddings is not None and examples else None
+        self.trace = deque(maxlen=trace_size)
+
+    def route(self, question: str, llm_route: Callable[[str], str]) -> RoutingDecision:
+        """Route locally when confident, otherwise defer to `llm_route`."""
+        start = time.perf_counter()
+        decision = rule_decision(question) if FAST_ROUTER_ENABLED else None
+
+        if self._unsure(decision) and FAST_ROUTER_ENABLED and self.classifier is not None:
+            try:
+                decision = self._centroid(question, decision, self.classifier.predict(question))
+            except Exception as e:
+                logger.warning(f"Centroid router failed, skipping: {e}")
+
+        if self._unsure(decision):
+            decision = self._llm(question, llm_route(question), decision)
+        return self._record(decision, start)
+
+    async def aroute(self, question: str, allm_route: Callable[[str], Awaitable[str]]) -> RoutingDecision:
+        """`route` with the embedding and LLM calls awaited."""
+        start = time.perf_counter()
+        decision = rule_decision(question) if FAST_ROUTER_ENABLED else None
+
+        if self._unsure(decision) and FAST_ROUTER_ENABLED and self.classifier is not None:
+            try:
+                decision = self._centroid(question, decision, await self.classifier.apredict(question))
+            except Exception as e:
+                logger.warning(f"Centroid router failed, skipping: {e}")
+
+        if self._unsure(decision):
+            decision = self._llm(question, await allm_route(question), decision)
+        return self._record(decision, start)
+
+    def _unsure(self, decision: Optional[RoutingDecision]) -> bool:
+        return decision is None or decision.confidence < self.confidence_threshold
+
+    @staticmethod
+    def _centroid(question, decision, prediction) -> RoutingDecision:
+        label, confidence, similarities = prediction
+        if decision is None or confidence > decision.confidence:
+            return RoutingDecision(question, label, confidence, "centroid", detail={"similarities": similarities})
+        return decision
+
+    @staticmethod
+    def _llm(question, datasource, local) -> RoutingDecision:
+        decision = RoutingDecision(question, datasource, 1.0, "llm")
+        if local is not None:
+            decision.detail = {"local": local.datasource, "local_tier": local.tier, "local_confidence": local.confidence}
+        return decision
+
+    def _record(self, decision: RoutingDecision, start: float) -> RoutingDecision:
+        decision.latency_ms = (time.perf_counter() - start) * 1000
+        self.trace.append(decision)
+        return decision
+
+    def trace_summary(self) -> dict:
+        """Counts of decisions by tier and datasource over the trace window."""
+        return {
+            "decisions": len(self.trace),
+            "by_tier": dict(Counter(d.tier for d in self.trace)),
+            "by_datasource": dict(Counter(d.datasource for d in self.trace)),
+            "llm_share": sum(d.tier == "llm" for d in self.trace) / len(self.trace) if self.trace else 0.0,
+        }
@@ -0,0 +1,412 @@
+"""
+Semantic answer cache for the agent graph.
+
+Answers are stored under a normalized form of the question. A question that
+misses the exact key is embedded and compared (cosine similarity) against the
+cached questions, so paraphrases like "placement statistics?" and "Placement
+statistics" hit the same entry without calling any LLM.
+
+Entries expire after a TTL and the least recently used entries are evicted once
+the cache holds `max_entries`. Valkey (see docker-compose.yml) is used when it
+is reachable; otherwise an in-process backend with the same semantics is used.
+
+Question vectors are kept apart from the answers, as packed float32 (Valkey
+stores them as binary hash values), and each process keeps them in a
+`VectorIndex`: a normalized float32 matrix updated in place, so a miss is one
+matrix-vector product instead of decoding every stored vector. With Valkey a
+version counter tells a process when another worker changed the vectors; it
+then fetches only the entries it does not have yet.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+logger = logging.getLogger("campusgpt.agent")
+
+VALKEY_URL = os.getenv("VALKEY_URL", "redis://localhost:6379/0")
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", str(24 * 60 * 60)))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+
+KEY_PREFIX = "campusgpt:answer:"
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    question = re.sub(r"[^\w\s]", " ", question.lower())
+    return " ".join(question.split())
+
+
+def cache_key(question: str) -> str:
+    """Stable key for the normalized question."""
+    return hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+
+
+# Valkey hash value: expiry timestamp (float64) followed by the float32 vector
+VECTOR_HEADER = struct.Struct("<d")
+
+
+def pack_vector(vector, expires_at: float) -> bytes:
+    return VECTOR_HEADER.pack(expires_at) + np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def unpack_vector(blob: bytes) -> Tuple[np.ndarray, float]:
+    (expires_at,) = VECTOR_HEADER.unpack_from(blob)
+    return np.frombuffer(blob, dtype=np.float32, offset=VECTOR_HEADER.size), expires_at
+
+
+class VectorIndex:
+    """Normalized question vectors in one float32 matrix, kept between lookups."""
+
+    def __init__(self):
+        self._rows = np.zeros((0, 0), dtype=np.float32)
+        self._expires = np.zeros(0)
+        self._keys: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._positions
+
+    def keys(self) -> set:
+        return set(self._positions)
+
+    def add(self, key: str, vector, expires_at: float):
+        row = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(row)
+        with self._lock:
+            if self._rows.shape[1] != row.shape[0]:
+                # First vector, or the embedding model changed: old vectors are not comparable
+                self._reset(row.shape[0])
+            position = self._positions.get(key)
+            if position is None:
+                position = len(self._keys)
+                if position == self._rows.shape[0]:
+                    self._grow()
+                self._keys.append(key)
+                self._positions[key] = position
+            self._rows[position] = row / norm if norm else row
+            self._expires[position] = expires_at
+
+    def remove(self, keys: Iterable[str]):
+        with self._lock:
+            for key in keys:
+                position = self._positions.pop(key, None)
+                if position is None:
+                    continue
+                # Move the last row into the hole
+                last = len(self._keys) - 1
+                if position != last:
+                    moved = self._keys[last]
+                    self._rows[position] = self._rows[last]
+                    self._expires[position] = self._expires[last]
+                    self._keys[position] = moved
+                    self._positions[moved] = position
+                self._keys.pop()
+
+    def clear(self):
+        with self._lock:
+            self._reset(0)
+
+    def expired(self, now: float) -> List[str]:
+        with self._lock:
+            return [self._keys[i] for i in np.flatnonzero(self._expires[:len(self._keys)] <= now)]
+
+    def nearest(self, vector, now: float) -> Tuple[Optional[str], float]:
+        """Most similar live key and its cosine similarity."""
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        with self._lock:
+            count = len(self._keys)
+            if count == 0 or self._rows.shape[1] != query.shape[0]:
+                return None, 0.0
+            scores = self._rows[:count] @ (query / norm if norm else query)
+            scores[self._expires[:count] <= now] = -np.inf
+            best = int(np.argmax(scores))
+            if not np.isfinite(scores[best]):
+                return None, 0.0
+            return self._keys[best], float(scores[best])
+
+    def _reset(self, dim: int):
+        self._rows = np.zeros((0, dim), dtype=np.float32)
+        self._expires = np.zeros(0)
+        self._keys = []
+        self._positions = {}
+
+    def _grow(self):
+        capacity = max(16, 2 * self._rows.shape[0])
+        rows = np.zeros((capacity, self._rows.shape[1]), dtype=np.float32)
+        rows[:self._rows.shape[0]] = self._rows
+        expires = np.zeros(capacity)
+        expires[:self._expires.shape[0]] = self._expires
+        self._rows, self._expires = rows, expires
+
+
+class InMemoryCacheBackend:
+    """Process-local LRU + TTL store, used when Valkey is not available."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.index = VectorIndex()
+
+    def _expired(self, entry: dict) -> bool:
+        return time.time() - entry["created_at"] > self.ttl
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry):
+                del self._entries[key]
+                self.index.remove([key])
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: dict, vector=None):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if vector is not None:
+                self.index.add(key, vector, entry["created_at"] + self.ttl)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self.index.remove([evicted])
+
+    def nearest(self, vector) -> Tuple[Optional[str], float]:
+        return self.index.nearest(vector, time.time())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.index.clear()
+
+
+class ValkeyCacheBackend:
+    """
+    Valkey-backed LRU + TTL store.
+
+    Each entry is a JSON string with a native expiry. A sorted set scored by last
+    access time provides LRU eviction. Question vectors live in a hash as packed
+    float32 (read through `raw_client`, which does not decode responses), and a
+    counter bumped on every change tells each process when to sync its VectorIndex.
+    """
+
+    name = "valkey"
+
+    def __init__(self, client, raw_client, max_entries: int, ttl: int):
+        self.client = client
+        self.raw_client = raw_client
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lru_key = f"{KEY_PREFIX}lru"
+        self.vectors_key = f"{KEY_PREFIX}vectors:f32"
+        self.version_key = f"{KEY_PREFIX}vectors:version"
+        self.index = VectorIndex()
+        # Nothing synced yet (the version key may not exist)
+        self._synced_version = object()
+        self._sync_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        raw = self.client.get(KEY_PREFIX + key)
+        if raw is None:
+            # Only a vector left behind by an expired answer needs cleaning up; a new
+            # question (the common miss) costs no extra round trip
+            if key in self.index:
+                self._forget([key])
+            return None
+        self.client.zadd(self.lru_key, {key: time.time()})
+        return json.loads(raw)
+
+    def put(self, key: str, entry: dict, vector=None):
+        pipe = self.client.pipeline()
+        pipe.set(KEY_PREFIX + key, json.dumps(entry), ex=self.ttl)
+        pipe.zadd(self.lru_key, {key: time.time()})
+        if vector is not None:
+            pipe.hset(self.vectors_key, key, pack_vector(vector, entry["created_at"] + self.ttl))
+            pipe.incr(self.version_key)
+        pipe.execute()
+        if vector is not None:
+            self.index.add(key, vector, entry["created_at"] + self.ttl)
+
+        overflow = self.client.zcard(self.lru_key) - self.max_entries
+        if overflow > 0:
+            evicted = [k for k, _ in self.client.zpopmin(self.lru_key, overflow)]
+            self.client.delete(*[KEY_PREFIX + k for k in evicted])
+            self._forget(evicted)
+
+    def nearest(self, vector) -> Tuple[Optional[str], float]:
+        self._sync()
+        return self.index.nearest(vector, time.time())
+
+    def _sync(self):
+        """Bring the local VectorIndex in line with the hash when another process changed it."""
+        with self._sync_lock:
+            version = self.client.get(self.version_key)
+            if version == self._synced_version:
+                return
+            stored = {k.decode() for k in self.raw_client.hkeys(self.vectors_key)}
+            local = self.index.keys()
+            self.index.remove(local - stored)
+            added = list(stored - local)
+            if added:
+                for key, blob in zip(added, self.raw_client.hmget(self.vectors_key, added)):
+                    if blob is not None:
+                        vector, expires_at = unpack_vector(blob)
+                        self.index.add(key, vector, expires_at)
+            self._synced_version = version
+        # Vectors whose answer has expired (Valkey dropped the answer itself)
+        self._forget(self.index.expired(time.time()))
+
+    def _forget(self, keys: List[str]):
+        if keys:
+            pipe = self.client.pipeline()
+            pipe.zrem(self.lru_key, *keys)
+            pipe.hdel(self.vectors_key, *keys)
+            _, removed = pipe.execute()
+            # A plain miss removes nothing and must not make every process resync
+            if removed:
+                self.client.incr(self.version_key)
+            self.index.remove(keys)
+
+    def clear(self):
+        keys = self.client.zrange(self.lru_key, 0, -1)
+        if keys:
+            self.client.delete(*[KEY_PREFIX + k for k in keys])
+        self.client.delete(self.lru_key, self.vectors_key)
+        self.client.incr(self.version_key)
+        self.index.clear()
+
+
+class SemanticCache:
+    """Answer cache with exact and embedding-similarity lookups."""
+
+    def __init__(self, backend, embeddings=None, similarity_threshold: float = SEMANTIC_CACHE_THRESHOLD):
+        self.backend = backend
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, question: str) -> Optional[dict]:
+        """
+        Return the cached entry for the question, or None.
+
+        The entry is a dict with 'question', 'generation', 'sources' and
+        'similarity' (1.0 for exact key matches).
+        """
+        entry = self.backend.get(cache_key(question))
+        similarity = 1.0
+
+        if entry is None and self.embeddings is not None:
+            key, similarity = self._nearest(self.embeddings.embed_query(question))
+            if key is not None:
+                entry = self.backend.get(key)
+        return self._result(entry, similarity)
+
+    async def alookup(self, question: str) -> Optional[dict]:
+        """`lookup` with the embedding call awaited and backend calls off the event loop."""
+        entry = await asyncio.to_thread(self.backend.get, cache_key(question))
+        similarity = 1.0
+
+        if entry is None and self.embeddings is not None:
+            vector = await self.embeddings.aembed_query(question)
+            key, similarity = await asyncio.to_thread(self._nearest, vector)
+            if key is not None:
+                entry = await asyncio.to_thread(self.backend.get, key)
+        return self._result(entry, similarity)
+
+    def _result(self, entry: Optional[dict], similarity: float) -> Optional[dict]:
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return {
+            "question": entry["question"],
+            "generation": entry["generation"],
+            "sources": entry.get("sources", []),
+            "similarity": similarity,
+        }
+
+    def store(self, question: str, generation: str, sources: Optional[List[str]] = None):
+        """Cache a verified answer for the question."""
+        vector = self.embeddings.embed_query(question) if self.embeddings is not None else None
+        self.backend.put(cache_key(question), self._entry(question, generation, sources), vector)
+
+    async def astore(self, question: str, generation: str, sources: Optional[List[str]] = None):
+        vector = await self.embeddings.aembed_query(question) if self.embeddings is not None else None
+        await asyncio.to_thread(self.backend.put, cache_key(question), self._entry(question, generation, sources), vector)
+
+    @staticmethod
+    def _entry(question, generation, sources) -> dict:
+        return {
+            "question": question,
+            "generation": generation,
+            "sources": sources or [],
+            "created_at": time.time(),
+        }
+
+    def _nearest(self, vector) -> tuple:
+        """Find the most similar cached question above the threshold."""
+        key, score = self.backend.nearest(vector)
+        if key is None or score < self.similarity_threshold:
+            return None, score
+        return key, score
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def build_semantic_cache(embeddings=None) -> Optional[SemanticCache]:
+    """
+    Build the answer cache, preferring Valkey and falling back to memory.
+
+    Returns None when SEMANTIC_CACHE_ENABLED is false.
+    """
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+
+    backend = None
+    try:
+        import redis
+
+        client = redis.Redis.from_url(VALKEY_URL, decode_responses=True, socket_connect_timeout=0.5)
+        client.ping()
+        # Vectors are binary hash values
+        raw_client = redis.Redis.from_url(VALKEY_URL, socket_connect_timeout=0.5)
+        backend = ValkeyCacheBackend(client, raw_client, SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Semantic cache: Valkey unavailable ({e}), using in-memory cache")
+
+    if backend is None:
+        backend = InMemoryCacheBackend(SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_TTL)
+    return SemanticCache(backend, embeddings)
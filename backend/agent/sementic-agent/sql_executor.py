@@ -0,0 +1,237 @@
+"""
+Read-only SQL executor for the structured-query (`sql`) route.
+
+The LLM writes a single parameterized SELECT (psycopg2 `%(name)s`
+placeholders, values passed separately) over the tables loaded by
+`agent/extraction/extraction.py`. Before anything reaches Postgres the query
+is parsed with sqlglot and checked: one SELECT (or set operation) with no
+write/lock clauses, every table it references (comma joins, subqueries,
+LATERAL, CTE bodies) allowlisted, and only allowlisted functions, which rules
+out dynamic SQL such as `query_to_xml`. It then runs in a READ ONLY
+transaction with a `statement_timeout`, and at most `max_rows` rows are fetched.
+
+It connects as NIRF_READER_DATABASE_URL, the SELECT-only role extraction.py
+grants on the allowlisted tables, so a query that slipped through could still
+only read them.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+from sqlglot.optimizer.scope import traverse_scope
+
+from preprocessing.nirf_schema import QUERYABLE_TABLES
+
+
+logger = logging.getLogger("campusgpt.agent")
+
+# SELECT-only role created by agent/extraction/extraction.py, never the table owner.
+# No default: the login's password is set by the operator (NIRF_READER_PASSWORD).
+NIRF_READER_DATABASE_URL = os.getenv("NIRF_READER_DATABASE_URL", "")
+SQL_STATEMENT_TIMEOUT_MS = int(os.getenv("SQL_STATEMENT_TIMEOUT_MS", "3000"))
+SQL_MAX_ROWS = int(os.getenv("SQL_MAX_ROWS", "50"))
+SQL_POOL_SIZE = int(os.getenv("SQL_POOL_SIZE", "4"))
+
+# Queryable tables and their columns, the same set extraction.py grants the reader role
+ALLOWED_TABLES = QUERYABLE_TABLES
+
+# Functions the generated SQL may call, by sqlglot's canonical name (string_agg parses as
+# group_concat, bool_or as logical_or, to_char as time_to_str, date_trunc as timestamp_trunc).
+# Anything else (query_to_xml, pg_read_file, dblink, set_config, pg_sleep, ...) is rejected.
+ALLOWED_FUNCTIONS = {
+    # aggregates
+    "count", "sum", "avg", "min", "max", "stddev", "stddev_pop", "stddev_samp", "variance", "variance_pop",
+    "group_concat", "array_agg", "logical_and", "logical_or", "percentile_cont", "percentile_disc", "mode",
+    # window functions
+    "row_number", "rank", "dense_rank", "percent_rank", "cume_dist", "ntile", "lag", "lead",
+    "first_value", "last_value",
+    # conditionals and casts
+    "case", "if", "coalesce", "nullif", "greatest", "least", "cast", "exists",
+    # numbers
+    "abs", "ceil", "floor", "round", "trunc", "power", "sqrt", "sign",
+    # text
+    "lower", "upper", "initcap", "length", "trim", "substring", "left", "right", "concat", "concat_ws",
+    "replace", "split_part", "str_position", "pad", "reverse", "starts_with",
+    # dates
+    "extract", "age", "date", "current_date", "current_timestamp", "localtimestamp", "timestamp_trunc",
+    "date_trunc", "time_to_str", "str_to_date", "make_interval", "justify_interval",
+}
+# Statements and clauses that write, lock or run something other than a query
+FORBIDDEN_NODES = (exp.DML, exp.DDL, exp.Command, exp.Into, exp.Lock)
+
+class UnsafeQueryError(ValueError):
+    """The generated query failed validation and was not executed."""
+
+
+@dataclass
+class QueryResult:
+    query: str
+    params: Dict[str, Any]
+    columns: List[str]
+    rows: List[tuple]
+    truncated: bool = False
+    elapsed_ms: float = 0.0
+    # Allowlisted tables the query reads, in order of first reference
+    tables: List[str] = field(default_factory=list)
+
+    def to_markdown(self) -> str:
+        """Result as a markdown table (what the answer prompt and sources see)."""
+        if not self.rows:
+            return "(no rows)"
+        lines = [
+            "| " + " | ".join(self.columns) + " |",
+            "| " + " | ".join("---" for _ in self.columns) + " |",
+        ]
+        lines += ["| " + " | ".join("" if v is None else str(v) for v in row) + " |" for row in self.rows]
+        if self.truncated:
+            lines.append(f"(first {len(self.rows)} rows only)")
+        return "\n".join(lines)
+
+
+def schema_description() -> str:
+    """Table/column listing for the query-writing prompt."""
+    return "\n".join(f"{table}({', '.join(columns)})" for table, columns in ALLOWED_TABLES.items())
+
+
+def validate_query(query: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Check a generated query and return it without trailing semicolons.
+
+    Raises:
+        UnsafeQueryError: when the query is not a single allowlisted SELECT
+    """
+    return validate_query_tables(query, params)[0]
+
+
+def validate_query_tables(query: str, params: Optional[Dict[str, Any]] = None) -> Tuple[str, List[str]]:
+    """`validate_query` that also returns the allowlisted tables the query reads."""
+    query = query.strip().rstrip(";").strip()
+    if not query:
+        raise UnsafeQueryError("empty query")
+    try:
+        statements = sqlglot.parse(query, read="postgres")
+    except SqlglotError as e:
+        raise UnsafeQueryError(f"could not parse query: {e}") from e
+    if len(statements) != 1 or statements[0] is None:
+        raise UnsafeQueryError("multiple statements")
+    tree = statements[0]
+    if not isinstance(tree, (exp.Select, exp.SetOperation)):
+        raise UnsafeQueryError("only SELECT queries are allowed")
+
+    forbidden = next(tree.find_all(*FORBIDDEN_NODES), None)
+    if forbidden is not None:
+        raise UnsafeQueryError(f"not allowed in a query: {forbidden.key.upper()}")
+
+    for func in tree.find_all(exp.Func):
+        name = func.name if isinstance(func, exp.Anonymous) else func.sql_name()
+        if name.lower() not in ALLOWED_FUNCTIONS:
+            raise UnsafeQueryError(f"function not allowed: {name}")
+
+    # Every table reference (comma joins, subqueries, LATERAL, set operations) is either a CTE
+    # visible in its scope or an allowlisted table; a CTE name does not hide a table elsewhere
+    try:
+        cte_refs = {
+            id(table)
+            for scope in traverse_scope(tree)
+            for table in scope.tables
+            if not table.db and table.name in scope.cte_sources
+        }
+    except SqlglotError as e:
+        raise UnsafeQueryError(f"could not resolve tables: {e}") from e
+    tables = []
+    for table in tree.find_all(exp.Table):
+        if id(table) in cte_refs:
+            continue
+        if table.name not in ALLOWED_TABLES or table.catalog or table.db not in ("", "public"):
+            raise UnsafeQueryError(f"table not allowed: {table.sql('postgres') or 'table function'}")
+        if table.name not in tables:
+            tables.append(table.name)
+
+    for key, value in (params or {}).items():
+        if not isinstance(value, (str, int, float, bool, type(None))):
+            raise UnsafeQueryError(f"parameter {key} must be a scalar")
+    return query, tables
+
+
+def reader_dsn(dsn: str) -> str:
+    """psycopg2 form of a reader DSN; an empty one is kept and rejected on first connect."""
+    return re.sub(r"^postgresql\+\w+://", "postgresql://", dsn or "")
+
+
+def require_reader_dsn(dsn: str) -> str:
+    if not dsn:
+        raise RuntimeError("NIRF_READER_DATABASE_URL is not set; point it at the SELECT-only role "
+                           "created by agent/extraction/extraction.py")
+    return dsn
+
+
+class SqlExecutor:
+    """Pooled, read-only, time- and row-limited query runner."""
+
+    def __init__(self, dsn: str = NIRF_READER_DATABASE_URL, statement_timeout_ms: int = SQL_STATEMENT_TIMEOUT_MS,
+                 max_rows: int = SQL_MAX_ROWS, pool_size: int = SQL_POOL_SIZE):
+        self.dsn = reader_dsn(dsn)
+        self.statement_timeout_ms = statement_timeout_ms
+        self.max_rows = max_rows
+        self.pool_size = pool_size
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        """Connection pool, opened on first query so importing the graph needs no database."""
+        with self._lock:
+            if self._pool is None:
+                from psycopg2.pool import ThreadedConnectionPool
+
+                self._pool = ThreadedConnectionPool(1, self.pool_size, require_reader_dsn(self.dsn))
+                self._check_role()
+        return self._pool
+
+    def _check_role(self):
+        conn = self._pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT current_user, rolsuper FROM pg_roles WHERE rolname = current_user")
+                user, superuser = cur.fetchone()
+        finally:
+            conn.rollback()
+            self._pool.putconn(conn)
+        if superuser:
+            logger.warning(f"SQL route connects as superuser {user}; point NIRF_READER_DATABASE_URL at "
+                           f"the SELECT-only role created by extraction.py")
+
+    def run(self, query: str, params: Optional[Dict[str, Any]] = None) -> QueryResult:
+        """Validate and execute a query; the transaction is always rolled back."""
+        query, tables = validate_query_tables(query, params)
+        start = time.perf_counter()
+        conn = self.pool.getconn()
+        try:
+            conn.set_session(readonly=True, autocommit=False)
+            with conn.cursor() as cur:
+                cur.execute("SET LOCAL statement_timeout = %s", (self.statement_timeout_ms,))
+                # No params: skip interpolation so a literal '%' is left alone
+                cur.execute(query, params or None)
+                rows = cur.fetchmany(self.max_rows + 1)
+                columns = [d[0] for d in cur.description]
+        finally:
+            conn.rollback()
+            self.pool.putconn(conn)
+
+        return QueryResult(
+            query=query,
+            params=params or {},
+            columns=columns,
+            rows=[tuple(r) for r in rows[:self.max_rows]],
+            truncated=len(rows) > self.max_rows,
+            elapsed_ms=(time.perf_counter() - start) * 1000,
+            tables=tables,
+        )
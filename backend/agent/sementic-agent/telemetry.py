@@ -0,0 +1,318 @@
+"""
+Per-request tracing and process metrics for the agent graph.
+
+`RequestTrace` is a LangChain callback handler passed in the run config:
+
+    trace = RequestTrace(thread_id=thread_id, edges=graph_edge_names(workflow))
+    agent.invoke(inputs, config={"configurable": {...}, "callbacks": [trace]})
+    summary = trace.finish(state)
+
+It records, per graph node (and per conditional edge such as
+`route_cached_question`, where the router runs), wall time, LLM calls and
+tokens in/out. LLM calls are charged to the innermost node/edge they ran
+under, including calls made from the grader thread pool. `finish()` adds
+retries and cache hits, updates the process-wide `REGISTRY` (served as
+Prometheus text on the backend's `/metrics`) and, with AGENT_TRACE_LOG=true,
+logs the summary as one JSON line on the `campusgpt.trace` logger.
+
+Progress messages from the nodes go through `logger` (`campusgpt.agent`) at
+INFO, so they are silent unless AGENT_LOG_LEVEL is INFO or DEBUG.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+AGENT_LOG_LEVEL = os.getenv("AGENT_LOG_LEVEL", "WARNING").upper()
+AGENT_TRACE_LOG = os.getenv("AGENT_TRACE_LOG", "false").lower() == "true"
+
+logger = logging.getLogger("campusgpt.agent")
+trace_logger = logging.getLogger("campusgpt.trace")
+
+
+def configure_logging(level: str = AGENT_LOG_LEVEL):
+    """Attach a stderr handler to the `campusgpt` loggers (once) and set the agent log level."""
+    root = logging.getLogger("campusgpt")
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        root.addHandler(handler)
+        root.propagate = False
+    logger.setLevel(level)
+    trace_logger.setLevel(logging.INFO if AGENT_TRACE_LOG else logging.WARNING)
+
+
+configure_logging()
+
+
+# Metrics
+
+# Seconds; covers cache hits (ms) up to multi-retry generations
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labels, k)} {v:g}" for k, v in sorted(self.values.items())]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self.values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels):
+        series = self.values.setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), key + (f'{bound:g}',))} {count:g}")
+            lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), key + ('+Inf',))} {series[-2]:g}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {series[-2]:g}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide metrics; `render()` returns the Prometheus text exposition format."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics: List[Any] = []
+        # name -> (help, fn returning {labels tuple: value}, label names)
+        self.gauges: Dict[str, Tuple[str, Callable[[], Dict[Tuple[str, ...], float]], Tuple[str, ...]]] = {}
+
+    def counter(self, name, help, labels=()) -> Counter:
+        metric = Counter(name, help, tuple(labels))
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, tuple(labels), buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def gauge_callback(self, name, help, fn, labels=()):
+        """Gauge read at scrape time, e.g. cache statistics kept elsewhere."""
+        self.gauges[name] = (help, fn, tuple(labels))
+
+    def render(self) -> str:
+        with self.lock:
+            lines = [line for metric in self.metrics for line in metric.render()]
+        for name, (help, fn, labels) in self.gauges.items():
+            try:
+                values = fn()
+            except Exception as e:
+                logger.warning(f"Metrics gauge {name} failed: {e}")
+                continue
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+            lines += [f"{name}{_labels(labels, k)} {v:g}" for k, v in sorted(values.items())]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+requests_total = REGISTRY.counter("campusgpt_requests_total", "Agent requests by outcome", ["outcome"])
+request_seconds = REGISTRY.histogram("campusgpt_request_duration_seconds", "Agent request wall time")
+node_seconds = REGISTRY.histogram("campusgpt_node_duration_seconds", "Wall time per graph node or edge", ["node"])
+llm_calls_total = REGISTRY.counter("campusgpt_llm_calls_total", "LLM calls per graph node", ["node"])
+llm_tokens_total = REGISTRY.counter("campusgpt_llm_tokens_total", "LLM tokens per graph node", ["node", "direction"])
+retries_total = REGISTRY.counter("campusgpt_hallucination_retries_total", "Hallucination retries")
+cache_total = REGISTRY.counter("campusgpt_answer_cache_total", "Semantic answer cache lookups", ["result"])
+
+
+# Tracing
+
+def graph_edge_names(workflow) -> set:
+    """Names of the (named) conditional edge functions of a StateGraph, to be traced like nodes."""
+    names = set()
+    for branches in workflow.branches.values():
+        for name, branch in branches.items():
+            # Inline lambdas (named "condition") only read a decision key; not worth a span
+            if getattr(getattr(branch.path, "func", None), "__name__", "") != "<lambda>":
+                names.add(name)
+    return names
+
+
+def _token_usage(response) -> Tuple[int, int]:
+    """(input, output) tokens of an LLMResult, from usage_metadata or the provider's token_usage."""
+    tokens_in = tokens_out = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                tokens_in += usage.get("input_tokens", 0)
+                tokens_out += usage.get("output_tokens", 0)
+    if not (tokens_in or tokens_out):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        tokens_in, tokens_out = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    return tokens_in, tokens_out
+
+
+class RequestTrace(BaseCallbackHandler):
+    """Callback handler collecting node timings and LLM usage for one agent request."""
+
+    # Cheap and lock-protected: run in the calling thread so start/end stay ordered
+    run_inline = True
+
+    def __init__(self, thread_id: Optional[str] = None, edges: Iterable[str] = ()):
+        self.thread_id = thread_id
+        self.edges = set(edges)
+        self.started = time.perf_counter()
+        self.spans: List[dict] = []
+        self._open: Dict[Any, dict] = {}
+        self._parents: Dict[Any, Any] = {}
+        self._llm_span: Dict[Any, Optional[dict]] = {}
+        self._lock = threading.Lock()
+        self._summary = None
+
+    # Spans are the graph nodes (run name == langgraph_node) and the named conditional edges
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        name = kwargs.get("name")
+        node = (metadata or {}).get("langgraph_node")
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            # A node/edge wrapped in RunnableLambda(sync, afunc=async) starts a
+            # child run of the same name; only the outer run is a span
+            nested = parent_run_id in self._open and self._open[parent_run_id]["node"] == name
+            if name and (name == node or name in self.edges) and not nested:
+                self._open[run_id] = {
+                    "node": name, "start": time.perf_counter(), "ms": 0.0,
+                    "llm_calls": 0, "tokens_in": 0, "tokens_out": 0,
+                }
+
+    def _close(self, run_id, outputs=None, error=None):
+        with self._lock:
+            self._parents.pop(run_id, None)
+            span = self._open.pop(run_id, None)
+            if span is None:
+                return
+            start = span.pop("start")
+            # at_ms: offset from the start of the request, for a waterfall view
+            span["at_ms"] = (start - self.started) * 1000
+            span["ms"] = (time.perf_counter() - start) * 1000
+            if isinstance(outputs, dict) and "cache_hit" in outputs:
+                span["cache_hit"] = bool(outputs["cache_hit"])
+            if error is not None:
+                span["error"] = type(error).__name__
+            self.spans.append(span)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._close(run_id, outputs=outputs)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._close(run_id, error=error)
+
+    def _start_llm(self, run_id, parent_run_id):
+        with self._lock:
+            # Charge the call to the innermost open node/edge above it
+            parent = parent_run_id
+            while parent is not None and parent not in self._open:
+                parent = self._parents.get(parent)
+            self._llm_span[run_id] = self._open.get(parent)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        self._start_llm(run_id, parent_run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._start_llm(run_id, parent_run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        tokens_in, tokens_out = _token_usage(response)
+        with self._lock:
+            span = self._llm_span.pop(run_id, None)
+            if span is not None:
+                span["llm_calls"] += 1
+                span["tokens_in"] += tokens_in
+                span["tokens_out"] += tokens_out
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._llm_span.pop(run_id, None)
+
+    def finish(self, state: Optional[dict] = None, error: Optional[BaseException] = None) -> dict:
+        """
+        Close the trace: update the process metrics and emit the structured log (once).
+
+        Args:
+            state (dict): final graph state, if the run completed
+            error: exception that ended the run, if any
+
+        Returns:
+            dict: request summary with per-node spans and totals
+        """
+        if self._summary is not None:
+            return self._summary
+        with self._lock:
+            # Edges finish inside their node; order by start time
+            spans = sorted(self.spans, key=lambda s: s["at_ms"])
+
+        total_ms = (time.perf_counter() - self.started) * 1000
+        cache_hit = next((s["cache_hit"] for s in spans if "cache_hit" in s), None)
+        summary = {
+            "thread_id": self.thread_id,
+            "ms": round(total_ms, 1),
+            "outcome": "error" if error is not None else "ok",
+            "nodes": [s["node"] for s in spans],
+            "retries": sum(1 for s in spans if s["node"] == "handle_hallucination"),
+            "cache_hit": cache_hit,
+            "llm_calls": sum(s["llm_calls"] for s in spans),
+            "tokens_in": sum(s["tokens_in"] for s in spans),
+            "tokens_out": sum(s["tokens_out"] for s in spans),
+            "spans": [{**s, "at_ms": round(s["at_ms"], 1), "ms": round(s["ms"], 1)} for s in spans],
+        }
+        if error is not None:
+            summary["error"] = f"{type(error).__name__}: {error}"
+        if state is not None:
+            summary["sources"] = len(state.get("sources") or [])
+
+        with REGISTRY.lock:
+            requests_total.inc(summary["outcome"])
+            request_seconds.observe(total_ms / 1000)
+            for s in spans:
+                node_seconds.observe(s["ms"] / 1000, s["node"])
+                if s["llm_calls"]:
+                    llm_calls_total.inc(s["node"], amount=s["llm_calls"])
+                    llm_tokens_total.inc(s["node"], "input", amount=s["tokens_in"])
+                    llm_tokens_total.inc(s["node"], "output", amount=s["tokens_out"])
+            if summary["retries"]:
+                retries_total.inc(amount=summary["retries"])
+            if cache_hit is not None:
+                cache_total.inc("hit" if cache_hit else "miss")
+
+        trace_logger.info(json.dumps(summary, default=str))
+        self._summary = summary
+        return summary
@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+# Storage the modules read from env at import time goes to a scratch dir
+_workdir = tempfile.mkdtemp(prefix="campusgpt-tests-")
+os.environ["COLLECTION_VERSION_DIR"] = os.path.join(_workdir, "collection_versions")
+os.environ["BM25_INDEX_DIR"] = os.path.join(_workdir, "bm25")
+os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(_workdir, "embedding_cache.sqlite3")
+os.environ["CHECKPOINTER_BACKEND"] = "memory"
+os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,81 @@
+"""EmbeddingPipeline: resume from a partial checkpoint and retry with backoff, offline."""
+
+import json
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from preprocessing import embedding_pipeline
+from preprocessing.embedding_pipeline import EmbeddingPipeline
+
+
+class CountingEmbeddings:
+    """DeterministicFakeEmbedding that records which texts it embedded."""
+
+    def __init__(self, fail_times=0):
+        self.inner = DeterministicFakeEmbedding(size=8)
+        self.embedded = []
+        self.fail_times = fail_times
+
+    def embed_documents(self, texts):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("rate limited")
+        self.embedded.extend(texts)
+        return self.inner.embed_documents(texts)
+
+
+def items(count=5):
+    return [(f"id-{i}", f"hash-{i}", f"text {i}") for i in range(count)]
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    delays = []
+    monkeypatch.setattr(embedding_pipeline.time, "sleep", delays.append)
+    monkeypatch.setattr(embedding_pipeline.random, "uniform", lambda low, high: high)
+    return delays
+
+
+def pipeline(embeddings, **kwargs):
+    return EmbeddingPipeline(embeddings, batch_size=2, rate_per_minute=1e9, **kwargs)
+
+
+def test_resumes_from_partial_checkpoint(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    fake = DeterministicFakeEmbedding(size=8)
+    done = [{"id": f"id-{i}", "hash": f"hash-{i}", "vector": fake.embed_query(f"text {i}")} for i in range(2)]
+    # A stale hash and a torn last line, as left by a run killed mid-write
+    done.append({"id": "id-2", "hash": "old-hash", "vector": [0.0] * 8})
+    path.write_text("".join(json.dumps(record) + "\n" for record in done) + '{"id": "id-3", "ha')
+
+    embeddings = CountingEmbeddings()
+    vectors = pipeline(embeddings, checkpoint_path=str(path)).run(items())
+
+    assert sorted(embeddings.embedded) == ["text 2", "text 3", "text 4"]
+    assert set(vectors) == {f"id-{i}" for i in range(5)}
+    for i in range(5):
+        assert vectors[f"id-{i}"] == pytest.approx(fake.embed_query(f"text {i}"))
+
+    # Everything is checkpointed now: a rerun embeds nothing
+    rerun = CountingEmbeddings()
+    assert pipeline(rerun, checkpoint_path=str(path)).run(items()) == vectors
+    assert rerun.embedded == []
+
+
+def test_retries_with_exponential_backoff(no_sleep):
+    embeddings = CountingEmbeddings(fail_times=3)
+    vectors = pipeline(embeddings, max_in_flight=1, base_delay=1.0, max_delay=3.0).run(items(1))
+
+    assert list(vectors) == ["id-0"]
+    assert no_sleep == [1.0, 2.0, 3.0]
+
+
+def test_gives_up_after_max_retries(no_sleep, tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    embeddings = CountingEmbeddings(fail_times=10)
+
+    with pytest.raises(RuntimeError, match="rate limited"):
+        pipeline(embeddings, max_in_flight=1, max_retries=2, checkpoint_path=str(path)).run(items(1))
+    assert len(no_sleep) == 2
+    assert not path.exists()
@@ -0,0 +1,144 @@
+"""
+Faculty COPY loader (agent/extraction/extraction.py).
+
+CopyStream is tested offline. The swap and upsert loads run against a real
+Postgres when TEST_DATABASE_URL is set (e.g. a throwaway local container), in
+a scratch schema inside a transaction that is rolled back.
+"""
+
+import csv
+import io
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                "extraction"))
+import extraction  # noqa: E402
+from extraction import COLUMNS, CopyStream, load_faculty_data  # noqa: E402
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def faculty(srno, name, **values):
+    row = dict.fromkeys(COLUMNS)
+    row.update(srno=srno, name=name, designation="Professor", gender="Male", currently_working=True)
+    row.update(values)
+    return row
+
+
+TRICKY = [
+    faculty(1, 'Rao, "Ravi" K.', qualification="Ph.D.\nD.Sc."),
+    faculty(2, "O'Neil \\ Back", designation=None, joining_date=date(2010, 6, 1), experience_years=12.5),
+    faculty(3, "Plain", currently_working=False),
+]
+
+
+def test_copy_stream_round_trips_through_csv():
+    stream = CopyStream(TRICKY)
+    text = stream.read()
+
+    assert stream.count == 3
+    parsed = list(csv.reader(io.StringIO(text)))
+    assert [row[:2] for row in parsed] == [["1", 'Rao, "Ravi" K.'], ["2", "O'Neil \\ Back"], ["3", "Plain"]]
+    assert parsed[0][COLUMNS.index("qualification")] == "Ph.D.\nD.Sc."
+    # None is an unquoted empty field, which COPY csv reads as NULL
+    assert parsed[1][COLUMNS.index("designation")] == ""
+    assert ',,' in text.splitlines()[0]
+    assert parsed[1][COLUMNS.index("joining_date")] == "2010-06-01"
+
+
+def test_copy_stream_reads_in_small_chunks_lazily():
+    rows = iter(TRICKY)
+    stream = CopyStream(rows)
+    first = stream.read(5)
+    # Only the first row was encoded for a 5-character read
+    assert stream.count == 1
+    rest = ""
+    while True:
+        chunk = stream.read(7)
+        if not chunk:
+            break
+        rest += chunk
+    assert first + rest == CopyStream(TRICKY).read()
+
+
+@pytest.fixture
+def cursor():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    import psycopg2
+
+    conn = psycopg2.connect(TEST_DATABASE_URL)
+    cur = conn.cursor()
+    cur.execute("CREATE SCHEMA campusgpt_test")
+    cur.execute("SET LOCAL search_path TO campusgpt_test, public")
+    try:
+        yield cur
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def table(cursor):
+    cursor.execute("SELECT srno, name, designation, qualification FROM faculty_details ORDER BY srno, name")
+    return cursor.fetchall()
+
+
+def unique_key_exists(cursor):
+    cursor.execute("SELECT 1 FROM pg_indexes WHERE schemaname = 'campusgpt_test' "
+                   "AND indexname = 'uq_faculty_srno_name'")
+    return cursor.fetchone() is not None
+
+
+@pytest.mark.parametrize("mode", ["swap", "upsert"])
+def test_load_keeps_first_duplicate_in_both_modes(cursor, mode):
+    rows = TRICKY + [faculty(1, 'Rao, "Ravi" K.', designation="Duplicate")]
+
+    assert load_faculty_data(cursor, rows, mode) == 3
+    assert table(cursor) == [
+        (1, 'Rao, "Ravi" K.', "Professor", "Ph.D.\nD.Sc."),
+        (2, "O'Neil \\ Back", None, None),
+        (3, "Plain", "Professor", None),
+    ]
+    assert unique_key_exists(cursor)
+
+
+def test_swap_replaces_the_table(cursor):
+    load_faculty_data(cursor, TRICKY, "swap")
+    load_faculty_data(cursor, [faculty(4, "New")], "swap")
+
+    assert table(cursor) == [(4, "New", "Professor", None)]
+    assert unique_key_exists(cursor)
+
+
+def test_upsert_updates_inserts_and_deletes(cursor):
+    load_faculty_data(cursor, TRICKY, "swap")
+    cursor.execute("SELECT id FROM faculty_details WHERE srno = 3")
+    (kept_id,) = cursor.fetchone()
+
+    load_faculty_data(cursor, [TRICKY[0], faculty(3, "Plain", designation="Dean"), faculty(4, "New")], "upsert")
+
+    assert table(cursor) == [
+        (1, 'Rao, "Ravi" K.', "Professor", "Ph.D.\nD.Sc."),
+        (3, "Plain", "Dean", None),
+        (4, "New", "Professor", None),
+    ]
+    # Updated in place, not reinserted
+    cursor.execute("SELECT id FROM faculty_details WHERE srno = 3")
+    assert cursor.fetchone() == (kept_id,)
+
+
+def test_upsert_dedupes_a_legacy_table_before_adding_the_key(cursor):
+    # faculty_details as created before the (srno, name) key, holding a duplicate
+    cursor.execute(extraction.CREATE_TABLE_SQL)
+    cursor.execute("INSERT INTO faculty_details (srno, name, designation) "
+                   "VALUES (1, 'A', 'Professor'), (1, 'A', 'Professor'), (2, 'B', 'Professor')")
+    assert not unique_key_exists(cursor)
+
+    load_faculty_data(cursor, [faculty(1, "A"), faculty(2, "B", designation="Dean")], "upsert")
+
+    assert table(cursor) == [(1, "A", "Professor", None), (2, "B", "Dean", None)]
+    assert unique_key_exists(cursor)
@@ -0,0 +1,69 @@
+"""Indexing must invalidate the retrieval cache of the collections the agent reads."""
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from qdrant_client import QdrantClient
+
+import agent_graph
+from collection_router import COLLECTIONS, serving_collections
+from preprocessing import indexing
+from preprocessing.embedding_pipeline import EmbeddingPipeline
+from retrieval_cache import RetrievalCache
+
+QUESTION = "What is the sanctioned intake?"
+
+
+def corpus(intake="120"):
+    return [
+        Document(page_content=f"Section: Sanctioned (Approved) Intake\n\nUG intake {intake}",
+                 metadata={"Section": "Sanctioned (Approved) Intake"}),
+        Document(page_content="Section: Patents\n\nPatents published: 12", metadata={"Section": "Patents"}),
+        Document(page_content="Name: A Kumar, Designation: Professor",
+                 metadata={"faculty_name": "A Kumar", "srno": 1, "designation": "Professor"}),
+    ]
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setattr(indexing, "CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
+    client = QdrantClient(":memory:")
+    pipeline = EmbeddingPipeline(DeterministicFakeEmbedding(size=8), rate_per_minute=1e9)
+    manifest_path = str(tmp_path / "manifest.json")
+    manifest = indexing.load_manifest(manifest_path)
+
+    def run(documents, multi=False):
+        for collection, docs in serving_collections(documents, multi=multi).items():
+            indexing.sync_collection(client, pipeline, collection, docs, manifest, manifest_path)
+
+    return run
+
+
+def test_indexing_changes_agent_cache_key(index):
+    cache = RetrievalCache()
+    collection = agent_graph.collection_name
+    before = cache._key(collection, QUESTION)
+
+    index(corpus())
+    indexed = cache._key(collection, QUESTION)
+    assert indexed != before
+
+    # Nothing changed: same version, cached results stay valid
+    cache.put(collection, QUESTION, corpus()[:1])
+    index(corpus())
+    assert cache._key(collection, QUESTION) == indexed
+    assert cache.get(collection, QUESTION) is not None
+
+    # Changed chunk: new version, the stale result is gone
+    index(corpus(intake="180"))
+    assert cache._key(collection, QUESTION) != indexed
+    assert cache.get(collection, QUESTION) is None
+
+
+def test_multi_collection_indexing_bumps_routed_collections(index):
+    cache = RetrievalCache()
+    before = {spec.name: cache._key(spec.name, QUESTION) for spec in COLLECTIONS}
+
+    index(corpus(), multi=True)
+    changed = {name for name, key in before.items() if cache._key(name, QUESTION) != key}
+    assert changed == {"PU_NIRF", "PU_RESEARCH", "PU_FACULTY"}
@@ -0,0 +1,118 @@
+"""SemanticCache over the in-memory backend: exact and similar hits, misses, TTL and LRU."""
+
+import asyncio
+import re
+
+import numpy as np
+import pytest
+
+import semantic_cache
+from semantic_cache import InMemoryCacheBackend, SemanticCache
+
+VOCABULARY = ["placement", "statistics", "intake", "sanctioned", "faculty", "count", "patents", "ug", "pg"]
+
+
+class WordEmbeddings:
+    """Bag of known words, so questions sharing their key words are similar."""
+
+    def embed_query(self, text):
+        words = re.findall(r"\w+", text.lower())
+        return [float(words.count(word)) for word in VOCABULARY]
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(semantic_cache, "time", clock)
+    return clock
+
+
+def make_cache(max_entries=10, ttl=60, embeddings=None):
+    return SemanticCache(InMemoryCacheBackend(max_entries, ttl), embeddings, similarity_threshold=0.9)
+
+
+def test_exact_hit_ignores_case_and_punctuation(clock):
+    cache = make_cache()
+    cache.store("Placement statistics?", "UG: 120 placed", ["Placement"])
+
+    hit = cache.lookup("placement   STATISTICS")
+    assert hit == {"question": "Placement statistics?", "generation": "UG: 120 placed",
+                   "sources": ["Placement"], "similarity": 1.0}
+    assert cache.stats()["hits"] == 1
+
+
+def test_miss_without_embeddings(clock):
+    cache = make_cache()
+    cache.store("Placement statistics", "UG: 120 placed")
+
+    assert cache.lookup("Sanctioned intake") is None
+    assert cache.stats() == {"backend": "memory", "hits": 0, "misses": 1, "hit_rate": 0.0}
+
+
+def test_similar_question_hits_and_unrelated_misses(clock):
+    cache = make_cache(embeddings=WordEmbeddings())
+    cache.store("What are the placement statistics", "UG: 120 placed")
+
+    hit = cache.lookup("Show me placement statistics please")
+    assert hit["generation"] == "UG: 120 placed"
+    assert hit["similarity"] == pytest.approx(1.0)
+    assert cache.lookup("What is the sanctioned intake") is None
+
+
+def test_async_lookup_matches_sync(clock):
+    cache = make_cache(embeddings=WordEmbeddings())
+
+    async def run():
+        await cache.astore("Faculty count", "473")
+        return await cache.alookup("faculty count?"), await cache.alookup("patents")
+
+    hit, miss = asyncio.run(run())
+    assert hit["generation"] == "473"
+    assert miss is None
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = make_cache(ttl=60, embeddings=WordEmbeddings())
+    cache.store("Placement statistics", "UG: 120 placed")
+
+    clock.now += 59
+    assert cache.lookup("Placement statistics") is not None
+    clock.now += 2
+    assert cache.lookup("Placement statistics") is None
+    # The similarity path skips the expired vector too
+    assert cache.lookup("Show placement statistics") is None
+    assert len(cache.backend.index) == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = make_cache(max_entries=2, embeddings=WordEmbeddings())
+    cache.store("Placement statistics", "placements")
+    cache.store("Sanctioned intake", "intake")
+    # Touch the older entry so the other one becomes least recently used
+    assert cache.lookup("Placement statistics") is not None
+
+    cache.store("Faculty count", "473")
+    assert cache.lookup("Sanctioned intake") is None
+    assert cache.lookup("Placement statistics") is not None
+    assert cache.lookup("Faculty count") is not None
+    # Its vector went with it
+    assert semantic_cache.cache_key("Sanctioned intake") not in cache.backend.index
+    assert len(cache.backend.index) == 2
+
+
+def test_vector_round_trip():
+    vector = np.arange(6, dtype=np.float32)
+    unpacked, expires_at = semantic_cache.unpack_vector(semantic_cache.pack_vector(vector, 123.5))
+    assert expires_at == 123.5
+    assert unpacked.tolist() == vector.tolist()
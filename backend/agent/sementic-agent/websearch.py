@@ -0,0 +1,119 @@
+"""
+Web search layer for the `websearch` node.
+
+The node is reached from routing, after an irrelevant document, after a "not
+useful" grade and on the hallucination fallback, so one question could search
+Tavily several times and append the same results again each time, all joined
+into one unbounded Document. `CachedWebSearch` instead:
+
+- caches results per normalized query for WEB_SEARCH_CACHE_TTL (LRU, in-process),
+- returns one Document per result, content capped at WEB_RESULT_MAX_CHARS,
+  with `url`/`title` metadata (the source labels) and the query it came from.
+
+`merge_web_results` adds results to the request's documents, skipping URLs
+already there, and `searched_in_request` lets the node skip a query it has
+already run in this request (the documents are cleared at the end of a turn).
+Answers built on web results are time-sensitive ("today's weather", "latest
+circular"), so `cache_answer` skips them (`has_web_results`).
+"""
+
+import os
+import time
+from typing import List, Optional
+
+from langchain_core.documents import Document
+
+from semantic_cache import InMemoryCacheBackend, cache_key, normalize_question
+
+
+WEB_SEARCH_MAX_RESULTS = int(os.getenv("WEB_SEARCH_MAX_RESULTS", "3"))
+WEB_RESULT_MAX_CHARS = int(os.getenv("WEB_RESULT_MAX_CHARS", "1500"))
+WEB_SEARCH_CACHE_TTL = int(os.getenv("WEB_SEARCH_CACHE_TTL", str(15 * 60)))
+WEB_SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("WEB_SEARCH_CACHE_MAX_ENTRIES", "500"))
+
+
+def cap_content(text: str, max_chars: int = WEB_RESULT_MAX_CHARS) -> str:
+    """Truncate at a word boundary."""
+    text = " ".join((text or "").split())
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + " …"
+
+
+def result_documents(query: str, results: List[dict], max_chars: int = WEB_RESULT_MAX_CHARS) -> List[Document]:
+    """One Document per search result (results without a URL or content are dropped)."""
+    documents = []
+    seen = set()
+    for result in results:
+        url = result.get("url")
+        content = cap_content(result.get("content", ""), max_chars)
+        if not url or not content or url in seen:
+            continue
+        seen.add(url)
+        documents.append(Document(page_content=content, metadata={
+            "url": url, "title": result.get("title", ""), "web_query": normalize_question(query),
+        }))
+    return documents
+
+
+def searched_in_request(documents: Optional[List[Document]], query: str) -> bool:
+    """Whether the request's documents already hold web results for this query."""
+    key = normalize_question(query)
+    return any(d.metadata.get("web_query") == key for d in documents or [])
+
+
+def has_web_results(documents: Optional[List[Document]]) -> bool:
+    """Whether any document came from web search (answers built on them are not cached)."""
+    return any(d.metadata.get("web_query") for d in documents or [])
+
+
+def merge_web_results(documents: Optional[List[Document]], results: List[Document]) -> List[Document]:
+    """Documents followed by the results whose URL is not in them yet (new list)."""
+    urls = {d.metadata.get("url") for d in documents or [] if d.metadata.get("url")}
+    return list(documents or []) + [d for d in results if d.metadata["url"] not in urls]
+
+
+class CachedWebSearch:
+    """Search tool (TavilySearch) behind a per-query TTL cache."""
+
+    def __init__(self, tool, max_results: int = WEB_SEARCH_MAX_RESULTS, max_chars: int = WEB_RESULT_MAX_CHARS,
+                 ttl: int = WEB_SEARCH_CACHE_TTL, max_entries: int = WEB_SEARCH_CACHE_MAX_ENTRIES):
+        self.tool = tool
+        self.max_results = max_results
+        self.max_chars = max_chars
+        self.cache = InMemoryCacheBackend(max_entries, ttl) if ttl > 0 else None
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, query: str) -> Optional[List[Document]]:
+        entry = self.cache.get(cache_key(query)) if self.cache is not None else None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result_documents(query, entry["results"], self.max_chars)
+
+    def _store(self, query: str, response: dict) -> List[Document]:
+        results = [
+            {"url": r.get("url"), "title": r.get("title", ""), "content": r.get("content", "")}
+            for r in response.get("results", [])[:self.max_results]
+        ]
+        if self.cache is not None:
+            self.cache.put(cache_key(query), {"created_at": time.time(), "results": results})
+        return result_documents(query, results, self.max_chars)
+
+    def search(self, query: str) -> List[Document]:
+        cached = self._cached(query)
+        if cached is not None:
+            return cached
+        return self._store(query, self.tool.invoke({"query": query}))
+
+    async def asearch(self, query: str) -> List[Document]:
+        cached = self._cached(query)
+        if cached is not None:
+            return cached
+        return self._store(query, await self.tool.ainvoke({"query": query}))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
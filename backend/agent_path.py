@@ -0,0 +1,11 @@
+import os
+import sys
+
+# The agent lives in agent/sementic-agent (not an importable package name)
+AGENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "agent", "sementic-agent")
+
+
+def add_agent_to_path():
+    """Make the agent's top-level modules (agent_graph, telemetry, ...) importable."""
+    if AGENT_DIR not in sys.path:
+        sys.path.append(AGENT_DIR)
@@ -1,5 +1,7 @@
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from chat.schema import ChatRequest
+from chat.service import stream_chat
 
 router = APIRouter()
 
@@ -7,5 +9,10 @@ router = APIRouter()
 def chat(request: ChatRequest):
     return request
 
-
-
+@router.post('/stream')
+async def chat_stream(request: ChatRequest):
+    return StreamingResponse(
+        stream_chat(request.message, request.thread_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,4 +1,6 @@
+from typing import Optional
 from pydantic import BaseModel
 
 class ChatRequest(BaseModel):
     message: str
+    thread_id: Optional[str] = None
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import os
+import uuid
+from typing import AsyncIterator, Optional
+
+from agent_path import add_agent_to_path
+
+add_agent_to_path()
+
+# Chains tagged with this stream their tokens to the client (see agent_graph.py)
+ANSWER_TAG = "answer"
+# Build the agent's clients at startup instead of on the first request
+AGENT_WARM_UP = os.getenv("AGENT_WARM_UP", "false").lower() == "true"
+
+_agent = None
+
+
+def get_agent():
+    """Import and compile the agent graph on first use."""
+    global _agent
+    if _agent is None:
+        from agent_graph import agent
+        _agent = agent
+    return _agent
+
+
+async def warm_up_agent():
+    """
+    Compile the graph and build its clients at startup (AGENT_WARM_UP=true) rather
+    than on the first request. Failures are logged and retried on first use.
+
+    A durable checkpointer (CHECKPOINTER_BACKEND=postgres/valkey) is always connected
+    here, and an unreachable one fails startup: a worker that cannot share threads
+    must not serve.
+    """
+    from checkpointing import CHECKPOINTER_BACKEND, DURABLE_BACKENDS
+
+    if not AGENT_WARM_UP and CHECKPOINTER_BACKEND not in DURABLE_BACKENDS:
+        return
+    get_agent()
+    from components import components
+    # Client construction is blocking; keep the event loop free
+    await asyncio.to_thread(components.get, "checkpoint_store")
+    if AGENT_WARM_UP:
+        await asyncio.to_thread(components.warm_up)
+
+
+async def close_agent_clients():
+    """Close the agent's shared HTTP pools and async Qdrant client, if they were built."""
+    if _agent is None:
+        return
+    from components import components
+    from http_clients import aclose_http_clients
+    await aclose_http_clients()
+    async_qdrant = components.peek("async_qdrant")
+    if async_qdrant is not None:
+        await async_qdrant.close()
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format a single server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_chat(message: str, thread_id: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    Run the agent for one message and yield SSE events.
+
+    Events:
+        node:  {node}             a graph node finished
+        token: {text}             a chunk of the answer being generated
+        reset: {node}             a new generation started; drop tokens received so far
+        done:  {text, sources, thread_id}
+        error: {error}
+    """
+    thread_id = thread_id or str(uuid.uuid4())
+    trace = None
+
+    try:
+        agent = get_agent()
+        from agent_graph import document_sources, new_trace
+
+        # Per-node timings and token counts, exported on /metrics
+        trace = new_trace(thread_id)
+        config = {"configurable": {"thread_id": thread_id}, "callbacks": [trace]}
+
+        answer_step = None
+        async for mode, chunk in agent.astream(
+            {"question": message},
+            config=config,
+            stream_mode=["messages", "updates"],
+        ):
+            if mode == "messages":
+                message_chunk, metadata = chunk
+                if ANSWER_TAG not in metadata.get("tags", []) or not message_chunk.content:
+                    continue
+                step = metadata.get("langgraph_step")
+                if answer_step is not None and step != answer_step:
+                    yield sse_event("reset", {"node": metadata.get("langgraph_node")})
+                answer_step = step
+                yield sse_event("token", {"text": message_chunk.content})
+            else:
+                for node in chunk:
+                    yield sse_event("node", {"node": node})
+
+        state = (await agent.aget_state(config)).values
+        trace.finish(state)
+        yield sse_event("done", {
+            "text": state.get("generation", ""),
+            "sources": state.get("sources") or document_sources(state.get("documents")),
+            "thread_id": thread_id,
+        })
+    except Exception as e:
+        if trace is not None:
+            trace.finish(error=e)
+        yield sse_event("error", {"error": str(e)})
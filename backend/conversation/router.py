@@ -0,0 +1,60 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from conversation import service
+from conversation.schema import (
+    ConversationCreate,
+    ConversationPage,
+    ConversationRead,
+    MessagePage,
+    MessageRead,
+    TurnCreate,
+)
+from db.database import get_session
+
+router = APIRouter()
+
+@router.post('/', response_model=ConversationRead, status_code=201)
+async def create_conversation(request: ConversationCreate, session: AsyncSession = Depends(get_session)):
+    return await service.create_conversation(session, request.title, request.user_id)
+
+@router.get('/', response_model=ConversationPage)
+async def list_conversations(
+    user_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        items, next_cursor = await service.list_conversations(session, user_id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ConversationPage(items=items, next_cursor=next_cursor)
+
+@router.get('/{conversation_id}', response_model=ConversationRead)
+async def get_conversation(conversation_id: int, session: AsyncSession = Depends(get_session)):
+    conversation = await service.get_conversation(session, conversation_id)
+    if conversation is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return conversation
+
+@router.get('/{conversation_id}/messages', response_model=MessagePage)
+async def list_messages(
+    conversation_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        items, next_cursor = await service.list_messages(session, conversation_id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return MessagePage(items=items, next_cursor=next_cursor)
+
+@router.post('/{conversation_id}/messages', response_model=List[MessageRead], status_code=201)
+async def append_turn(conversation_id: int, request: TurnCreate, session: AsyncSession = Depends(get_session)):
+    if await service.get_conversation(session, conversation_id) is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return await service.append_turn(session, conversation_id, request.user_message, request.assistant_message)
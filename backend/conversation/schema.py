@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+from db.models import UserRole
+
+class ConversationCreate(BaseModel):
+    title: str
+    user_id: Optional[int] = None
+
+class ConversationRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+    user_id: Optional[int]
+    created_at: datetime
+    updated_at: datetime
+
+class MessageRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    conversation_id: int
+    seq: int
+    role: UserRole
+    content: str
+    created_at: datetime
+
+class TurnCreate(BaseModel):
+    """One exchange: the user's message and the assistant's reply."""
+    user_message: str = Field(min_length=1)
+    assistant_message: str
+
+class ConversationPage(BaseModel):
+    items: List[ConversationRead]
+    next_cursor: Optional[str] = None
+
+class MessagePage(BaseModel):
+    items: List[MessageRead]
+    next_cursor: Optional[str] = None
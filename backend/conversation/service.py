@@ -0,0 +1,120 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import insert, tuple_, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from db.models import Conversation, Message, UserRole, get_utc_now
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Opaque keyset cursor for the last row of a page."""
+    raw = json.dumps({"t": created_at.isoformat(), "id": id})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(data["t"]), int(data["id"])
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def encode_seq_cursor(seq: int) -> str:
+    """Opaque keyset cursor for the last message of a page."""
+    return base64.urlsafe_b64encode(json.dumps({"seq": seq}).encode()).decode()
+
+
+def decode_seq_cursor(cursor: str) -> int:
+    """Inverse of encode_seq_cursor; raises ValueError on a malformed cursor."""
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(cursor.encode()))["seq"])
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _page(rows: list, limit: int, cursor_for) -> Tuple[list, Optional[str]]:
+    """Split the limit+1 probe row off and build the next cursor."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, cursor_for(rows[-1])
+
+
+async def create_conversation(session: AsyncSession, title: str, user_id: Optional[int] = None) -> Conversation:
+    conversation = Conversation(title=title, user_id=user_id)
+    session.add(conversation)
+    await session.commit()
+    await session.refresh(conversation)
+    return conversation
+
+
+async def get_conversation(session: AsyncSession, conversation_id: int) -> Optional[Conversation]:
+    return await session.get(Conversation, conversation_id)
+
+
+async def list_conversations(session: AsyncSession, user_id: Optional[int] = None,
+                             cursor: Optional[str] = None, limit: int = 20) -> Tuple[List[Conversation], Optional[str]]:
+    """Most recently updated first, keyset-paginated on (updated_at, id)."""
+    query = select(Conversation)
+    if user_id is not None:
+        query = query.where(Conversation.user_id == user_id)
+    if cursor:
+        updated_at, id = decode_cursor(cursor)
+        query = query.where(tuple_(Conversation.updated_at, Conversation.id) < tuple_(updated_at, id))
+    query = query.order_by(Conversation.updated_at.desc(), Conversation.id.desc()).limit(limit + 1)
+
+    rows = list((await session.exec(query)).all())
+    return _page(rows, limit, lambda c: encode_cursor(c.updated_at, c.id))
+
+
+async def list_messages(session: AsyncSession, conversation_id: int,
+                        cursor: Optional[str] = None, limit: int = 50) -> Tuple[List[Message], Optional[str]]:
+    """
+    Newest messages first, keyset-paginated on seq.
+
+    Each page is a range scan on ix_message_conversation_seq, so its
+    cost does not grow with how far back the client has scrolled.
+    """
+    query = select(Message).where(Message.conversation_id == conversation_id)
+    if cursor:
+        query = query.where(Message.seq < decode_seq_cursor(cursor))
+    query = query.order_by(Message.seq.desc()).limit(limit + 1)
+
+    rows = list((await session.exec(query)).all())
+    return _page(rows, limit, lambda m: encode_seq_cursor(m.seq))
+
+
+async def append_turn(session: AsyncSession, conversation_id: int,
+                      user_message: str, assistant_message: str) -> List[Message]:
+    """
+    Store a user message and the assistant reply with a single multi-row
+    INSERT ... RETURNING, and bump the conversation's updated_at.
+    Assistant replies are stored with the SYSTEM role.
+
+    The conversation UPDATE reserves the turn's two seq values and holds the
+    row lock until commit, so concurrent turns cannot interleave.
+    """
+    now = get_utc_now()
+    reserved = await session.exec(
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(updated_at=now, message_count=Conversation.message_count + 2)
+        .returning(Conversation.message_count)
+    )
+    last_seq = reserved.scalar_one()
+    rows = [
+        {"conversation_id": conversation_id, "seq": last_seq - 1, "role": UserRole.USER,
+         "content": user_message, "created_at": now},
+        {"conversation_id": conversation_id, "seq": last_seq, "role": UserRole.SYSTEM,
+         "content": assistant_message, "created_at": now},
+    ]
+    result = await session.exec(insert(Message).values(rows).returning(Message))
+    messages = sorted(result.scalars().all(), key=lambda m: m.seq)
+    await session.commit()
+    return messages
@@ -0,0 +1,85 @@
+# migrations.py
+"""
+Idempotent schema upgrades for tables that predate the current models.
+
+SQLModel.metadata.create_all only creates missing tables; it never adds a
+column, an index or a type change to one that already exists. Each step
+here is safe to re-run, so create_db_and_tables applies them on every start.
+"""
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_xact_lock key held while upgrading, released with the transaction
+MIGRATION_LOCK_KEY = 0x63616D70
+
+# Columns created as TIMESTAMP before the models switched to DateTime(timezone=True).
+# Stored values were naive UTC (get_utc_now), so they are reinterpreted as UTC.
+TIMESTAMPTZ_COLUMNS = (
+    ("user", "created_at"),
+    ("conversation", "created_at"),
+    ("conversation", "updated_at"),
+    ("message", "created_at"),
+)
+
+# Run once, in the transaction that adds message.seq; the backfills scan the whole table
+ORDINAL_STEPS = (
+    'ALTER TABLE conversation ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0',
+    'ALTER TABLE message ADD COLUMN seq INTEGER',
+    # Number pre-existing messages in their old (created_at, id) order
+    '''
+    UPDATE message AS m SET seq = ordered.seq
+    FROM (
+        SELECT id, row_number() OVER (PARTITION BY conversation_id ORDER BY created_at, id) AS seq
+        FROM message
+    ) AS ordered
+    WHERE m.id = ordered.id
+    ''',
+    '''
+    UPDATE conversation AS c SET message_count = counted.last_seq
+    FROM (SELECT conversation_id, max(seq) AS last_seq FROM message GROUP BY conversation_id) AS counted
+    WHERE c.id = counted.conversation_id AND c.message_count < counted.last_seq
+    ''',
+    'ALTER TABLE message ALTER COLUMN seq SET NOT NULL',
+)
+
+INDEX_STEPS = (
+    'CREATE INDEX IF NOT EXISTS ix_conversation_user_updated_id ON conversation (user_id, updated_at, id)',
+    'CREATE UNIQUE INDEX IF NOT EXISTS ix_message_conversation_seq ON message (conversation_id, seq)',
+    # Superseded by ix_message_conversation_seq
+    'DROP INDEX IF EXISTS ix_message_conversation_created_id',
+)
+
+
+async def _columns(conn: AsyncConnection) -> dict:
+    """(table, column) -> data type for the current schema."""
+    result = await conn.execute(text(
+        "SELECT table_name, column_name, data_type FROM information_schema.columns "
+        "WHERE table_schema = current_schema()"
+    ))
+    return {(table, column): data_type for table, column, data_type in result.all()}
+
+
+async def upgrade_schema(conn: AsyncConnection) -> None:
+    """
+    Bring tables created by older models up to date; once they are, this is a
+    catalog lookup and a few IF NOT EXISTS statements, whatever the table sizes.
+    """
+    # Workers start together: one upgrades, the others wait and then find nothing to do
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+    columns = await _columns(conn)
+    for table, column in TIMESTAMPTZ_COLUMNS:
+        if columns.get((table, column)) == "timestamp without time zone":
+            logger.info("Converting %s.%s to TIMESTAMPTZ", table, column)
+            await conn.execute(text(
+                f'ALTER TABLE "{table}" ALTER COLUMN {column} TYPE TIMESTAMPTZ USING {column} AT TIME ZONE \'UTC\''
+            ))
+    if ("message", "seq") not in columns:
+        logger.info("Adding message.seq and numbering existing messages")
+        for statement in ORDINAL_STEPS:
+            await conn.execute(text(statement))
+    for statement in INDEX_STEPS:
+        await conn.execute(text(statement))
@@ -1,4 +1,5 @@
 from datetime import datetime, timezone
+from sqlalchemy import DateTime, Index
 from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional, List
 from enum import Enum
@@ -15,24 +16,34 @@ class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     username: str
     email: str = Field(unique=True, index=True)
-    created_at: datetime = Field(default_factory=get_utc_now)
+    created_at: datetime = Field(default_factory=get_utc_now, sa_type=DateTime(timezone=True))
 
     conversations: List["Conversation"] = Relationship(back_populates="user")
 
 
 class Conversation(SQLModel, table=True):
+    # Keyset pagination of a user's conversations by (updated_at, id)
+    __table_args__ = (Index("ix_conversation_user_updated_id", "user_id", "updated_at", "id"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
     user_id: Optional[int] = Field(default=None, foreign_key="user.id")
-    created_at: datetime = Field(default_factory=get_utc_now)
-    updated_at: datetime = Field(default_factory=get_utc_now)
+    created_at: datetime = Field(default_factory=get_utc_now, sa_type=DateTime(timezone=True))
+    updated_at: datetime = Field(default_factory=get_utc_now, sa_type=DateTime(timezone=True))
+    # Messages stored so far; append_turn bumps it to hand out Message.seq
+    message_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
     user: Optional[User] = Relationship(back_populates="conversations")
     messages: List["Message"] = Relationship(back_populates="conversation")
 
 class Message(SQLModel, table=True):
+    # Keyset pagination of a conversation's history by seq
+    __table_args__ = (Index("ix_message_conversation_seq", "conversation_id", "seq", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     conversation_id: Optional[int] = Field(default=None, foreign_key="conversation.id")
-    created_at: datetime = Field(default_factory=get_utc_now)
+    # Position within the conversation, 1-based; the reply always follows its question
+    seq: int
+    created_at: datetime = Field(default_factory=get_utc_now, sa_type=DateTime(timezone=True))
     content: str
     role: UserRole = Field(default=UserRole.SYSTEM)
-    conversation: Optional[Conversation] = Relationship(back_populates="messages")
\ No newline at end of file
+    conversation: Optional[Conversation] = Relationship(back_populates="messages")
@@ -1,10 +1,29 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 # from backend.auth.router import router as auth_router
 from chat.router import router as chat_router
-# from backend.conversation.router import router as conversation_router
+from chat.service import close_agent_clients, warm_up_agent
+from conversation.router import router as conversation_router
+from stats.router import router as stats_router
+from metrics.router import router as metrics_router
+from db.database import close_engine, create_db_and_tables
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await create_db_and_tables()
+    await warm_up_agent()
+    yield
+    # Return pooled connections on shutdown
+    await close_engine()
+    await close_agent_clients()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # app.include_router(auth_router, prefix="/auth", tags=["Auth"])
 app.include_router(chat_router, prefix="/chat", tags=["Chat"])
-# app.include_router(conversation_router, prefix="/conversations", tags=["Conversations"])
+app.include_router(conversation_router, prefix="/conversations", tags=["Conversations"])
+app.include_router(stats_router, prefix="/stats", tags=["Stats"])
+app.include_router(metrics_router, prefix="/metrics", tags=["Metrics"])
@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from metrics.service import CONTENT_TYPE, render_metrics
+
+router = APIRouter()
+
+@router.get('')
+def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
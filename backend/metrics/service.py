@@ -0,0 +1,12 @@
+from agent_path import add_agent_to_path
+
+add_agent_to_path()
+
+# Prometheus text format version served by render_metrics
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render_metrics() -> str:
+    """Agent request/node/token metrics (telemetry.py does not load the graph)."""
+    from telemetry import REGISTRY
+    return REGISTRY.render()
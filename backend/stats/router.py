@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException, Request
+from stats.schema import AggregateList, AggregateRows
+from stats.service import list_aggregates, lookup_aggregate
+
+router = APIRouter()
+
+# Plain `def` endpoints: a snapshot reload uses a blocking driver, so FastAPI
+# runs these in its threadpool instead of on the event loop
+
+@router.get('/', response_model=AggregateList)
+def aggregates():
+    return AggregateList(aggregates=list_aggregates())
+
+@router.get('/{name}', response_model=AggregateRows)
+def aggregate(name: str, request: Request):
+    """Precomputed rows; query parameters filter by column, e.g. ?designation=Professor"""
+    try:
+        rows = lookup_aggregate(name, dict(request.query_params))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return AggregateRows(name=name, rows=rows)
@@ -0,0 +1,9 @@
+from typing import Any, Dict, List
+from pydantic import BaseModel
+
+class AggregateList(BaseModel):
+    aggregates: List[str]
+
+class AggregateRows(BaseModel):
+    name: str
+    rows: List[Dict[str, Any]]
@@ -0,0 +1,26 @@
+from typing import Dict, List
+
+from agent_path import add_agent_to_path
+
+add_agent_to_path()
+
+_store = None
+
+
+def get_store():
+    """Shared AggregateStore, created on first use."""
+    global _store
+    if _store is None:
+        from aggregates import AggregateStore
+        _store = AggregateStore()
+    return _store
+
+
+def list_aggregates() -> List[str]:
+    return get_store().names()
+
+
+def lookup_aggregate(name: str, filters: Dict[str, str]) -> List[dict]:
+    """Rows of a precomputed aggregate, optionally filtered by column values."""
+    store = get_store()
+    return store.lookup(name, **filters) if filters else store.get(name)